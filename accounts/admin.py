@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User
+from .models import User, UserDashboardSummary, ActivityEvent
+from .authentication import invalidate_cached_users
 from .forms import CustomUserCreationForm, CustomUserChangeForm
 
 @admin.register(User)
@@ -17,16 +18,19 @@ class UserAdmin(BaseUserAdmin):
     
     def activate_users(self, request, queryset):
         updated = queryset.update(is_active=True)
+        invalidate_cached_users(queryset.values_list('pk', flat=True))
         self.message_user(request, f'{updated} users activated successfully.')
     activate_users.short_description = 'Activate selected users'
     
     def deactivate_users(self, request, queryset):
         updated = queryset.update(is_active=False)
+        invalidate_cached_users(queryset.values_list('pk', flat=True))
         self.message_user(request, f'{updated} users deactivated successfully.')
     deactivate_users.short_description = 'Deactivate selected users'
     
     def make_active_members(self, request, queryset):
         updated = queryset.update(membership_status='active')
+        invalidate_cached_users(queryset.values_list('pk', flat=True))
         self.message_user(request, f'{updated} users set to active membership.')
     make_active_members.short_description = 'Set selected users as active members'
     
@@ -49,4 +53,29 @@ class UserAdmin(BaseUserAdmin):
         ('Additional Info', {
             'fields': ('role',)
         }),
-    )
\ No newline at end of file
+    )
+
+@admin.register(UserDashboardSummary)
+class UserDashboardSummaryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'total_applications', 'pending_applications', 'total_claims', 'pending_claims', 'total_payments', 'total_paid', 'updated_at')
+    search_fields = ('user__username', 'user__email')
+    readonly_fields = ('updated_at',)
+    raw_id_fields = ('user',)
+    
+    actions = ['rebuild_summaries']
+    
+    def rebuild_summaries(self, request, queryset):
+        from .dashboard import compute_summaries, save_summaries
+        user_ids = list(queryset.values_list('user_id', flat=True))
+        save_summaries(list(compute_summaries(user_ids).values()))
+        self.message_user(request, f'{len(user_ids)} dashboard summaries rebuilt.')
+    rebuild_summaries.short_description = 'Rebuild selected summaries from source data'
+
+
+@admin.register(ActivityEvent)
+class ActivityEventAdmin(admin.ModelAdmin):
+    list_display = ('action', 'user', 'activity_type', 'object_id', 'status', 'created_at')
+    list_filter = ('activity_type', 'status', 'created_at')
+    search_fields = ('action', 'description', 'user__username', 'user__email')
+    raw_id_fields = ('user',)
+    date_hierarchy = 'created_at'
@@ -0,0 +1,80 @@
+"""
+JWT authentication with a cached user lookup.
+
+``CachedJWTAuthentication`` resolves the token's user from the cache instead of
+querying ``accounts_user`` on every request. Each cached copy is stamped with
+the user's cache version; ``accounts.signals`` bumps the version when a user is
+saved or deleted, so role, ``is_active`` and ``membership_status`` changes take
+effect on the next request even if a copy read before the change is written
+back to the cache afterwards.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+User = get_user_model()
+
+AUTH_USER_CACHE_PREFIX = 'accounts:auth_user'
+
+
+def user_cache_keys(user_id):
+    return f'{AUTH_USER_CACHE_PREFIX}:{user_id}', f'{AUTH_USER_CACHE_PREFIX}:{user_id}:version'
+
+
+def get_cached_user(user_id):
+    """Return the user with ``user_id``, from the cache when the cached copy is current."""
+    entry_key, version_key = user_cache_keys(user_id)
+    found = cache.get_many([entry_key, version_key])
+    version = found.get(version_key)
+    entry = found.get(entry_key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    user = User.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+    cache.set(entry_key, (version, user), settings.AUTH_USER_CACHE_TIMEOUT)
+    return user
+
+
+def invalidate_cached_user(user_id):
+    """Make every cached copy of the user stale."""
+    entry_key, version_key = user_cache_keys(user_id)
+    cache.add(version_key, 0, timeout=None)
+    cache.incr(version_key)
+    cache.delete(entry_key)
+
+
+def invalidate_cached_users(user_ids):
+    for user_id in user_ids:
+        invalidate_cached_user(user_id)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` that reads the user through ``get_cached_user``."""
+
+    def get_user(self, validated_token):
+        if not settings.AUTH_USER_CACHE_TIMEOUT:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        try:
+            user = get_cached_user(user_id)
+        except User.DoesNotExist:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        return user
@@ -0,0 +1,177 @@
+"""
+Member dashboard summaries.
+
+``UserDashboardSummary`` holds one row of counters per member so the dashboard
+is a single primary-key read. ``accounts.signals`` keeps the counters current
+with F-expression deltas as applications, claims and payments change; a member
+without a row yet is computed from the source tables on first read, and
+``rebuild_dashboard_summaries`` backfills or repairs rows in bulk. Each applied
+delta is also pushed to the member's live event stream.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, F, Max, Q, Sum
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from applications.models import Application
+from claims.models import Claim
+from payments.models import Payment
+from pamoja_kenya.live import publish_on_commit
+from .models import UserDashboardSummary
+
+SUMMARY_FIELDS = [
+    'total_applications', 'pending_applications', 'total_claims', 'pending_claims',
+    'total_payments', 'completed_payments', 'total_paid', 'last_payment_at',
+]
+
+
+def application_counters(row):
+    return {'total_applications': 1, 'pending_applications': int(row['status'] == 'pending')}
+
+
+def claim_counters(row):
+    return {'total_claims': 1, 'pending_claims': int(row['status'] == 'pending')}
+
+
+def payment_counters(row):
+    return {
+        'total_payments': 1,
+        'completed_payments': int(row['status'] == 'completed'),
+        'total_paid': row['amount'] or Decimal('0'),
+    }
+
+
+# model -> (fields the counters read, counter function)
+TRACKED_MODELS = {
+    Application: (('user_id', 'status'), application_counters),
+    Claim: (('user_id', 'status'), claim_counters),
+    Payment: (('user_id', 'status', 'amount', 'created_at'), payment_counters),
+}
+
+
+def compute_summaries(user_ids):
+    """Build unsaved summary rows for the given users from the source tables."""
+    summaries = {user_id: UserDashboardSummary(user_id=user_id) for user_id in user_ids}
+
+    applications = (
+        Application.objects.filter(user_id__in=user_ids).values('user_id')
+        .annotate(total=Count('id'), pending=Count('id', filter=Q(status='pending')))
+    )
+    for row in applications:
+        summary = summaries[row['user_id']]
+        summary.total_applications = row['total']
+        summary.pending_applications = row['pending']
+
+    claims = (
+        Claim.objects.filter(user_id__in=user_ids).values('user_id')
+        .annotate(total=Count('id'), pending=Count('id', filter=Q(status='pending')))
+    )
+    for row in claims:
+        summary = summaries[row['user_id']]
+        summary.total_claims = row['total']
+        summary.pending_claims = row['pending']
+
+    payments = (
+        Payment.objects.filter(user_id__in=user_ids).values('user_id')
+        .annotate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(status='completed')),
+            paid=Sum('amount'),
+            last=Max('created_at'),
+        )
+    )
+    for row in payments:
+        summary = summaries[row['user_id']]
+        summary.total_payments = row['total']
+        summary.completed_payments = row['completed']
+        summary.total_paid = row['paid'] or Decimal('0')
+        summary.last_payment_at = row['last']
+
+    return summaries
+
+
+def save_summaries(summaries):
+    UserDashboardSummary.objects.bulk_create(
+        summaries,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=SUMMARY_FIELDS,
+    )
+
+
+def resync_summaries(user_ids):
+    """
+    Recompute the members' rows after writes that skipped the signals, for
+    example ``queryset.update()``, and push each member's counter changes.
+    """
+    before = {summary.user_id: summary for summary in UserDashboardSummary.objects.filter(user_id__in=user_ids)}
+    summaries = compute_summaries(user_ids)
+    save_summaries(list(summaries.values()))
+    for user_id, summary in summaries.items():
+        old = before.get(user_id)
+        if old is None:
+            continue
+        counters = {
+            field: getattr(summary, field) - getattr(old, field)
+            for field in SUMMARY_FIELDS if field != 'last_payment_at' and getattr(summary, field) != getattr(old, field)
+        }
+        if counters:
+            publish_on_commit(f'user:{user_id}', 'dashboard', {'delta': counters})
+
+
+def rebuild_summary(user_id):
+    summary = compute_summaries([user_id])[user_id]
+    save_summaries([summary])
+    return summary
+
+
+def get_summary(user):
+    """Return the member's summary, building it on first access."""
+    summary = UserDashboardSummary.objects.filter(pk=user.pk).first()
+    if summary is None:
+        summary = rebuild_summary(user.pk)
+    return summary
+
+
+def apply_delta(user_id, delta, **extra):
+    """
+    Add counter deltas to a member's row in one UPDATE. Members without a row
+    are skipped; ``get_summary`` builds it from the source tables on first read.
+    """
+    counters = {field: value for field, value in delta.items() if value}
+    changes = {field: F(field) + value for field, value in counters.items()}
+    changes.update(extra)
+    if changes:
+        changes['updated_at'] = timezone.now()
+        if UserDashboardSummary.objects.filter(pk=user_id).update(**changes) and counters:
+            publish_on_commit(f'user:{user_id}', 'dashboard', {'delta': counters})
+
+
+def record_change(model, before, after):
+    """
+    Move a row's contribution from its previous state to its current one.
+    ``before`` is None for inserts and ``after`` is None for deletes.
+    """
+    counters = TRACKED_MODELS[model][1]
+    old = counters(before) if before else {}
+    new = counters(after) if after else {}
+
+    if before and after and before['user_id'] == after['user_id']:
+        delta = {field: new.get(field, 0) - old.get(field, 0) for field in set(old) | set(new)}
+        apply_delta(after['user_id'], delta)
+        return
+
+    if before:
+        extra = {}
+        if model is Payment:
+            extra['last_payment_at'] = (
+                Payment.objects.filter(user_id=before['user_id']).aggregate(last=Max('created_at'))['last']
+            )
+        apply_delta(before['user_id'], {field: -value for field, value in old.items()}, **extra)
+    if after:
+        extra = {}
+        if model is Payment:
+            extra['last_payment_at'] = Greatest(
+                Coalesce(F('last_payment_at'), after['created_at']), after['created_at']
+            )
+        apply_delta(after['user_id'], new, **extra)
@@ -0,0 +1,150 @@
+"""
+``Idempotency-Key`` support for mutating endpoints.
+
+Mobile clients retry POSTs when a response is lost. Without a key, each retry
+creates another row, sends the emails again and fans out the notifications
+again. A view decorated with ``@idempotent`` runs once per key. Its response
+(status and data) is stored in the cache and in ``IdempotencyRecord``, and a
+repeat of the key gets that response back without running the view, so a
+retry costs one cache read.
+
+- Keys are scoped to the user (or anonymous) and the path, so two members
+  can't collide.
+- A key reused with a different payload gets 422.
+- While the first request holds the key's lock, a duplicate waits up to
+  ``IDEMPOTENCY_WAIT_SECONDS`` for its response, then gets 409.
+- Server errors (5xx) and exceptions are not stored, so they can be retried.
+- Requests without the header behave exactly as before.
+"""
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import IdempotencyRecord
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_PREFIX = 'accounts:idempotency'
+
+
+def scoped_key(request, key):
+    owner = request.user.pk if request.user.is_authenticated else 'anon'
+    return hashlib.sha256(f'{owner}:{request.method}:{request.path}:{key}'.encode()).hexdigest()
+
+
+def response_cache_key(key_hash):
+    return f'{IDEMPOTENCY_PREFIX}:response:{key_hash}'
+
+
+def lock_cache_key(key_hash):
+    return f'{IDEMPOTENCY_PREFIX}:lock:{key_hash}'
+
+
+def request_fingerprint(request):
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    # Uploaded files are represented by their names
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def stored_response(key_hash):
+    """(fingerprint, status code, data) stored for a key, from the cache or else the database."""
+    stored = cache.get(response_cache_key(key_hash))
+    if stored is None:
+        cutoff = timezone.now() - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+        stored = IdempotencyRecord.objects.filter(key_hash=key_hash, created_at__gte=cutoff).values_list(
+            'fingerprint', 'status_code', 'response_data'
+        ).first()
+        if stored is not None:
+            cache.set(response_cache_key(key_hash), stored, settings.IDEMPOTENCY_CACHE_SECONDS)
+    return stored
+
+
+def store_response(key_hash, fingerprint, response):
+    data = json.loads(json.dumps(response.data, cls=JSONEncoder))
+    try:
+        with transaction.atomic():
+            IdempotencyRecord.objects.create(
+                key_hash=key_hash, fingerprint=fingerprint, status_code=response.status_code, response_data=data
+            )
+    except IntegrityError:
+        # Another process stored this key first; keep its response
+        pass
+    cache.set(response_cache_key(key_hash), (fingerprint, response.status_code, data), settings.IDEMPOTENCY_CACHE_SECONDS)
+
+
+def acquire(key_hash):
+    """Take the key's lock, waiting while another request holds it. False if it stayed held or a response appeared."""
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    while not cache.add(lock_cache_key(key_hash), 1, settings.IDEMPOTENCY_LOCK_SECONDS):
+        if cache.get(response_cache_key(key_hash)) is not None or time.monotonic() >= deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def replay(stored, fingerprint):
+    stored_fingerprint, status_code, data = stored
+    if stored_fingerprint != fingerprint:
+        return Response({'error': 'Idempotency-Key was already used for a different request'},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    return Response(data, status=status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def idempotent(view):
+    """Run a function view once per Idempotency-Key. Apply it beneath ``@api_view``/``@permission_classes``."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({'error': 'Idempotency-Key must be at most 255 characters'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        key_hash = scoped_key(request, key)
+        fingerprint = request_fingerprint(request)
+        stored = stored_response(key_hash)
+        if stored is not None:
+            return replay(stored, fingerprint)
+        if not acquire(key_hash):
+            stored = cache.get(response_cache_key(key_hash))
+            if stored is not None:
+                return replay(stored, fingerprint)
+            return Response({'error': 'A request with this Idempotency-Key is still in progress'},
+                            status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'})
+
+        try:
+            # The request that held the lock may have finished between the lookup and acquire()
+            stored = cache.get(response_cache_key(key_hash))
+            if stored is not None:
+                return replay(stored, fingerprint)
+            response = view(request, *args, **kwargs)
+            if isinstance(response, Response) and response.status_code < 500:
+                store_response(key_hash, fingerprint, response)
+            return response
+        finally:
+            cache.delete(lock_cache_key(key_hash))
+
+    return wrapper
+
+
+def prune_idempotency_records(batch_size=1000, now=None):
+    """Delete stored responses older than ``IDEMPOTENCY_KEY_TTL_HOURS``; returns how many were deleted."""
+    cutoff = (now or timezone.now()) - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+    deleted = 0
+    while True:
+        ids = list(IdempotencyRecord.objects.filter(created_at__lt=cutoff).values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += IdempotencyRecord.objects.filter(pk__in=ids).delete()[0]
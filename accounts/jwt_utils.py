@@ -1,27 +1,70 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
 from datetime import timedelta
+from .token_blacklist import is_blacklisted, remember_blacklisted, remember_issued
+
+
+class CachedBlacklistRefreshToken(RefreshToken):
+    """Refresh token whose blacklist checks and writes go through accounts.token_blacklist"""
+
+    def check_blacklist(self):
+        if is_blacklisted(self.payload[api_settings.JTI_CLAIM], self.payload['exp']):
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        result = super().blacklist()
+        remember_blacklisted(self.payload[api_settings.JTI_CLAIM], self.payload['exp'])
+        return result
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        remember_issued(token[api_settings.JTI_CLAIM], token['exp'])
+        return token
+
+
+class CachedTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh serializer that records rotated refresh tokens as active"""
+    token_class = CachedBlacklistRefreshToken
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        if 'refresh' in data:
+            rotated = self.token_class(data['refresh'], verify=False)
+            remember_issued(rotated[api_settings.JTI_CLAIM], rotated['exp'])
+        return data
+
 
 def create_tokens_for_user(user):
     """Create JWT tokens with different expiration for admins vs users"""
-    refresh = RefreshToken.for_user(user)
-    
+    refresh = CachedBlacklistRefreshToken.for_user(user)
+
     # Check if user is admin
     is_admin = user.is_staff or user.is_superuser
-    
+
     if is_admin:
         # Set longer expiration for admins (30 days)
         refresh.set_exp(lifetime=timedelta(days=30))
         refresh.access_token.set_exp(lifetime=timedelta(days=30))
+        # Keep the outstanding row's expiry in step so pruning never drops a live token's blacklist entry
+        OutstandingToken.objects.filter(jti=refresh[api_settings.JTI_CLAIM]).update(
+            expires_at=datetime_from_epoch(refresh['exp'])
+        )
     else:
         # Regular users get 10 minutes (default is already set in settings)
         refresh.set_exp(lifetime=timedelta(days=1))
         refresh.access_token.set_exp(lifetime=timedelta(minutes=10))
-    
+
     return refresh
 
-class CustomRefreshToken(RefreshToken):
+class CustomRefreshToken(CachedBlacklistRefreshToken):
     """Wrapper for custom token creation"""
-    
+
     @classmethod
     def for_user(cls, user):
-        return create_tokens_for_user(user)
\ No newline at end of file
+        return create_tokens_for_user(user)
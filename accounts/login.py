@@ -0,0 +1,142 @@
+"""
+Login service.
+
+``login_view``, ``simple_login`` and ``UserLoginSerializer`` all authenticate
+through ``authenticate_login``:
+
+- the username or email is resolved with one case-insensitive query against a
+  functional index, instead of a lookup followed by ``authenticate()``;
+- per-IP and per-account attempt counters in the cache are charged before
+  any password hashing, so credential-stuffing floods are refused cheaply.
+  Each counter is a fixed window, charged with an atomic ``cache.incr``, so
+  parallel attempts can't all read the same count and slip through;
+- the time spent hashing is logged and returned so views can expose it as a
+  ``Server-Timing`` metric.
+"""
+import hashlib
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+LOGIN_THROTTLE_PREFIX = 'accounts:login_throttle'
+
+
+class LoginThrottled(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f'Too many login attempts, retry in {retry_after}s')
+        self.retry_after = retry_after
+
+
+class LoginResult:
+    def __init__(self, user, hash_ms):
+        self.user = user
+        self.hash_ms = hash_ms
+
+    @property
+    def server_timing(self):
+        return f'hash;dur={self.hash_ms:.1f}'
+
+
+def client_ip(request):
+    """
+    The client's address. Behind ``NUM_PROXIES`` reverse proxies (PythonAnywhere
+    runs one) ``REMOTE_ADDR`` is the nearest proxy. The client is then the entry
+    that many places from the end of ``X-Forwarded-For``, the last one a
+    trusted proxy added; anything further left is client-supplied.
+    """
+    if request is None:
+        return ''
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if settings.NUM_PROXIES and forwarded:
+        addresses = [address.strip() for address in forwarded.split(',')]
+        return addresses[-min(settings.NUM_PROXIES, len(addresses))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def bucket_key(scope, value):
+    digest = hashlib.sha256(value.encode()).hexdigest()[:32]
+    return f'{LOGIN_THROTTLE_PREFIX}:{scope}:{digest}'
+
+
+def window_key(key, period, now=None):
+    return f'{key}:{int((now or time.time()) // period)}'
+
+
+def take_attempt(key, limit, period):
+    """
+    Count one attempt against ``key``, which allows ``limit`` attempts per
+    ``period``-second window. Returns 0 when the attempt is allowed, otherwise
+    the seconds until the window resets.
+    """
+    now = time.time()
+    counter = window_key(key, period, now)
+    cache.add(counter, 0, period)
+    try:
+        attempts = cache.incr(counter)
+    except ValueError:
+        # Evicted between add() and incr(); this attempt starts the window again
+        cache.add(counter, 1, period)
+        attempts = 1
+    if attempts > limit:
+        return max(math.ceil(period - now % period), 1)
+    return 0
+
+
+def resolve_user(identifier):
+    """Find the user by email (when it contains '@') or username, ignoring case, in one query."""
+    lookup = 'email__iexact' if '@' in identifier else 'username__iexact'
+    matches = list(User.objects.filter(**{lookup: identifier})[:2])
+    if len(matches) == 1:
+        return matches[0]
+    # Two accounts differing only by case: accept only an exact match
+    field = lookup.split('__')[0]
+    return next((user for user in matches if getattr(user, field) == identifier), None)
+
+
+def authenticate_login(request, identifier, password):
+    """
+    Check ``identifier``/``password`` and return a ``LoginResult`` whose
+    ``user`` is None when the credentials are wrong. Callers still check
+    ``is_active``. Raises ``LoginThrottled`` before hashing when the client IP
+    or the account is out of attempts.
+    """
+    identifier = identifier.strip()
+    ip = client_ip(request)
+    ip_limit, ip_period = settings.LOGIN_THROTTLE_RATES['ip']
+    account_limit, account_period = settings.LOGIN_THROTTLE_RATES['account']
+    account_key = bucket_key('account', identifier.lower())
+
+    if ip:
+        wait = take_attempt(bucket_key('ip', ip), ip_limit, ip_period)
+        if wait:
+            logger.warning(f"Login throttled for ip {ip}, retry in {wait}s")
+            raise LoginThrottled(wait)
+    wait = take_attempt(account_key, account_limit, account_period)
+    if wait:
+        logger.warning(f"Login throttled for account from {ip or 'unknown ip'}, retry in {wait}s")
+        raise LoginThrottled(wait)
+
+    user = resolve_user(identifier)
+    started = time.perf_counter()
+    if user is None:
+        # Hash anyway so unknown accounts take as long as wrong passwords
+        User().set_password(password)
+        valid = False
+    else:
+        valid = user.check_password(password)
+    hash_ms = (time.perf_counter() - started) * 1000
+    logger.info(f"Login password hashing took {hash_ms:.1f}ms")
+
+    if not valid:
+        return LoginResult(None, hash_ms)
+    # A successful login clears the account's window so earlier typos don't count against it
+    cache.delete(window_key(account_key, account_period))
+    return LoginResult(user, hash_ms)
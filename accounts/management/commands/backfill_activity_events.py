@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from accounts.activity import ACTIVITY_SOURCES, build_activity
+from accounts.models import ActivityEvent
+
+
+class Command(BaseCommand):
+    help = 'Seed the activity log with a submitted event for applications, claims and payments that have none'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for model, (activity_type, _) in ACTIVITY_SOURCES.items():
+            logged = set(
+                ActivityEvent.objects.filter(activity_type=activity_type).values_list('object_id', flat=True)
+            )
+            created = 0
+            batch = []
+            for instance in model.objects.order_by('id').iterator(chunk_size=batch_size):
+                if instance.pk in logged:
+                    continue
+                batch.append(build_activity(instance, created=True, created_at=instance.created_at))
+                if len(batch) >= batch_size:
+                    ActivityEvent.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            if batch:
+                ActivityEvent.objects.bulk_create(batch)
+                created += len(batch)
+            self.stdout.write(f'{activity_type}: {created} events added')
+
+        self.stdout.write(self.style.SUCCESS('Activity log backfilled'))
@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from accounts.dashboard import compute_summaries, save_summaries
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Recompute member dashboard summaries from applications, claims and payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Only rebuild this user id (may be repeated)')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options['user_ids']:
+            users = users.filter(id__in=options['user_ids'])
+
+        chunk_size = options['chunk_size']
+        rebuilt = 0
+        last_id = 0
+        while True:
+            user_ids = list(users.filter(id__gt=last_id).values_list('id', flat=True)[:chunk_size])
+            if not user_ids:
+                break
+            save_summaries(list(compute_summaries(user_ids).values()))
+            rebuilt += len(user_ids)
+            last_id = user_ids[-1]
+            self.stdout.write(f'Rebuilt {rebuilt} summaries (through user {last_id})')
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} dashboard summaries'))
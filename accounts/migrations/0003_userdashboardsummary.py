@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_user_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDashboardSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='dashboard_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_applications', models.PositiveIntegerField(default=0)),
+                ('pending_applications', models.PositiveIntegerField(default=0)),
+                ('total_claims', models.PositiveIntegerField(default=0)),
+                ('pending_claims', models.PositiveIntegerField(default=0)),
+                ('total_payments', models.PositiveIntegerField(default=0)),
+                ('completed_payments', models.PositiveIntegerField(default=0)),
+                ('total_paid', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('last_payment_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Upper
+from django.utils import timezone
 
 class User(AbstractUser):
     ROLE_CHOICES = [
@@ -30,9 +32,71 @@ class User(AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='user_created_id_idx'),
+            # Case-insensitive login lookups (accounts.login.resolve_user)
+            models.Index(Upper('email'), name='user_email_upper_idx'),
+            models.Index(Upper('username'), name='user_username_upper_idx'),
+        ]
+
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.email})"
 
     @property
     def is_admin(self):
-        return self.role == 'admin'
\ No newline at end of file
+        return self.role == 'admin'
+
+class UserDashboardSummary(models.Model):
+    """Per-member dashboard counters, maintained incrementally by accounts.signals"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='dashboard_summary')
+    total_applications = models.PositiveIntegerField(default=0)
+    pending_applications = models.PositiveIntegerField(default=0)
+    total_claims = models.PositiveIntegerField(default=0)
+    pending_claims = models.PositiveIntegerField(default=0)
+    total_payments = models.PositiveIntegerField(default=0)
+    completed_payments = models.PositiveIntegerField(default=0)
+    total_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    last_payment_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Dashboard summary for {self.user_id}"
+
+
+class ActivityEvent(models.Model):
+    """Append-only log of member activity, written by accounts.signals as domain events happen"""
+    ACTIVITY_TYPES = [
+        ('application', 'Application'),
+        ('claim', 'Claim'),
+        ('payment', 'Payment'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activity_events')
+    activity_type = models.CharField(max_length=20, choices=ACTIVITY_TYPES)
+    object_id = models.PositiveBigIntegerField()
+    action = models.CharField(max_length=100)
+    description = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='activity_user_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='activity_created_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.action} ({self.user_id})"
+
+
+class IdempotencyRecord(models.Model):
+    """The response a mutating request returned for an Idempotency-Key, replayed by accounts.idempotency"""
+    key_hash = models.CharField(max_length=64, unique=True)  # sha256 of user scope, path and key
+    fingerprint = models.CharField(max_length=64)  # sha256 of the request payload
+    status_code = models.PositiveSmallIntegerField()
+    response_data = models.JSONField(null=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.key_hash[:12]} ({self.status_code})"
@@ -1,7 +1,7 @@
-from rest_framework import serializers
-from django.contrib.auth import authenticate
+from rest_framework import exceptions, serializers
 from django.contrib.auth.password_validation import validate_password
 from .models import User
+from .login import LoginThrottled, authenticate_login
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=6)
@@ -47,20 +47,14 @@ class UserLoginSerializer(serializers.Serializer):
         email = attrs.get('email')
         password = attrs.get('password')
         
-        identifier = username or email
+        identifier = email or username
         if not identifier or not password:
             raise serializers.ValidationError('Username/email and password are required')
         
-        # Since USERNAME_FIELD = 'email', we need to get the email for authentication
-        auth_email = email
-        if username and not email:
-            try:
-                user_obj = User.objects.get(username=username)
-                auth_email = user_obj.email
-            except User.DoesNotExist:
-                raise serializers.ValidationError('Invalid credentials')
-        
-        user = authenticate(username=auth_email, password=password)
+        try:
+            user = authenticate_login(self.context.get('request'), identifier, password).user
+        except LoginThrottled as e:
+            raise exceptions.Throttled(wait=e.retry_after)
 
         if not user:
             raise serializers.ValidationError('Invalid credentials')
@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from admin_api.stats import invalidate_dashboard_stats
+from pamoja_kenya.live import publish_on_commit
+from .activity import record_activity, record_bulk_activity
+from .authentication import invalidate_cached_user
+from .dashboard import TRACKED_MODELS, record_change, resync_summaries
+
+
+def snapshot_tracked_fields(sender, instance, **kwargs):
+    """Remember the stored values the dashboard counters and activity log depend on before they change"""
+    fields = TRACKED_MODELS[sender][0]
+    instance._tracked_before = None
+    if instance.has_snapshot and all(field in instance._loaded_values for field in fields):
+        # Values the instance was loaded with, no extra query
+        instance._tracked_before = {field: instance._loaded_values.get(field) for field in fields}
+    elif instance.pk and not instance._state.adding:
+        instance._tracked_before = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+def update_dashboard_on_save(sender, instance, created, **kwargs):
+    fields = TRACKED_MODELS[sender][0]
+    before = None if created else getattr(instance, '_tracked_before', None)
+    after = {field: getattr(instance, field) for field in fields}
+    if before == after:
+        return
+    record_change(sender, before, after)
+
+
+def update_dashboard_on_delete(sender, instance, **kwargs):
+    fields = TRACKED_MODELS[sender][0]
+    record_change(sender, {field: getattr(instance, field) for field in fields}, None)
+
+
+def log_activity_on_save(sender, instance, created, **kwargs):
+    """Append a submitted/status-changed event to the member's activity log"""
+    before = getattr(instance, '_tracked_before', None)
+    if created or (before and before['status'] != instance.status):
+        record_activity(instance, created)
+
+
+for model in TRACKED_MODELS:
+    pre_save.connect(snapshot_tracked_fields, sender=model, dispatch_uid=f'tracked_snapshot_{model.__name__}')
+    post_save.connect(update_dashboard_on_save, sender=model, dispatch_uid=f'dashboard_save_{model.__name__}')
+    post_delete.connect(update_dashboard_on_delete, sender=model, dispatch_uid=f'dashboard_delete_{model.__name__}')
+    post_save.connect(log_activity_on_save, sender=model, dispatch_uid=f'activity_save_{model.__name__}')
+
+
+def sync_after_update(model, pks):
+    """
+    Do what the save signals would have done for rows changed with
+    ``queryset.update()``: recompute the members' dashboard summaries, log the
+    status changes and mark the admin stats stale.
+    """
+    instances = list(model.objects.filter(pk__in=pks).select_related('user'))
+    if not instances:
+        return
+    resync_summaries(sorted({instance.user_id for instance in instances}))
+    record_bulk_activity(instances)
+    transaction.on_commit(invalidate_dashboard_stats)
+    publish_on_commit('admin', 'stats', {'stale': True})
+
+
+def invalidate_auth_cache(sender, instance, **kwargs):
+    """Make cached copies of the user stale once the change is committed"""
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_cached_user(user_id))
+
+
+post_save.connect(invalidate_auth_cache, sender=get_user_model(), dispatch_uid='auth_user_cache_save')
+post_delete.connect(invalidate_auth_cache, sender=get_user_model(), dispatch_uid='auth_user_cache_delete')
@@ -0,0 +1,21 @@
+from celery import shared_task
+from django.conf import settings
+from .token_blacklist import prune_expired_tokens as prune_tokens
+from .idempotency import prune_idempotency_records as prune_records
+import logging
+
+logger = logging.getLogger(__name__)
+
+@shared_task(ignore_result=True)
+def prune_expired_tokens():
+    """Delete expired outstanding/blacklisted refresh tokens (scheduled by celery beat)"""
+    deleted = prune_tokens(batch_size=settings.TOKEN_PRUNE_BATCH_SIZE)
+    logger.info(f"Pruned {deleted} expired refresh tokens")
+    return deleted
+
+@shared_task(ignore_result=True)
+def prune_idempotency_records():
+    """Delete stored Idempotency-Key responses past their TTL (scheduled by celery beat)"""
+    deleted = prune_records()
+    logger.info(f"Pruned {deleted} idempotency records")
+    return deleted
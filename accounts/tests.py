@@ -1,3 +1,296 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from claims.models import Claim
+from notifications.models import ContactMessage
+from payments.models import Payment
+from payments.webhooks import WebhookVerificationError, parse_mpesa
+from .authentication import CachedJWTAuthentication, get_cached_user, invalidate_cached_user, user_cache_keys
+from .dashboard import SUMMARY_FIELDS, compute_summaries, get_summary
+from .jwt_utils import CustomRefreshToken
+from .idempotency import lock_cache_key, scoped_key
+from .login import LoginThrottled, authenticate_login, bucket_key, client_ip, take_attempt
+from .models import ActivityEvent, IdempotencyRecord
+from .token_blacklist import prune_expired_tokens
+
+User = get_user_model()
+
+
+def create_claim(user, **fields):
+    return Claim.objects.create(user=user, claim_type='medical', amount_requested=Decimal('300.00'),
+                                description='Hospital bill', **fields)
+
+
+def create_payment(user, **fields):
+    return Payment.objects.create(user=user, amount=Decimal('50.00'), payer_name='Payer',
+                                  payer_email='payer@example.com', **fields)
+
+
+class DashboardSummaryTests(TestCase):
+    def setUp(self):
+        self.member = User.objects.create_user(username='member', email='member@example.com', password='x')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='x')
+        # Build the rows so the signals apply deltas to them
+        get_summary(self.member)
+        get_summary(self.other)
+
+    def assert_matches_recompute(self, user):
+        stored = get_summary(user)
+        computed = compute_summaries([user.pk])[user.pk]
+        self.assertEqual(
+            {field: getattr(stored, field) for field in SUMMARY_FIELDS},
+            {field: getattr(computed, field) for field in SUMMARY_FIELDS},
+        )
+
+    def test_signals_keep_counters_in_step(self):
+        claim = create_claim(self.member)
+        first = create_payment(self.member)
+        completed = create_payment(self.member, status='completed')
+        summary = get_summary(self.member)
+        self.assertEqual((summary.total_claims, summary.pending_claims), (1, 1))
+        self.assertEqual((summary.total_payments, summary.completed_payments, summary.total_paid), (2, 1, Decimal('100.00')))
+        self.assertEqual(summary.last_payment_at, completed.created_at)
+
+        claim.status = 'approved'
+        claim.save()
+        completed.delete()
+        summary = get_summary(self.member)
+        self.assertEqual((summary.pending_claims, summary.completed_payments, summary.total_paid), (0, 0, Decimal('50.00')))
+        self.assertEqual(summary.last_payment_at, first.created_at)
+        self.assert_matches_recompute(self.member)
+
+    def test_moving_a_row_between_members(self):
+        claim = create_claim(self.member)
+        claim.user = self.other
+        claim.save()
+        self.assertEqual(get_summary(self.member).total_claims, 0)
+        self.assertEqual(get_summary(self.other).pending_claims, 1)
+        self.assert_matches_recompute(self.member)
+        self.assert_matches_recompute(self.other)
+
+    def test_counter_changes_are_pushed_to_the_member(self):
+        with mock.patch('accounts.dashboard.publish_on_commit') as publish:
+            create_claim(self.member)
+        publish.assert_called_once_with(f'user:{self.member.pk}', 'dashboard',
+                                        {'delta': {'total_claims': 1, 'pending_claims': 1}})
+
+
+class ActivityLogTests(TestCase):
+    def setUp(self):
+        self.member = User.objects.create_user(username='member', email='member@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+
+    def actions(self):
+        return list(ActivityEvent.objects.filter(user=self.member).order_by('id').values_list('action', flat=True))
+
+    def test_creation_and_status_changes_are_logged_once(self):
+        claim = create_claim(self.member)
+        claim.admin_notes = 'Looked at it'
+        claim.save()  # no status change, nothing logged
+        claim.status = 'approved'
+        claim.save()
+        create_payment(self.member, status='completed')
+        self.assertEqual(self.actions(), ['Claim Filed', 'Claim Approved', 'Payment Made'])
+
+    def test_feed_is_newest_first_and_paged(self):
+        claim = create_claim(self.member)
+        claim.status = 'rejected'
+        claim.save()
+        create_payment(self.member)
+
+        page = self.client.get('/api/activities/', {'page_size': 2}).json()
+        self.assertEqual([event['action'] for event in page['results']], ['Payment Started', 'Claim Rejected'])
+        self.assertEqual(page['results'][1]['id'], claim.pk)
+        rest = self.client.get('/api/activities/', {'cursor': page['next_cursor']}).json()
+        self.assertEqual([event['action'] for event in rest['results']], ['Claim Filed'])
+
+    def test_events_are_pushed_to_member_and_admins(self):
+        with mock.patch('accounts.activity.publish_on_commit') as publish:
+            create_claim(self.member)
+        self.assertEqual([call.args[:2] for call in publish.call_args_list],
+                         [(f'user:{self.member.pk}', 'activity'), ('admin', 'activity')])
+
+
+@override_settings(AUTH_USER_CACHE_TIMEOUT=60)
+class CachedJWTUserTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.member = User.objects.create_user(username='member', email='member@example.com', password='x')
+        self.authentication = CachedJWTAuthentication()
+        self.token = self.authentication.get_validated_token(str(AccessToken.for_user(self.member)))
+
+    def test_user_is_read_from_the_cache_after_the_first_request(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authentication.get_user(self.token), self.member)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authentication.get_user(self.token), self.member)
+
+    def test_saving_the_user_takes_effect_on_the_next_request(self):
+        self.authentication.get_user(self.token)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.member.is_active = False
+            self.member.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.get_user(self.token)
+
+    def test_stale_copy_written_back_after_a_change_is_ignored(self):
+        stale = get_cached_user(self.member.pk)
+        entry_key, version_key = user_cache_keys(self.member.pk)
+        old_version = cache.get(version_key)
+        User.objects.filter(pk=self.member.pk).update(role='admin')
+        invalidate_cached_user(self.member.pk)
+        # A request that read the user before the change finishes caching it afterwards
+        cache.set(entry_key, (old_version, stale), 60)
+        self.assertEqual(get_cached_user(self.member.pk).role, 'admin')
+
+
+class RefreshTokenBlacklistTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.member = User.objects.create_user(username='member', email='member@example.com', password='x')
+        self.refresh = str(CustomRefreshToken.for_user(self.member))
+
+    def post_refresh(self, token):
+        return self.client.post('/api/auth/refresh/', {'refresh': token}, content_type='application/json')
+
+    def test_rotated_token_is_rejected_from_the_cache(self):
+        rotated = self.post_refresh(self.refresh)
+        self.assertEqual(rotated.status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.post_refresh(self.refresh).status_code, 401)
+        self.assertEqual(self.post_refresh(rotated.json()['refresh']).status_code, 200)
+
+    def test_evicted_state_falls_back_to_the_database(self):
+        self.assertEqual(self.post_refresh(self.refresh).status_code, 200)
+        cache.clear()
+        self.assertEqual(self.post_refresh(self.refresh).status_code, 401)
+
+    def test_prune_deletes_only_expired_tokens(self):
+        self.post_refresh(self.refresh)
+        outstanding = OutstandingToken.objects.count()
+        self.assertEqual(prune_expired_tokens(), 0)
+        self.assertEqual(prune_expired_tokens(now=timezone.now() + timedelta(days=2)), outstanding)
+        self.assertFalse(OutstandingToken.objects.exists())
+
+
+class ClientIpTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_remote_addr_without_proxies(self):
+        request = self.factory.get('/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.7')
+        self.assertEqual(client_ip(request), '10.0.0.1')
+
+    @override_settings(NUM_PROXIES=1)
+    def test_forwarded_address_behind_trusted_proxy(self):
+        # The client prepended a spoofed address; only the one the proxy appended is trusted
+        request = self.factory.get('/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='198.51.100.1, 203.0.113.7')
+        self.assertEqual(client_ip(request), '203.0.113.7')
+
+    @override_settings(NUM_PROXIES=1)
+    def test_remote_addr_when_header_is_missing(self):
+        self.assertEqual(client_ip(self.factory.get('/', REMOTE_ADDR='10.0.0.1')), '10.0.0.1')
+
+    @override_settings(NUM_PROXIES=1, MPESA_CALLBACK_TOKEN='secret', MPESA_ALLOWED_IPS=['196.201.214.200'])
+    def test_mpesa_allowlist_behind_proxy(self):
+        body = b'{"Body": {"stkCallback": {"CheckoutRequestID": "ws_CO_1", "ResultCode": 0}}}'
+        request = self.factory.post('/', body, content_type='application/json', REMOTE_ADDR='10.0.0.1',
+                                    HTTP_X_FORWARDED_FOR='196.201.214.200')
+        self.assertEqual(parse_mpesa(request, 'secret').event_id, 'ws_CO_1')
+
+        request = self.factory.post('/', body, content_type='application/json', REMOTE_ADDR='196.201.214.200',
+                                    HTTP_X_FORWARDED_FOR='203.0.113.7')
+        with self.assertRaises(WebhookVerificationError):
+            parse_mpesa(request, 'secret')
+
+
+@override_settings(LOGIN_THROTTLE_RATES={'ip': (5, 60), 'account': (3, 300)})
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='member', email='member@example.com', password='right')
+        self.client = APIClient()
+
+    def test_account_is_refused_after_its_limit(self):
+        for _ in range(3):
+            response = self.client.post('/api/auth/login/', {'username': 'member', 'password': 'wrong'}, format='json')
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/auth/login/', {'username': 'member', 'password': 'right'}, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+    def test_successful_login_clears_account_window(self):
+        factory = RequestFactory()
+        for i in range(2):
+            self.assertIsNone(authenticate_login(factory.post('/', REMOTE_ADDR=f'10.0.0.{i}'), 'member', 'wrong').user)
+        self.assertEqual(authenticate_login(factory.post('/', REMOTE_ADDR='10.0.0.2'), 'member', 'right').user, self.user)
+        for i in range(3):
+            authenticate_login(factory.post('/', REMOTE_ADDR=f'10.0.1.{i}'), 'member', 'wrong')
+        with self.assertRaises(LoginThrottled):
+            authenticate_login(factory.post('/', REMOTE_ADDR='10.0.2.1'), 'member', 'wrong')
+
+    def test_ip_limit_covers_all_accounts(self):
+        request = RequestFactory().post('/', REMOTE_ADDR='10.0.0.1')
+        for i in range(5):
+            authenticate_login(request, f'nobody{i}', 'wrong')
+        with self.assertRaises(LoginThrottled):
+            authenticate_login(request, 'member', 'right')
+
+    def test_concurrent_attempts_cannot_exceed_limit(self):
+        key = bucket_key('account', 'concurrent')
+        with ThreadPoolExecutor(8) as pool:
+            waits = list(pool.map(lambda _: take_attempt(key, 10, 60), range(40)))
+        self.assertEqual(waits.count(0), 10)
+
+
+class IdempotencyKeyTests(TestCase):
+    url = '/api/auth/contact/'
+    message = {'name': 'Member', 'email': 'member@example.com', 'subject': 'Hello', 'message': 'Hi there'}
+
+    def setUp(self):
+        cache.clear()
+
+    def post(self, data, key=None):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        return self.client.post(self.url, data, content_type='application/json', **headers)
+
+    def test_replayed_key_returns_stored_response_without_rerunning_view(self):
+        first = self.post(self.message, 'key-1')
+        self.assertEqual(first.status_code, 201)
+        with self.assertNumQueries(0):
+            replayed = self.post(self.message, 'key-1')
+        self.assertEqual((replayed.status_code, replayed.json()), (201, first.json()))
+        self.assertEqual(replayed['Idempotent-Replayed'], 'true')
+        self.assertEqual(ContactMessage.objects.count(), 1)
+
+        # The stored row answers once the cache has forgotten the key
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.post(self.message, 'key-1').status_code, 201)
+        self.assertEqual(ContactMessage.objects.count(), 1)
+
+        self.assertEqual(self.post({**self.message, 'subject': 'Other'}, 'key-1').status_code, 422)
+        self.post(self.message)
+        self.post(self.message)
+        self.assertEqual(ContactMessage.objects.count(), 3)
+
+    @override_settings(IDEMPOTENCY_WAIT_SECONDS=0.1)
+    def test_concurrent_duplicate_is_held_then_rejected(self):
+        request = mock.Mock(method='POST', path=self.url, user=mock.Mock(is_authenticated=False))
+        cache.add(lock_cache_key(scoped_key(request, 'key-2')), 1, 30)
+        response = self.post(self.message, 'key-2')
+        self.assertEqual((response.status_code, response['Retry-After']), (409, '1'))
+        self.assertFalse(ContactMessage.objects.exists())
+        self.assertFalse(IdempotencyRecord.objects.exists())
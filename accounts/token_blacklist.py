@@ -0,0 +1,78 @@
+"""
+Refresh-token blacklist cache and pruning.
+
+simplejwt checks ``BlacklistedToken`` on every refresh and writes an
+``OutstandingToken``/``BlacklistedToken`` pair for every rotated token. Here
+each refresh token's state is also kept in the cache under its JTI until the
+token expires: ``active`` when it is issued, ``blacklisted`` once it has been
+used or revoked. Blacklisted tokens are rejected without a query, and with a
+shared cache (``TOKEN_BLACKLIST_TRUST_CACHE``) tokens known to be active skip
+the query too. A JTI the cache has no state for, for example after an eviction,
+is checked in the database, so eviction can only cost a query and never let a
+revoked token through. ``prune_expired_tokens`` deletes rows for tokens that
+have expired, since their JTIs can no longer be presented.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+TOKEN_STATE_PREFIX = 'accounts:jwt_state'
+ACTIVE = 'active'
+BLACKLISTED = 'blacklisted'
+
+
+def token_state_key(jti):
+    return f'{TOKEN_STATE_PREFIX}:{jti}'
+
+
+def seconds_until(exp):
+    return max(int(exp - time.time()), 1)
+
+
+def remember_issued(jti, exp):
+    # add() so a late write can never overwrite a blacklisted state
+    cache.add(token_state_key(jti), ACTIVE, seconds_until(exp))
+
+
+def remember_blacklisted(jti, exp):
+    cache.set(token_state_key(jti), BLACKLISTED, seconds_until(exp))
+
+
+def is_blacklisted(jti, exp):
+    state = cache.get(token_state_key(jti))
+    if state == BLACKLISTED:
+        return True
+    if state == ACTIVE and settings.TOKEN_BLACKLIST_TRUST_CACHE:
+        return False
+
+    blacklisted = BlacklistedToken.objects.filter(token__jti=jti).exists()
+    # Only the positive answer is cached; a negative one could race a concurrent blacklist
+    if blacklisted:
+        remember_blacklisted(jti, exp)
+    return blacklisted
+
+
+def prune_expired_tokens(batch_size=1000, now=None):
+    """
+    Delete outstanding tokens that have expired, along with their blacklist
+    rows, ``batch_size`` at a time in primary-key order so each batch is a
+    short transaction. Returns the number of outstanding tokens deleted.
+    """
+    now = now or timezone.now()
+    deleted = 0
+    last_id = 0
+    while True:
+        ids = list(
+            OutstandingToken.objects.filter(id__gt=last_id, expires_at__lte=now)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        # The blacklist rows go with them through the cascade
+        OutstandingToken.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+        last_id = ids[-1]
+    return deleted
@@ -1,7 +1,6 @@
 from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
 from django.db import models
 from .serializers import (
@@ -10,7 +9,12 @@ from .serializers import (
     UserSerializer,
     UserProfileSerializer
 )
-from .jwt_utils import CustomRefreshToken
+from .jwt_utils import CachedBlacklistRefreshToken, CustomRefreshToken
+from .login import LoginThrottled, authenticate_login
+from .dashboard import get_summary
+from .activity import serialize_activity, user_activities
+from .idempotency import idempotent
+from admin_api.pagination import KeysetPagination
 from notifications.email_service import send_welcome_email, send_password_reset_email, generate_password_reset_url, send_contact_form_notification
 from notifications.models import ContactMessage
 
@@ -43,16 +47,36 @@ class RegisterView(generics.CreateAPIView):
             }
         }, status=status.HTTP_201_CREATED)
 
+def login_response(request, identifier, password):
+    """Authenticate through the login service and issue tokens"""
+    try:
+        result = authenticate_login(request, identifier, password)
+    except LoginThrottled as e:
+        return Response({'error': 'Too many login attempts. Please try again later.'},
+                        status=status.HTTP_429_TOO_MANY_REQUESTS, headers={'Retry-After': str(e.retry_after)})
+
+    user = result.user
+    if user and user.is_active:
+        refresh = CustomRefreshToken.for_user(user)
+        
+        user_data = UserSerializer(user).data
+        user_data['is_admin'] = user.is_staff or user.is_superuser
+        
+        response = Response({
+            'user': user_data,
+            'tokens': {
+                'refresh': str(refresh),
+                'access': str(refresh.access_token),
+            }
+        })
+    else:
+        response = Response({'error': 'Invalid credentials'}, status=status.HTTP_400_BAD_REQUEST)
+    response['Server-Timing'] = result.server_timing
+    return response
+
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
 def login_view(request):
-    from django.contrib.auth import authenticate
-    import logging
-    logger = logging.getLogger(__name__)
-    
-    # Debug: Log incoming data
-    logger.error(f"Login request data: {request.data}")
-    
     # Get credentials from request - handle multiple field names
     username = request.data.get('username')
     email = request.data.get('email')
@@ -61,50 +85,10 @@ def login_view(request):
     # Use identifier as fallback (some frontends send this)
     identifier = request.data.get('identifier') or username or email
     
-    logger.error(f"Identifier: {identifier}, Password: {'***' if password else None}")
-    
     if not identifier or not password:
         return Response({'error': 'Username/email and password are required'}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Try to authenticate
-    user = None
-    auth_email = None
-    
-    # If identifier looks like email, use it directly
-    if '@' in identifier:
-        auth_email = identifier
-        logger.error(f"Using email directly: {auth_email}")
-    else:
-        # If it's a username, find the user and get their email
-        try:
-            user_obj = User.objects.get(username=identifier)
-            auth_email = user_obj.email
-            logger.error(f"Found user: {user_obj.username}, email: {auth_email}")
-        except User.DoesNotExist:
-            logger.error(f"User not found: {identifier}")
-            return Response({'error': 'Invalid credentials'}, status=status.HTTP_400_BAD_REQUEST)
-    
-    # Authenticate using email (since USERNAME_FIELD = 'email')
-    if auth_email:
-        logger.error(f"Authenticating with email: {auth_email}")
-        user = authenticate(username=auth_email, password=password)
-        logger.error(f"Authentication result: {user}")
-    
-    if user and user.is_active:
-        refresh = CustomRefreshToken.for_user(user)
-        
-        user_data = UserSerializer(user).data
-        user_data['is_admin'] = user.is_staff or user.is_superuser
-        
-        return Response({
-            'user': user_data,
-            'tokens': {
-                'refresh': str(refresh),
-                'access': str(refresh.access_token),
-            }
-        })
-    else:
-        return Response({'error': 'Invalid credentials'}, status=status.HTTP_400_BAD_REQUEST)
+    return login_response(request, identifier, password)
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
@@ -128,11 +112,12 @@ def update_profile_view(request):
 @permission_classes([permissions.IsAuthenticated])
 def user_stats_view(request):
     user = request.user
+    summary = get_summary(user)
     stats = {
-        'applications': user.applications.count() if hasattr(user, 'applications') else 0,
-        'payments': user.payment_set.filter(status='completed').count() if hasattr(user, 'payment_set') else 0,
+        'applications': summary.total_applications,
+        'payments': summary.completed_payments,
         'membershipStatus': getattr(user, 'membership_status', 'active'),
-        'totalPaid': 0
+        'totalPaid': float(summary.total_paid)
     }
     return Response(stats)
 
@@ -153,6 +138,7 @@ def password_reset_request(request):
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@idempotent
 def contact_form(request):
     data = request.data
     required_fields = ['name', 'email', 'subject', 'message']
@@ -185,7 +171,7 @@ def logout_view(request):
         
         if refresh_token:
             # Blacklist the refresh token
-            token = RefreshToken(refresh_token)
+            token = CachedBlacklistRefreshToken(refresh_token)
             token.blacklist()
         
         return Response({'message': 'Successfully logged out'}, status=200)
@@ -196,38 +182,21 @@ def logout_view(request):
 @permission_classes([permissions.AllowAny])
 def simple_login(request):
     """Simple working login endpoint"""
-    from django.contrib.auth import authenticate
-    
     identifier = request.data.get('identifier') or request.data.get('email')
     password = request.data.get('password')
     
     if not identifier or not password:
         return Response({'error': 'Email and password required'}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Authenticate user
-    user = authenticate(username=identifier, password=password)
-    
-    if user and user.is_active:
-        refresh = CustomRefreshToken.for_user(user)
-        
-        user_data = UserSerializer(user).data
-        user_data['is_admin'] = user.is_staff or user.is_superuser
-        
-        return Response({
-            'user': user_data,
-            'tokens': {
-                'refresh': str(refresh),
-                'access': str(refresh.access_token),
-            }
-        })
-    else:
-        return Response({'error': 'Invalid credentials'}, status=status.HTTP_400_BAD_REQUEST)
+    return login_response(request, identifier, password)
 
 @api_view(['GET'])
-@permission_classes([permissions.AllowAny])
+@permission_classes([permissions.IsAuthenticated])
 def activities_view(request):
-    """Get user activities/notifications"""
-    return Response([])
+    """Get the user's activity feed, newest first, paged by cursor"""
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(user_activities(request.user), request)
+    return paginator.get_paginated_response([serialize_activity(event) for event in page])
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
@@ -0,0 +1,435 @@
+"""
+Deterministic synthetic data for benchmarks and capacity tests.
+
+``DatasetGenerator`` creates members in chunks and, for each chunk, bulk-inserts
+their applications, claims, payments, beneficiaries, notifications, contact
+messages and activity log rows with distributions shaped like production. The same ``seed`` always
+produces the same rows, and memory use stays flat however many members are
+generated.
+"""
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.activity import build_activity
+from accounts.models import ActivityEvent
+from applications.models import Application
+from beneficiaries.models import Beneficiary
+from claims.models import Beneficiary as BenefitRecipient, Claim
+from notifications.models import Announcement, ContactMessage, Event, EventRegistration, Meeting, Notification
+from payments.models import Payment
+
+User = get_user_model()
+
+FIRST_NAMES = [
+    'Wanjiru', 'Kamau', 'Achieng', 'Otieno', 'Njeri', 'Mwangi', 'Akinyi', 'Odhiambo', 'Wambui', 'Kipchoge',
+    'Chebet', 'Kiprono', 'Nyambura', 'Mutua', 'Moraa', 'Ochieng', 'Wairimu', 'Kibet', 'Atieno', 'Njoroge',
+    'Grace', 'David', 'Mary', 'John', 'Faith', 'Peter', 'Joyce', 'James', 'Esther', 'Daniel',
+]
+LAST_NAMES = [
+    'Kariuki', 'Omondi', 'Wanjala', 'Mutiso', 'Kiplagat', 'Onyango', 'Gitau', 'Nyaga', 'Barasa', 'Cheruiyot',
+    'Maina', 'Owino', 'Kilonzo', 'Rotich', 'Macharia', 'Okoth', 'Waweru', 'Langat', 'Ndungu', 'Auma',
+]
+CITIES = [
+    ('Minneapolis', 'MN', '55401'), ('Saint Paul', 'MN', '55101'), ('Brooklyn Park', 'MN', '55443'),
+    ('Bloomington', 'MN', '55420'), ('Eden Prairie', 'MN', '55344'), ('Burnsville', 'MN', '55337'),
+    ('Rochester', 'MN', '55901'), ('Maple Grove', 'MN', '55369'),
+]
+OCCUPATIONS = ['Nurse', 'Engineer', 'Teacher', 'Driver', 'Accountant', 'Caregiver', 'Student', 'Pharmacist', '']
+
+# (value, weight) pairs; weights need not sum to 100
+MEMBERSHIP_STATUSES = [('active', 80), ('pending', 12), ('inactive', 5), ('suspended', 3)]
+APPLICATION_TYPES = [('single', 65), ('double', 35)]
+APPLICATION_STATUSES = [('approved', 75), ('pending', 15), ('rejected', 10)]
+CLAIM_TYPES = [('medical', 35), ('emergency', 25), ('education', 20), ('death', 10), ('other', 10)]
+CLAIM_STATUSES = [('approved', 45), ('pending', 25), ('rejected', 15), ('paid', 15)]
+PAYMENT_METHODS = [('stripe', 45), ('paypal', 35), ('mpesa', 15), ('bank_transfer', 5)]
+PAYMENT_STATUSES = [('completed', 85), ('pending', 8), ('failed', 5), ('refunded', 2)]
+RELATIONSHIPS = [('child', 40), ('spouse', 25), ('parent', 20), ('sibling', 10), ('other', 5)]
+CONTACT_STATUSES = [('resolved', 70), ('pending', 20), ('in_progress', 10)]
+NOTIFICATION_TYPES = [
+    ('general', 30), ('announcement', 20), ('event_created', 15), ('payment_received', 15),
+    ('application_submitted', 5), ('application_approved', 5), ('claim_submitted', 5), ('claim_approved', 5),
+]
+
+# Expected rows per member at scale 1.0
+APPLICATION_RATE = 0.9
+CLAIM_RATE = 0.4
+DUES_PAYMENT_RATE = 2.0
+BENEFICIARY_RATE = 1.5
+BENEFIT_RECIPIENT_RATE = 0.3
+NOTIFICATION_RATE = 10.0
+CONTACT_MESSAGE_RATE = 0.1
+EVENT_REGISTRATION_RATE = 0.03  # share of members registering for each event
+
+HISTORY_DAYS = 3 * 365
+
+
+def auto_timestamp_fields(model):
+    return [field.attname for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)]
+
+
+class DatasetGenerator:
+    def __init__(self, users=1000, scale=1.0, seed=42, prefix='gen', password='password123',
+                 batch_size=2000, chunk_size=1000, admin=None, log=None):
+        self.users = users
+        self.scale = scale
+        self.rng = random.Random(seed)
+        self.prefix = prefix
+        self.password_hash = make_password(password)
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.admin = admin
+        self.log = log or (lambda message: None)
+        self.now = timezone.now()
+        self.counts = {}
+
+    # -- helpers ---------------------------------------------------------
+
+    def pick(self, choices):
+        values, weights = zip(*choices)
+        return self.rng.choices(values, weights=weights)[0]
+
+    def count(self, rate):
+        """Integer count with expectation ``rate * scale``."""
+        expected = rate * self.scale
+        whole = int(expected)
+        return whole + (1 if self.rng.random() < expected - whole else 0)
+
+    def moment_after(self, start, max_days):
+        end = min(start + timedelta(days=max_days), self.now)
+        return start + (end - start) * self.rng.random()
+
+    def person(self):
+        return f'{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}'
+
+    def phone(self):
+        return f'612-{self.rng.randint(200, 999)}-{self.rng.randint(1000, 9999)}'
+
+    def money(self, low, high):
+        return Decimal(self.rng.randint(low * 100, high * 100)) / 100
+
+    def insert(self, model, rows):
+        """
+        Bulk-insert ``rows``, then write back the historical timestamps they
+        were built with, which ``bulk_create`` replaces with now() for
+        auto_now/auto_now_add fields.
+        """
+        fields = auto_timestamp_fields(model)
+        stamps = [[getattr(row, field) for field in fields] for row in rows]
+        created = model.objects.bulk_create(rows, batch_size=self.batch_size)
+        if fields:
+            for row, values in zip(created, stamps):
+                for field, value in zip(fields, values):
+                    if value is not None:
+                        setattr(row, field, value)
+            model.objects.bulk_update(created, fields, batch_size=self.batch_size)
+        self.counts[model.__name__] = self.counts.get(model.__name__, 0) + len(created)
+        return created
+
+    # -- entry points ----------------------------------------------------
+
+    def generate(self):
+        """Create ``users`` members with their history plus site content; returns row counts per model."""
+        if User.objects.filter(username__startswith=f'{self.prefix}-').exists():
+            raise ValueError(f'Members with prefix "{self.prefix}-" already exist; pick another prefix')
+
+        if self.admin is None:
+            self.admin = User.objects.filter(is_superuser=True).order_by('id').first() or User.objects.create_superuser(
+                username=f'{self.prefix}-admin', email=f'{self.prefix}-admin@example.com', password='password123',
+                first_name='Dataset', last_name='Admin',
+            )
+
+        user_ids = []
+        for start in range(0, self.users, self.chunk_size):
+            with transaction.atomic():
+                members = self.create_members(start, min(start + self.chunk_size, self.users))
+                self.populate(members)
+            user_ids.extend(member.pk for member in members)
+            self.log(f'{start + len(members)}/{self.users} members, {sum(self.counts.values())} rows')
+
+        with transaction.atomic():
+            self.create_content(user_ids)
+        return self.counts
+
+    def create_members(self, start, stop):
+        members = []
+        for i in range(start, stop):
+            first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+            city, state, zip_code = self.rng.choice(CITIES)
+            joined = self.now - timedelta(days=HISTORY_DAYS * self.rng.random())
+            members.append(User(
+                username=f'{self.prefix}-{i}',
+                email=f'{self.prefix}-{i}@example.com',
+                first_name=first,
+                last_name=last,
+                password=self.password_hash,
+                phone=self.phone(),
+                city=city,
+                state=state,
+                zip_code=zip_code,
+                membership_status=self.pick(MEMBERSHIP_STATUSES),
+                date_joined=joined,
+                created_at=joined,
+                updated_at=joined,
+            ))
+        return self.insert(User, members)
+
+    def populate(self, members):
+        """Bulk-insert the per-member history for already saved ``members``."""
+        applications = self.insert(Application, [
+            self.application(member) for member in members for _ in range(self.count(APPLICATION_RATE))
+        ])
+        claims = self.insert(Claim, [
+            self.claim(member) for member in members for _ in range(self.count(CLAIM_RATE))
+        ])
+        payments = [self.registration_payment(app) for app in applications if app.status == 'approved']
+        payments += [self.dues_payment(member) for member in members for _ in range(self.count(DUES_PAYMENT_RATE))]
+        payments = self.insert(Payment, payments)
+        self.insert(Beneficiary, [
+            self.beneficiary(member, n) for member in members for n in range(self.count(BENEFICIARY_RATE))
+        ])
+        self.insert(BenefitRecipient, [
+            self.benefit_recipient(member, n) for member in members for n in range(self.count(BENEFIT_RECIPIENT_RATE))
+        ])
+        self.insert(Notification, [
+            self.notification(member) for member in members for _ in range(self.count(NOTIFICATION_RATE))
+        ])
+        self.insert(ContactMessage, [
+            self.contact_message(member) for member in members for _ in range(self.count(CONTACT_MESSAGE_RATE))
+        ])
+
+        self.insert(ActivityEvent, [
+            *self.activity(applications, lambda app: 'pending',
+                           lambda app: app.approved_at or self.moment_after(app.created_at, 10)),
+            *self.activity(claims, lambda claim: 'pending', lambda claim: claim.reviewed_at),
+            *self.activity(payments, lambda payment: 'completed' if payment.status == 'completed' else 'pending',
+                           lambda payment: self.moment_after(payment.created_at, 3)),
+        ])
+
+    def activity(self, rows, initial_status, changed_at):
+        """
+        The activity log ``accounts.signals`` would have written for ``rows``:
+        the creation, plus a status change for rows that moved on from
+        ``initial_status``, described by ``accounts.activity``.
+        """
+        events = []
+        for row in rows:
+            status = row.status
+            row.status = initial_status(row)
+            events.append(build_activity(row, True, row.created_at))
+            row.status = status
+            if status != initial_status(row):
+                events.append(build_activity(row, False, changed_at(row)))
+        return events
+
+    def create_content(self, user_ids):
+        events_count = max(5, int(len(user_ids) / 500 * self.scale))
+        events = self.insert(Event, [self.event(i) for i in range(events_count)])
+        self.insert(Announcement, [self.announcement(i) for i in range(max(5, events_count // 2))])
+        self.insert(Meeting, [self.meeting(i) for i in range(max(5, events_count // 2))])
+
+        per_event = min(len(user_ids), int(len(user_ids) * EVENT_REGISTRATION_RATE * self.scale))
+        for event in events:
+            self.insert(EventRegistration, [
+                EventRegistration(event=event, user_id=user_id, attended=event.date < self.now and self.rng.random() < 0.7,
+                                  registered_at=self.moment_after(event.created_at, 30))
+                for user_id in self.rng.sample(user_ids, per_event)
+            ])
+
+    # -- row builders ----------------------------------------------------
+
+    def application(self, member):
+        application_type = self.pick(APPLICATION_TYPES)
+        status = self.pick(APPLICATION_STATUSES)
+        created = self.moment_after(member.date_joined, 14)
+        family = {
+            'parent_1': self.person(),
+            'parent_2': self.person() if self.rng.random() < 0.8 else '',
+            'sibling_1': self.person() if self.rng.random() < 0.7 else '',
+            'sibling_2': self.person() if self.rng.random() < 0.4 else '',
+            'sibling_3': self.person() if self.rng.random() < 0.15 else '',
+        }
+        if application_type == 'double':
+            family.update({
+                'spouse_name': self.person(),
+                'spouse_phone': self.phone(),
+                'spouse_parent_1': self.person(),
+                'spouse_parent_2': self.person() if self.rng.random() < 0.7 else '',
+            })
+            for n in range(1, self.rng.choices(range(6), weights=[15, 20, 30, 20, 10, 5])[0] + 1):
+                family[f'child_{n}'] = f'{self.rng.choice(FIRST_NAMES)} {member.last_name}'
+        return Application(
+            user=member,
+            application_type=application_type,
+            status=status,
+            first_name=member.first_name,
+            last_name=member.last_name,
+            email=member.email,
+            phone=member.phone,
+            address=f'{self.rng.randint(100, 9999)} {self.rng.choice(LAST_NAMES)} Ave',
+            city=member.city,
+            state=member.state,
+            zip_code=member.zip_code,
+            occupation=self.rng.choice(OCCUPATIONS),
+            emergency_contact_name=self.person(),
+            emergency_contact_phone=self.phone(),
+            emergency_contact_relationship=self.pick(RELATIONSHIPS),
+            amount=Decimal('400.00') if application_type == 'double' else Decimal('200.00'),
+            registration_fee=Decimal('50.00'),
+            constitution_agreed=True,
+            identity_document_status='approved' if status == 'approved' else 'pending',
+            approved_at=self.moment_after(created, 10) if status == 'approved' else None,
+            approved_by=self.admin if status == 'approved' else None,
+            rejection_reason='Incomplete family details' if status == 'rejected' else '',
+            created_at=created,
+            updated_at=created,
+            **family,
+        )
+
+    def claim(self, member):
+        status = self.pick(CLAIM_STATUSES)
+        requested = self.money(200, 5000)
+        created = self.moment_after(member.date_joined, HISTORY_DAYS)
+        reviewed = status != 'pending'
+        return Claim(
+            user=member,
+            claim_type=self.pick(CLAIM_TYPES),
+            amount_requested=requested,
+            amount_approved=requested if status in ('approved', 'paid') else None,
+            description='Support requested for a family emergency.',
+            status=status,
+            reviewed_by=self.admin if reviewed else None,
+            reviewed_at=self.moment_after(created, 7) if reviewed else None,
+            created_at=created,
+            updated_at=created,
+        )
+
+    def payment(self, member, amount, created, status, description):
+        method = self.pick(PAYMENT_METHODS)
+        reference = f'{self.prefix}{self.rng.getrandbits(48):012x}'
+        return Payment(
+            user=member,
+            amount=amount,
+            payment_method=method,
+            status=status,
+            payer_name=f'{member.first_name} {member.last_name}',
+            payer_email=member.email,
+            stripe_payment_intent_id=f'pi_{reference}' if method == 'stripe' else '',
+            paypal_order_id=f'PAYID-{reference}' if method == 'paypal' else '',
+            transaction_id=reference,
+            description=description,
+            created_at=created,
+            updated_at=created,
+            completed_at=created if status == 'completed' else None,
+        )
+
+    def registration_payment(self, application):
+        return self.payment(
+            application.user, application.amount + application.registration_fee,
+            self.moment_after(application.created_at, 3), 'completed', 'Membership registration',
+        )
+
+    def dues_payment(self, member):
+        return self.payment(
+            member, self.money(20, 100), self.moment_after(member.date_joined, HISTORY_DAYS),
+            self.pick(PAYMENT_STATUSES), 'Membership dues',
+        )
+
+    def beneficiary(self, member, n):
+        created = self.moment_after(member.date_joined, 60)
+        return Beneficiary(
+            user=member,
+            name=f'{self.rng.choice(FIRST_NAMES)} {member.last_name} {n + 1}',
+            relationship=self.pick(RELATIONSHIPS),
+            phone=self.phone(),
+            percentage=Decimal('100.00') if n == 0 else Decimal('0.00'),
+            is_primary=n == 0,
+            created_at=created,
+            updated_at=created,
+        )
+
+    def benefit_recipient(self, member, n):
+        created = self.moment_after(member.date_joined, HISTORY_DAYS)
+        return BenefitRecipient(
+            user=member,
+            name=f'{self.rng.choice(FIRST_NAMES)} {member.last_name} {n + 1}',
+            relationship=self.pick(RELATIONSHIPS),
+            phone=self.phone(),
+            total_benefits_received=self.money(0, 3000),
+            last_benefit_date=self.moment_after(created, 365) if self.rng.random() < 0.6 else None,
+            created_at=created,
+            updated_at=created,
+        )
+
+    def contact_message(self, member):
+        status = self.pick(CONTACT_STATUSES)
+        created = self.moment_after(member.date_joined, HISTORY_DAYS)
+        return ContactMessage(
+            name=f'{member.first_name} {member.last_name}',
+            email=member.email,
+            phone=member.phone,
+            subject='Question about my membership',
+            help_type='general',
+            message='Could you please confirm the status of my membership?',
+            status=status,
+            resolved_at=self.moment_after(created, 5) if status == 'resolved' else None,
+            created_at=created,
+        )
+
+    def notification(self, member):
+        notification_type = self.pick(NOTIFICATION_TYPES)
+        return Notification(
+            user=member,
+            title=dict(Notification.NOTIFICATION_TYPES)[notification_type],
+            message='You have a new update from Pamoja Kenya MN.',
+            notification_type=notification_type,
+            is_read=self.rng.random() < 0.7,
+            created_at=self.moment_after(member.date_joined, HISTORY_DAYS),
+        )
+
+    def event(self, i):
+        created = self.now - timedelta(days=HISTORY_DAYS * self.rng.random())
+        return Event(
+            title=f'Community Event {i + 1}',
+            description='Members gathering with food, music and updates from the committee.',
+            date=created + timedelta(days=self.rng.randint(7, 60)),
+            location=f'{self.rng.choice(CITIES)[0]} Community Center',
+            is_featured=self.rng.random() < 0.1,
+            registration_required=self.rng.random() < 0.5,
+            created_by=self.admin,
+            created_at=created,
+            updated_at=created,
+        )
+
+    def announcement(self, i):
+        created = self.now - timedelta(days=HISTORY_DAYS * self.rng.random())
+        return Announcement(
+            title=f'Announcement {i + 1}',
+            content='Please note the following update for all members.',
+            priority=self.rng.choice(['low', 'medium', 'medium', 'high', 'urgent']),
+            is_pinned=self.rng.random() < 0.05,
+            expires_at=created + timedelta(days=self.rng.randint(14, 120)),
+            created_by=self.admin,
+            created_at=created,
+            updated_at=created,
+        )
+
+    def meeting(self, i):
+        created = self.now - timedelta(days=HISTORY_DAYS * self.rng.random())
+        return Meeting(
+            title=f'Committee Meeting {i + 1}',
+            description='Monthly committee meeting.',
+            date=created + timedelta(days=self.rng.randint(3, 30)),
+            duration=self.rng.choice([30, 60, 90]),
+            type=self.rng.choice(['zoom', 'teams', 'google', 'physical']),
+            created_by=self.admin,
+            created_at=created,
+            updated_at=created,
+        )
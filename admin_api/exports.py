@@ -0,0 +1,77 @@
+import csv
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from applications.models import Application
+from claims.models import Claim
+from payments.models import Payment
+
+User = get_user_model()
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Spreadsheets evaluate cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+# resource name -> (queryset factory, exported columns)
+EXPORT_RESOURCES = {
+    'members': (
+        lambda: User.objects.all(),
+        ['id', 'username', 'email', 'first_name', 'last_name', 'phone', 'city', 'state',
+         'membership_status', 'role', 'is_active', 'is_staff', 'created_at'],
+    ),
+    'applications': (
+        lambda: Application.objects.all(),
+        ['id', 'user_id', 'application_type', 'status', 'first_name', 'last_name', 'email',
+         'phone', 'city', 'state', 'amount', 'registration_fee', 'approved_at', 'created_at'],
+    ),
+    'claims': (
+        lambda: Claim.objects.all(),
+        ['id', 'user_id', 'user__username', 'claim_type', 'amount_requested', 'amount_approved',
+         'status', 'reviewed_at', 'created_at'],
+    ),
+    'payments': (
+        lambda: Payment.objects.all(),
+        ['id', 'user_id', 'user__username', 'user__email', 'application_id', 'amount', 'currency',
+         'payment_method', 'status', 'payer_name', 'payer_email', 'transaction_id',
+         'paypal_order_id', 'stripe_payment_intent_id', 'created_at', 'completed_at'],
+    ),
+}
+
+
+class Echo:
+    """File-like object that hands written rows straight back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(resource):
+    """Stream the rows of an export resource as tuples, reading in server-side chunks."""
+    queryset_factory, columns = EXPORT_RESOURCES[resource]
+    queryset = queryset_factory().order_by('id').values_list(*columns)
+    return columns, queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def stream_ndjson(resource):
+    columns, rows = export_rows(resource)
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def csv_cell(value):
+    """Quote member-entered text that a spreadsheet would otherwise run as a formula."""
+    if value is None:
+        return ''
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(resource):
+    columns, rows = export_rows(resource)
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([csv_cell(value) for value in row])
@@ -0,0 +1,278 @@
+"""
+HTTP load generator for the ``load_test`` command.
+
+Worker threads each play a virtual member (or admin) and loop over weighted
+scenarios against a running server. Every request is recorded under its step
+name so the report shows req/s, latency percentiles and error rates per
+endpoint as well as for the whole run.
+"""
+import random
+import statistics
+import threading
+import time
+
+import requests
+
+# A tiny but valid PDF so claim uploads go through the real multipart/file path
+SAMPLE_DOCUMENT = (
+    b'%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n'
+    b'2 0 obj<</Type/Pages/Kids[]/Count 0>>endobj\ntrailer<</Root 1 0 R>>\n%%EOF\n'
+)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+class Recorder:
+    """Thread-safe collection of (step, latency, ok, status) samples."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.statuses = {}
+        self.iterations = {}
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def add(self, step, elapsed_ms, ok, status):
+        with self.lock:
+            self.samples.setdefault(step, []).append((elapsed_ms, ok))
+            counts = self.statuses.setdefault(step, {})
+            counts[status] = counts.get(status, 0) + 1
+
+    def add_iteration(self, scenario, ok):
+        with self.lock:
+            counts = self.iterations.setdefault(scenario, {'completed': 0, 'failed': 0})
+            counts['completed' if ok else 'failed'] += 1
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def summary(self):
+        elapsed = self.elapsed
+        steps = {step: summarize(samples, elapsed) for step, samples in sorted(self.samples.items())}
+        for step, stats in steps.items():
+            stats['statuses'] = {str(code): count for code, count in sorted(self.statuses[step].items(), key=str)}
+        everything = [sample for samples in self.samples.values() for sample in samples]
+        return {
+            'duration_s': round(elapsed, 2),
+            'overall': summarize(everything, elapsed),
+            'steps': steps,
+            'scenarios': self.iterations,
+        }
+
+
+def summarize(samples, elapsed):
+    latencies = [ms for ms, _ in samples]
+    errors = sum(1 for _, ok in samples if not ok)
+    if not latencies:
+        return {'requests': 0, 'errors': 0, 'error_rate': 0.0, 'rps': 0.0}
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'error_rate': round(errors / len(latencies), 4),
+        'rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(statistics.fmean(latencies), 2),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'max_ms': round(max(latencies), 2),
+    }
+
+
+class VirtualUser:
+    """One simulated client: its own HTTP session, credentials and access token."""
+
+    def __init__(self, base_url, email, password, recorder, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.email = email
+        self.password = password
+        self.recorder = recorder
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.token = None
+
+    def request(self, step, method, path, expect=(200,), **kwargs):
+        headers = kwargs.pop('headers', {})
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, headers=headers, timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            self.recorder.add(step, (time.perf_counter() - started) * 1000, False, type(e).__name__)
+            return None
+        ok = response.status_code in expect
+        self.recorder.add(step, (time.perf_counter() - started) * 1000, ok, response.status_code)
+        return response if ok else None
+
+    def login(self):
+        self.token = None
+        response = self.request('login', 'POST', '/api/auth/login/',
+                                json={'email': self.email, 'password': self.password})
+        if response is None:
+            return False
+        self.token = response.json().get('tokens', {}).get('access')
+        return bool(self.token)
+
+    def ensure_login(self):
+        return bool(self.token) or self.login()
+
+
+def member_flow(user, rng):
+    """Log in, then load the dashboard the way the frontend does."""
+    if not user.login():
+        return False
+    results = [
+        user.request('dashboard stats', 'GET', '/api/dashboard/stats/'),
+        user.request('activities', 'GET', '/api/activities/'),
+        user.request('notifications', 'GET', '/api/notifications/user/'),
+    ]
+    return all(r is not None for r in results)
+
+
+def submit_application(user, rng):
+    if not user.ensure_login():
+        return False
+    payload = {
+        'application_type': rng.choice(['single', 'double']),
+        'first_name': 'Load',
+        'last_name': f'Test{rng.randint(1, 99999)}',
+        'email': user.email,
+        'phone': f'555{rng.randint(1000000, 9999999)}',
+        'address': f'{rng.randint(1, 9999)} Load Test Ave',
+        'city': 'Seattle',
+        'state': 'WA',
+        'zip_code': '98101',
+        'constitution_agreed': True,
+    }
+    return user.request('submit application', 'POST', '/api/applications/submit/', expect=(201,), json=payload) is not None
+
+
+def submit_claim(user, rng):
+    if not user.ensure_login():
+        return False
+    data = {
+        'claim_type': rng.choice(['death', 'medical', 'education', 'emergency', 'other']),
+        'amount_requested': str(rng.randint(100, 5000)),
+        'description': 'Load test claim',
+    }
+    files = {'supporting_documents': (f'claim-{rng.randint(1, 99999)}.pdf', SAMPLE_DOCUMENT, 'application/pdf')}
+    return user.request('submit claim', 'POST', '/api/claims/submit/', expect=(200, 201), data=data, files=files) is not None
+
+
+ADMIN_LISTS = [
+    ('admin stats', '/api/admin/stats/'),
+    ('admin applications', '/api/admin/applications/'),
+    ('admin claims', '/api/claims/admin/list/'),
+    ('admin users', '/api/admin/users/'),
+    ('admin payments', '/api/admin/payments/'),
+    ('admin recent activities', '/api/admin/recent-activities/'),
+]
+
+
+def admin_review(user, rng):
+    """Page through the review queues an admin works from."""
+    if not user.ensure_login():
+        return False
+    results = [user.request(step, 'GET', path) for step, path in ADMIN_LISTS]
+    return all(r is not None for r in results)
+
+
+# name -> (scenario, default weight, run as admin)
+SCENARIOS = {
+    'member_flow': (member_flow, 6, False),
+    'submit_application': (submit_application, 1, False),
+    'submit_claim': (submit_claim, 1, False),
+    'admin_review': (admin_review, 2, True),
+}
+
+
+class LoadTest:
+    """
+    Run ``concurrency`` virtual users for ``duration`` seconds (or until each
+    has completed ``iterations`` scenarios). ``rate`` caps the total scenario
+    starts per second across all workers.
+    """
+
+    def __init__(self, base_url, members, admin, scenarios, concurrency=10, duration=30, iterations=None,
+                 rate=None, seed=42, timeout=30):
+        self.base_url = base_url
+        self.members = members
+        self.admin = admin
+        self.scenarios = scenarios
+        self.concurrency = concurrency
+        self.duration = duration
+        self.iterations = iterations
+        self.rate = rate
+        self.seed = seed
+        self.timeout = timeout
+        self.recorder = Recorder()
+
+    def run(self):
+        deadline = None if self.iterations else time.perf_counter() + self.duration
+        threads = [
+            threading.Thread(target=self.worker, args=(i, deadline), daemon=True)
+            for i in range(self.concurrency)
+        ]
+        self.recorder = Recorder()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.recorder.stop()
+        return self.recorder.summary()
+
+    def worker(self, index, deadline):
+        rng = random.Random(self.seed + index)
+        names = list(self.scenarios)
+        weights = [self.scenarios[name] for name in names]
+        email, password = self.members[index % len(self.members)]
+        member = VirtualUser(self.base_url, email, password, self.recorder, self.timeout)
+        admin = VirtualUser(self.base_url, *self.admin, self.recorder, self.timeout) if self.admin else None
+        interval = self.concurrency / self.rate if self.rate else 0
+
+        done = 0
+        while True:
+            if self.iterations is not None and done >= self.iterations:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            started = time.perf_counter()
+            name = rng.choices(names, weights)[0]
+            scenario, _, as_admin = SCENARIOS[name]
+            ok = scenario(admin if as_admin else member, rng)
+            self.recorder.add_iteration(name, ok)
+            done += 1
+            if interval:
+                time.sleep(max(0, interval - (time.perf_counter() - started)))
+
+
+def compare(results, baseline, tolerance=0.2, error_margin=0.01):
+    """
+    Regressions of ``results`` against ``baseline``: steps whose p95 grew by
+    more than ``tolerance``, whose error rate rose by more than
+    ``error_margin``, and overall throughput that dropped by more than
+    ``tolerance``.
+    """
+    regressions = []
+    current, previous = results['overall'], baseline.get('overall', {})
+    if previous.get('rps') and current['rps'] < previous['rps'] * (1 - tolerance):
+        regressions.append(f'throughput {current["rps"]} req/s vs {previous["rps"]} baseline')
+
+    for step, stats in results['steps'].items():
+        old = baseline.get('steps', {}).get(step)
+        if not old or not stats['requests']:
+            continue
+        if old.get('p95_ms') and stats['p95_ms'] > old['p95_ms'] * (1 + tolerance):
+            regressions.append(f'{step}: p95 {stats["p95_ms"]}ms vs {old["p95_ms"]}ms baseline')
+        if stats['error_rate'] > old.get('error_rate', 0) + error_margin:
+            regressions.append(f'{step}: error rate {stats["error_rate"]:.2%} vs {old.get("error_rate", 0):.2%} baseline')
+    return regressions
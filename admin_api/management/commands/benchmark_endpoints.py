@@ -0,0 +1,185 @@
+import json
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from admin_api.datasets import DatasetGenerator
+from admin_api.loadtest import percentile
+
+User = get_user_model()
+
+# (name, who calls it, url)
+ENDPOINTS = [
+    ('dashboard stats', 'member', '/api/dashboard/stats/'),
+    ('dashboard activities', 'member', '/api/dashboard/activities/'),
+    ('activity feed', 'member', '/api/activities/'),
+    ('profile', 'member', '/api/auth/profile/'),
+    ('member stats', 'member', '/api/auth/stats/'),
+    ('my applications', 'member', '/api/applications/'),
+    ('my claims', 'member', '/api/claims/list/'),
+    ('my payments', 'member', '/api/payments/'),
+    ('payment stats', 'member', '/api/payments/stats/'),
+    ('my beneficiaries', 'member', '/api/beneficiaries/'),
+    ('my notifications', 'member', '/api/notifications/user/'),
+    ('public announcements', 'anonymous', '/api/notifications/announcements/'),
+    ('public events', 'anonymous', '/api/notifications/events/'),
+    ('public meetings', 'anonymous', '/api/notifications/meetings/'),
+    ('admin stats', 'admin', '/api/admin/stats/'),
+    ('admin recent activities', 'admin', '/api/admin/recent-activities/'),
+    ('admin users', 'admin', '/api/admin/users/'),
+    ('admin applications', 'admin', '/api/admin/applications/'),
+    ('admin claims', 'admin', '/api/admin/claims/'),
+    ('admin payments', 'admin', '/api/admin/payments/'),
+    ('admin announcements', 'admin', '/api/admin/announcements/'),
+    ('admin events', 'admin', '/api/admin/events/'),
+    ('admin meetings', 'admin', '/api/admin/meetings/'),
+    ('admin contacts', 'admin', '/api/admin/contacts/'),
+    ('claims admin list', 'admin', '/api/claims/admin/list/'),
+    ('claims admin beneficiaries', 'admin', '/api/claims/admin/beneficiaries/'),
+    ('beneficiary change requests', 'admin', '/api/beneficiaries/requests/'),
+]
+
+BENCHMARK_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark'}}
+
+
+def seed_fixtures(scale, member, admin):
+    """
+    Generate ``scale`` members with production-shaped history. The benchmark
+    member gets ``scale / 20`` times the usual per-member rows so per-member
+    endpoints grow with the dataset too.
+    """
+    DatasetGenerator(users=scale, seed=scale, prefix='bench-gen', admin=admin).generate()
+    DatasetGenerator(users=0, scale=max(scale / 20, 1), seed=scale, prefix='bench-gen', admin=admin).populate([member])
+
+
+class QueryTimer:
+    """execute_wrapper that counts queries and the time spent in the database."""
+
+    def __init__(self):
+        self.count = 0
+        self.elapsed = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.elapsed += time.perf_counter() - started
+            self.count += 1
+
+
+def measure(client, url, repeat):
+    """Cold request with query timing, then ``repeat`` timed requests."""
+    cache.clear()
+    timer = QueryTimer()
+    with connection.execute_wrapper(timer):
+        response = client.get(url)
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        client.get(url)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return {
+        'status': response.status_code,
+        'queries': timer.count,
+        'db_ms': round(timer.elapsed * 1000, 2),
+        'p50_ms': round(statistics.median(timings), 2) if timings else None,
+        'p95_ms': round(percentile(timings, 95), 2) if timings else None,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark API endpoints in-process at several data scales and fail if query counts grow with row count'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', type=int, nargs='+', default=[10, 1000, 10000],
+                            help='Members generated for each run (about 20 rows each); '
+                                 'the smallest scale is the query-count baseline')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed requests per endpoint for p50/p95')
+        parser.add_argument('--endpoint', action='append', dest='endpoints',
+                            help='Only benchmark endpoints whose name contains this text (may be repeated)')
+        parser.add_argument('--output', help='Write the results as JSON to this path')
+        parser.add_argument('--in-place', action='store_true',
+                            help='Use the current database instead of creating a throwaway test database')
+
+    def handle(self, *args, **options):
+        endpoints = ENDPOINTS
+        if options['endpoints']:
+            endpoints = [e for e in ENDPOINTS if any(f in e[0] for f in options['endpoints'])]
+        scales = sorted(set(options['scales']))
+
+        runner = old_config = None
+        if not options['in_place']:
+            setup_test_environment()
+            runner = DiscoverRunner(verbosity=0)
+            old_config = runner.setup_databases()
+
+        try:
+            with override_settings(CACHES=BENCHMARK_CACHES):
+                results = {scale: self.run_scale(scale, endpoints, options['repeat']) for scale in scales}
+        finally:
+            if runner:
+                runner.teardown_databases(old_config)
+                teardown_test_environment()
+
+        failures = self.report(endpoints, scales, results)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'scales': scales, 'results': {str(s): r for s, r in results.items()}, 'failures': failures},
+                          f, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+        if failures:
+            raise CommandError(f'Query count grows with data size for: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('Query counts are flat across all scales'))
+
+    def run_scale(self, scale, endpoints, repeat):
+        self.stdout.write(f'Seeding scale {scale}...')
+        results = {}
+        with transaction.atomic():
+            member = User.objects.create_user(username='bench-member', email='bench-member@example.com',
+                                              password='benchmark-password', membership_status='active')
+            admin = User.objects.create_user(username='bench-admin', email='bench-admin@example.com',
+                                             password='benchmark-password', is_staff=True, is_superuser=True)
+            seed_fixtures(scale, member, admin)
+
+            clients = {'anonymous': Client(), 'member': Client(), 'admin': Client()}
+            clients['member'].force_login(member)
+            clients['admin'].force_login(admin)
+
+            for name, caller, url in endpoints:
+                results[name] = measure(clients[caller], url, repeat)
+            # Throw the fixtures away so the next scale starts clean
+            transaction.set_rollback(True)
+        return results
+
+    def report(self, endpoints, scales, results):
+        baseline = scales[0]
+        failures = []
+        header = f'{"endpoint":<30}' + ''.join(f'{"q@" + str(s):>10}' for s in scales)
+        header += f'{"db ms":>10}{"p50 ms":>10}{"p95 ms":>10}  status'
+        self.stdout.write(header)
+        for name, _, _ in endpoints:
+            counts = [results[s][name]['queries'] for s in scales]
+            largest = results[scales[-1]][name]
+            grows = any(count > results[baseline][name]['queries'] for count in counts)
+            line = f'{name:<30}' + ''.join(f'{c:>10}' for c in counts)
+            line += f'{largest["db_ms"]:>10}{largest["p50_ms"] or "-":>10}{largest["p95_ms"] or "-":>10}  {largest["status"]}'
+            if grows:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            elif largest['status'] >= 400:
+                self.stdout.write(self.style.WARNING(line))
+            else:
+                self.stdout.write(line)
+        return failures
@@ -0,0 +1,82 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from accounts.models import ActivityEvent
+from applications.models import Application
+from claims.models import Claim
+from notifications.models import Announcement, BroadcastNotification, Event, Meeting, Notification
+from payments.models import Payment
+
+User = get_user_model()
+
+
+def hot_queries():
+    """The filter/order paths hit on every dashboard, admin and homepage load."""
+    now = timezone.now()
+    return {
+        'user notifications': Notification.objects.filter(user_id=1)[:20],
+        'unread notifications': Notification.objects.filter(user_id=1, is_read=False),
+        'active broadcasts': BroadcastNotification.objects.filter(is_active=True, created_at__gte=now).order_by('-created_at')[:20],
+        'pending applications': Application.objects.filter(status='pending').order_by('-created_at')[:20],
+        'applications by status': Application.objects.filter(status='approved').order_by('-created_at')[:20],
+        'applications page': Application.objects.order_by('-created_at', '-id')[:21],
+        'user claims': Claim.objects.filter(user_id=1).order_by('-created_at')[:5],
+        'pending claims': Claim.objects.filter(status='pending'),
+        'claims page': Claim.objects.order_by('-created_at', '-id')[:21],
+        'user payments by status': Payment.objects.filter(user_id=1, status='completed'),
+        'payments page': Payment.objects.order_by('-created_at', '-id')[:21],
+        'users page': User.objects.order_by('-created_at', '-id')[:21],
+        'public announcements': Announcement.objects.filter(is_active=True, expires_at__gt=now).order_by('-is_pinned', '-created_at')[:10],
+        'public events': Event.objects.filter(is_active=True, date__gt=now).order_by('date')[:10],
+        'public meetings': Meeting.objects.filter(date__gt=now).order_by('date')[:10],
+        'user activity feed': ActivityEvent.objects.filter(user_id=1).order_by('-created_at', '-id')[:21],
+        'recent activity': ActivityEvent.objects.order_by('-created_at', '-id')[:10],
+    }
+
+
+def is_sequential_scan(plan):
+    if connection.vendor == 'postgresql':
+        return 'Seq Scan' in plan
+    if connection.vendor == 'sqlite':
+        # "SCAN table" without an index is a full table scan; "SEARCH"/"USING INDEX" are not
+        return any(
+            re.search(r'\bSCAN \w+$', line.strip()) or re.search(r'\bSCAN TABLE \w+$', line.strip())
+            for line in plan.splitlines()
+        )
+    return False
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN every hot query and fail if any of them falls back to a sequential scan'
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            self.stdout.write(self.style.WARNING(f'Plan checks are not supported on {connection.vendor}'))
+            return
+
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Small tables make seq scans look cheap; force the planner to show whether an index is usable
+                cursor.execute('SET enable_seqscan = off')
+
+        failures = []
+        try:
+            for name, queryset in hot_queries().items():
+                plan = queryset.explain()
+                if is_sequential_scan(plan):
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f'SEQ SCAN  {name}\n{plan}'))
+                else:
+                    self.stdout.write(f'ok        {name}')
+        finally:
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('RESET enable_seqscan')
+
+        if failures:
+            raise CommandError(f'{len(failures)} hot queries use a sequential scan: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('All hot queries use an index'))
@@ -0,0 +1,121 @@
+import json
+from datetime import datetime
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from admin_api.loadtest import SCENARIOS, LoadTest, compare
+
+
+class Command(BaseCommand):
+    help = ('Drive concurrent member/admin scenarios against a running server and report '
+            'req/s, p50/p95/p99 latency and error rates')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Server to load (start it first)')
+        parser.add_argument('--concurrency', type=int, default=10, help='Virtual users running at once')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to run for')
+        parser.add_argument('--iterations', type=int,
+                            help='Scenarios per virtual user; overrides --duration')
+        parser.add_argument('--rate', type=float, help='Cap on scenario starts per second across all users')
+        parser.add_argument('--scenario', action='append', dest='scenarios', metavar='NAME[=WEIGHT]',
+                            help=f'Scenario to run, optionally weighted (may be repeated). '
+                                 f'Choices: {", ".join(SCENARIOS)}. Default: all with their standard mix')
+        parser.add_argument('--prefix', default='gen', help='Members are <prefix>-<n>@example.com from generate_dataset')
+        parser.add_argument('--users', type=int, default=100, help='How many of the generated members to log in as')
+        parser.add_argument('--password', default='password123', help='Password of the generated members')
+        parser.add_argument('--admin-email', help='Admin account for admin_review (default <prefix>-admin@example.com)')
+        parser.add_argument('--admin-password', default='password123')
+        parser.add_argument('--seed', type=int, default=42, help='Seed for the scenario mix and payloads')
+        parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+        parser.add_argument('--output', help='Write the results as JSON to this path')
+        parser.add_argument('--baseline', help='Compare against a previous --output file and fail on regressions')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Allowed p95 growth / throughput drop versus the baseline (0.2 = 20%%)')
+
+    def handle(self, *args, **options):
+        scenarios = self.parse_scenarios(options['scenarios'])
+        if options['concurrency'] < 1 or options['users'] < 1:
+            raise CommandError('--concurrency and --users must be at least 1')
+
+        base_url = options['base_url'].rstrip('/')
+        try:
+            requests.get(f'{base_url}/api/', timeout=options['timeout'])
+        except requests.RequestException as e:
+            raise CommandError(f'Cannot reach {base_url}: {e}. Start the server first (e.g. manage.py runserver).')
+
+        members = [(f'{options["prefix"]}-{i}@example.com', options['password']) for i in range(options['users'])]
+        admin = None
+        if any(SCENARIOS[name][2] for name in scenarios):
+            admin = (options['admin_email'] or f'{options["prefix"]}-admin@example.com', options['admin_password'])
+
+        load_test = LoadTest(
+            base_url, members, admin, scenarios,
+            concurrency=options['concurrency'],
+            duration=options['duration'],
+            iterations=options['iterations'],
+            rate=options['rate'],
+            seed=options['seed'],
+            timeout=options['timeout'],
+        )
+        limit = f'{options["iterations"]} iterations each' if options['iterations'] else f'{options["duration"]:g}s'
+        self.stdout.write(f'Running {", ".join(f"{n}={w}" for n, w in scenarios.items())} with '
+                          f'{options["concurrency"]} users for {limit} against {base_url}...')
+        results = load_test.run()
+        results['config'] = {
+            'base_url': base_url,
+            'concurrency': options['concurrency'],
+            'duration': options['duration'],
+            'iterations': options['iterations'],
+            'rate': options['rate'],
+            'users': options['users'],
+            'scenarios': scenarios,
+            'seed': options['seed'],
+        }
+        results['started_at'] = datetime.now().isoformat(timespec='seconds')
+        self.report(results)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read baseline {options["baseline"]}: {e}')
+            regressions = compare(results, baseline, tolerance=options['tolerance'])
+            if regressions:
+                for regression in regressions:
+                    self.stdout.write(self.style.ERROR(regression))
+                raise CommandError(f'{len(regressions)} regression(s) against {options["baseline"]}')
+            self.stdout.write(self.style.SUCCESS(f'No regressions against {options["baseline"]}'))
+
+    def parse_scenarios(self, values):
+        if not values:
+            return {name: weight for name, (_, weight, _) in SCENARIOS.items()}
+        scenarios = {}
+        for value in values:
+            name, _, weight = value.partition('=')
+            if name not in SCENARIOS:
+                raise CommandError(f'Unknown scenario "{name}". Choices: {", ".join(SCENARIOS)}')
+            try:
+                scenarios[name] = float(weight) if weight else SCENARIOS[name][1]
+            except ValueError:
+                raise CommandError(f'Invalid weight in "{value}"')
+        return scenarios
+
+    def report(self, results):
+        header = f'{"step":<26}{"reqs":>8}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"errors":>9}'
+        self.stdout.write(header)
+        rows = list(results['steps'].items()) + [('TOTAL', results['overall'])]
+        for step, stats in rows:
+            if not stats['requests']:
+                continue
+            line = (f'{step:<26}{stats["requests"]:>8}{stats["rps"]:>9}{stats["p50_ms"]:>9}'
+                    f'{stats["p95_ms"]:>9}{stats["p99_ms"]:>9}{stats["error_rate"]:>9.1%}')
+            self.stdout.write(self.style.WARNING(line) if stats['errors'] else line)
+        for name, counts in results['scenarios'].items():
+            self.stdout.write(f'  {name}: {counts["completed"]} completed, {counts["failed"]} failed')
@@ -0,0 +1,93 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+
+class KeysetPagination:
+    """
+    Cursor pagination keyed on ``(created_at, id)``, newest first.
+
+    Each page is a single indexed range scan (``WHERE (created_at, id) < cursor``)
+    so response time stays flat no matter how deep the admin pages.
+    """
+
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    count_query_param = 'include_count'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering_field='created_at'):
+        self.ordering_field = ordering_field
+        self.page_size = getattr(settings, 'REST_FRAMEWORK', {}).get('PAGE_SIZE', 20)
+
+    def paginate_queryset(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.count = None
+
+        if request.query_params.get(self.count_query_param) in ('1', 'true', 'True'):
+            self.count = queryset.count()
+
+        queryset = queryset.order_by(f'-{self.ordering_field}', '-id')
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            position, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(**{f'{self.ordering_field}__lt': position}) |
+                Q(**{self.ordering_field: position, 'id__lt': pk})
+            )
+
+        # Fetch one extra row to know whether another page exists
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        page = page[:self.page_size]
+
+        self.next_cursor = None
+        if self.has_next and page:
+            last = page[-1]
+            self.next_cursor = self.encode_cursor(getattr(last, self.ordering_field), last.id)
+        return page
+
+    def get_paginated_response(self, data):
+        response = {
+            'results': data,
+            'next_cursor': self.next_cursor,
+            'has_more': self.has_next,
+            'page_size': self.page_size,
+        }
+        if self.count is not None:
+            response['count'] = self.count
+        return Response(response)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def encode_cursor(self, position, pk):
+        raw = f'{position.isoformat()}|{pk}'.encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+            position, pk = raw.rsplit('|', 1)
+            position = parse_datetime(position)
+            pk = int(pk)
+        except (binascii.Error, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if position is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position, pk
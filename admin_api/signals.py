@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from applications.models import Application
+from claims.models import Claim
+from payments.models import Payment
+from pamoja_kenya.live import publish_on_commit
+from .stats import invalidate_dashboard_stats, stats_delta
+
+User = get_user_model()
+
+# model -> fields whose value the dashboard stats filter on
+STATS_MODELS = {
+    User: set(),
+    Application: {'status'},
+    Claim: {'status'},
+    Payment: {'status', 'amount'},
+}
+
+
+def counted_values(instance, fields, loaded=False):
+    if loaded:
+        return {field: instance.loaded_value(field) for field in fields}
+    return {field: getattr(instance, field) for field in fields}
+
+
+def publish_stats_delta(sender, before, after):
+    delta = stats_delta(sender, before, after)
+    if delta:
+        publish_on_commit('admin', 'stats', {'delta': delta})
+
+
+def handle_stats_save(sender, instance, created, update_fields=None, **kwargs):
+    """Drop the cached dashboard stats once a write that changes a count is committed"""
+    counted_fields = STATS_MODELS[sender]
+    if not created:
+        if not counted_fields:
+            return
+        if update_fields and not counted_fields.intersection(update_fields):
+            return
+    transaction.on_commit(invalidate_dashboard_stats)
+
+    after = counted_values(instance, counted_fields)
+    if created:
+        publish_stats_delta(sender, None, after)
+    elif instance.has_snapshot and all(f in instance._loaded_values for f in counted_fields):
+        publish_stats_delta(sender, counted_values(instance, counted_fields, loaded=True), after)
+    else:
+        # Saved without a loaded snapshot: tell admins to refetch the stats
+        publish_on_commit('admin', 'stats', {'stale': True})
+
+
+def handle_stats_delete(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_dashboard_stats)
+    publish_stats_delta(sender, counted_values(instance, STATS_MODELS[sender]), None)
+
+
+for model in STATS_MODELS:
+    post_save.connect(handle_stats_save, sender=model, dispatch_uid=f'dashboard_stats_save_{model.__name__}')
+    post_delete.connect(handle_stats_delete, sender=model, dispatch_uid=f'dashboard_stats_delete_{model.__name__}')
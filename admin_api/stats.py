@@ -0,0 +1,81 @@
+"""
+Admin dashboard statistics.
+
+Each model is counted with a single conditional-aggregation query and the
+combined snapshot is kept in the cache until a signal in ``admin_api.signals``
+drops it, so dashboard polling normally never touches the database. The same
+signals push each write's ``stats_delta`` to the admin live event stream.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from applications.models import Application
+from claims.models import Claim
+from payments.models import Payment
+
+User = get_user_model()
+
+DASHBOARD_STATS_CACHE_KEY = 'admin_api:dashboard_stats'
+
+
+def compute_dashboard_stats():
+    """Build the stats snapshot with one aggregate query per model."""
+    users = User.objects.aggregate(total_users=Count('id'))
+    applications = Application.objects.aggregate(
+        total_applications=Count('id'),
+        pending_applications=Count('id', filter=Q(status='pending')),
+        approved_applications=Count('id', filter=Q(status='approved')),
+        rejected_applications=Count('id', filter=Q(status='rejected')),
+    )
+    claims = Claim.objects.aggregate(
+        total_claims=Count('id'),
+        pending_claims=Count('id', filter=Q(status='pending')),
+        approved_claims=Count('id', filter=Q(status='approved')),
+        rejected_claims=Count('id', filter=Q(status='rejected')),
+    )
+    payments = Payment.objects.aggregate(
+        total_payments=Count('id'),
+        total_revenue=Sum('amount', filter=Q(status='completed')),
+    )
+    payments['total_revenue'] = payments['total_revenue'] or 0
+    return {**users, **applications, **claims, **payments}
+
+
+def get_dashboard_stats():
+    """Return the cached snapshot, rebuilding it on a miss."""
+    stats = cache.get(DASHBOARD_STATS_CACHE_KEY)
+    if stats is None:
+        stats = compute_dashboard_stats()
+        cache.set(DASHBOARD_STATS_CACHE_KEY, stats, getattr(settings, 'ADMIN_STATS_CACHE_TIMEOUT', 300))
+    return stats
+
+
+def invalidate_dashboard_stats():
+    cache.delete(DASHBOARD_STATS_CACHE_KEY)
+
+
+def stats_contribution(model, row):
+    """What one row with values ``row`` adds to the snapshot (``row`` is None for no row)."""
+    if row is None:
+        return {}
+    if model is User:
+        return {'total_users': 1}
+    if model is Payment:
+        return {
+            'total_payments': 1,
+            'total_revenue': (row['amount'] or 0) if row['status'] == 'completed' else 0,
+        }
+    name = model._meta.model_name + 's'
+    contribution = {f'total_{name}': 1}
+    if row['status'] in ('pending', 'approved', 'rejected'):
+        contribution[f"{row['status']}_{name}"] = 1
+    return contribution
+
+
+def stats_delta(model, before, after):
+    """Non-zero snapshot changes from a row going from ``before`` to ``after``."""
+    old = stats_contribution(model, before)
+    new = stats_contribution(model, after)
+    delta = {key: new.get(key, 0) - old.get(key, 0) for key in set(old) | set(new)}
+    return {key: value for key, value in delta.items() if value}
@@ -1,3 +1,289 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.test import LiveServerTestCase, SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import ActivityEvent
+from applications.models import Application
+from claims.models import Claim
+from payments.models import Payment
+from .datasets import DatasetGenerator
+from .loadtest import LoadTest, compare, percentile
+from .management.commands.load_test import Command as LoadTestCommand
+from .stats import DASHBOARD_STATS_CACHE_KEY, get_dashboard_stats, stats_delta
+
+
+User = get_user_model()
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_user(username='admin', email='admin@example.com', password='x', is_staff=True)
+        for i in range(4):
+            User.objects.create_user(username=f'member{i}', email=f'member{i}@example.com', password='x')
+        # Equal timestamps leave the id as the only tie-breaker
+        User.objects.update(created_at=timezone.now())
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin_user)
+
+    def test_cursor_walks_every_row_once_newest_first(self):
+        ids, cursor = [], None
+        while True:
+            params = {'page_size': 2, **({'cursor': cursor} if cursor else {})}
+            page = self.client.get('/api/admin/users/', params).json()
+            ids += [user['id'] for user in page['results']]
+            cursor = page['next_cursor']
+            self.assertEqual(page['has_more'], cursor is not None)
+            if cursor is None:
+                break
+        self.assertEqual(ids, list(User.objects.order_by('-id').values_list('id', flat=True)))
+
+    def test_count_is_opt_in_and_page_size_is_capped(self):
+        page = self.client.get('/api/admin/users/', {'page_size': 1000}).json()
+        self.assertEqual((page['page_size'], 'count' in page), (100, False))
+        self.assertEqual(self.client.get('/api/admin/users/', {'include_count': 'true'}).json()['count'], 5)
+
+    def test_invalid_cursor_is_rejected(self):
+        self.assertEqual(self.client.get('/api/admin/users/', {'cursor': 'not-a-cursor'}).status_code, 404)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_user(username='admin', email='admin@example.com', password='x', is_staff=True)
+        for i in range(4):
+            User.objects.create_user(username=f'member{i}', email=f'member{i}@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin_user)
+
+    def export(self, resource, **params):
+        response = self.client.get(f'/api/admin/export/{resource}/', params)
+        return response, b''.join(response.streaming_content).decode()
+
+    @mock.patch('admin_api.exports.EXPORT_CHUNK_SIZE', 2)
+    def test_ndjson_streams_every_row_once_in_id_order(self):
+        response, body = self.export('members')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertIn('members.ndjson', response['Content-Disposition'])
+        ids = [json.loads(line)['id'] for line in body.splitlines()]
+        self.assertEqual(ids, list(User.objects.order_by('id').values_list('id', flat=True)))
+
+    @mock.patch('admin_api.exports.EXPORT_CHUNK_SIZE', 2)
+    def test_csv_streams_every_row_once_in_id_order(self):
+        response, body = self.export('members', output='csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        header, *rows = csv.reader(StringIO(body))
+        self.assertEqual(header[:3], ['id', 'username', 'email'])
+        self.assertEqual([int(row[0]) for row in rows], list(User.objects.order_by('id').values_list('id', flat=True)))
+
+    def test_csv_neutralises_formulas(self):
+        User.objects.filter(username='member0').update(first_name='=SUM(A1:A9)', last_name='-2+3')
+        _, body = self.export('members', output='csv')
+        row = next(row for row in csv.reader(StringIO(body)) if row[1] == 'member0')
+        self.assertEqual((row[3], row[4]), ("'=SUM(A1:A9)", "'-2+3"))
+
+    def test_unknown_resource_and_output_are_rejected(self):
+        self.assertEqual(self.client.get('/api/admin/export/secrets/').status_code, 404)
+        self.assertEqual(self.client.get('/api/admin/export/members/', {'output': 'xml'}).status_code, 400)
+
+    def test_members_cannot_export(self):
+        self.client.force_authenticate(User.objects.get(username='member0'))
+        self.assertEqual(self.client.get('/api/admin/export/members/').status_code, 403)
+
+
+class DashboardStatsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.member = User.objects.create_user(username='member', email='member@example.com', password='x')
+        self.application = Application.objects.create(
+            user=self.member, application_type='single', first_name='Jane', last_name='Doe', email=self.member.email,
+            phone='555-0100', city='Minneapolis', state='MN', zip_code='55401', amount=Decimal('200.00')
+        )
+        self.claim = Claim.objects.create(user=self.member, claim_type='medical', amount_requested=Decimal('300.00'),
+                                          description='Hospital bill')
+        self.payment = Payment.objects.create(user=self.member, amount=Decimal('50.00'), payer_name='Payer',
+                                              payer_email='payer@example.com')
+
+    def assertInvalidatedOnCommit(self, write):
+        get_dashboard_stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+            self.assertIsNotNone(cache.get(DASHBOARD_STATS_CACHE_KEY))
+        self.assertIsNone(cache.get(DASHBOARD_STATS_CACHE_KEY))
+
+    def test_second_poll_runs_no_queries(self):
+        stats = get_dashboard_stats()
+        self.assertEqual((stats['total_applications'], stats['pending_claims'], stats['total_revenue']), (1, 1, 0))
+        with self.assertNumQueries(0):
+            self.assertEqual(get_dashboard_stats(), stats)
+
+    @mock.patch('applications.signals.send_approval_email')
+    def test_counted_writes_invalidate_the_snapshot_after_commit(self, send_approval_email):
+        def save_status(instance, status):
+            instance.status = status
+            instance.save()
+
+        self.assertInvalidatedOnCommit(lambda: save_status(Application.objects.get(pk=self.application.pk), 'approved'))
+        self.assertInvalidatedOnCommit(lambda: save_status(Claim.objects.get(pk=self.claim.pk), 'rejected'))
+        self.assertInvalidatedOnCommit(lambda: save_status(Payment.objects.get(pk=self.payment.pk), 'completed'))
+        self.assertInvalidatedOnCommit(lambda: User.objects.create_user(username='new', email='new@example.com', password='x'))
+        for instance in (self.payment, self.claim, self.application, self.member):
+            self.assertInvalidatedOnCommit(instance.delete)
+        self.assertEqual(get_dashboard_stats()['total_users'], 1)
+
+    def test_save_without_counted_fields_keeps_the_snapshot(self):
+        stats = get_dashboard_stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            application = Application.objects.get(pk=self.application.pk)
+            application.phone = '555-0199'
+            application.save()
+            self.member.first_name = 'Jane'
+            self.member.save()
+        self.assertEqual(cache.get(DASHBOARD_STATS_CACHE_KEY), stats)
+
+    def test_stats_delta(self):
+        self.assertEqual(stats_delta(Application, {'status': 'pending'}, {'status': 'approved'}),
+                         {'pending_applications': -1, 'approved_applications': 1})
+        self.assertEqual(stats_delta(Claim, None, {'status': 'pending'}), {'total_claims': 1, 'pending_claims': 1})
+        self.assertEqual(stats_delta(Payment, {'status': 'completed', 'amount': Decimal('50.00')}, None),
+                         {'total_payments': -1, 'total_revenue': Decimal('-50.00')})
+
+    @mock.patch('admin_api.signals.publish_on_commit')
+    def test_saves_publish_their_stats_delta(self, publish_on_commit):
+        claim = Claim.objects.get(pk=self.claim.pk)
+        claim.status = 'approved'
+        claim.save()
+        publish_on_commit.assert_called_once_with('admin', 'stats', {'delta': {'pending_claims': -1, 'approved_claims': 1}})
+
+        publish_on_commit.reset_mock()
+        payment = Payment.objects.get(pk=self.payment.pk)
+        payment.status = 'completed'
+        payment.save()
+        publish_on_commit.assert_called_once_with('admin', 'stats', {'delta': {'total_revenue': Decimal('50.00')}})
+
+
+class LoadTestHarnessTests(SimpleTestCase):
+    def test_percentile(self):
+        self.assertEqual(percentile([5, 1, 3], 50), 3)
+        self.assertEqual(percentile(list(range(1, 102)), 99), 100)
+        self.assertEqual(percentile([7], 99), 7)
+
+    @mock.patch.dict('admin_api.loadtest.SCENARIOS', {
+        'often': (lambda user, rng: True, 3, False),
+        'rarely': (lambda user, rng: False, 1, False),
+        'never': (lambda user, rng: True, 1, False),
+    }, clear=True)
+    def test_scenarios_run_in_proportion_to_their_weights(self):
+        load_test = LoadTest('http://testserver', [('member@example.com', 'x')], None,
+                             {'often': 3, 'rarely': 1, 'never': 0}, concurrency=2, iterations=400)
+        scenarios = load_test.run()['scenarios']
+        self.assertNotIn('never', scenarios)
+        self.assertEqual(scenarios['often']['failed'] + scenarios['rarely']['completed'], 0)
+        often, rarely = scenarios['often']['completed'], scenarios['rarely']['failed']
+        self.assertEqual(often + rarely, 800)
+        self.assertAlmostEqual(often / 800, 0.75, delta=0.05)
+
+    def test_scenario_weights_are_parsed(self):
+        command = LoadTestCommand()
+        self.assertEqual(command.parse_scenarios(None)['member_flow'], 6)
+        self.assertEqual(command.parse_scenarios(['member_flow=0.5', 'admin_review']),
+                         {'member_flow': 0.5, 'admin_review': 2})
+        with self.assertRaises(CommandError):
+            command.parse_scenarios(['browse'])
+        with self.assertRaises(CommandError):
+            command.parse_scenarios(['member_flow=often'])
+
+    def test_baseline_comparison(self):
+        def run(rps, p95, error_rate):
+            stats = {'requests': 100, 'rps': rps, 'p95_ms': p95, 'error_rate': error_rate}
+            return {'overall': stats, 'steps': {'login': stats}}
+
+        baseline = run(100, 50, 0.0)
+        self.assertEqual(compare(run(90, 55, 0.005), baseline), [])
+        self.assertEqual(compare(run(70, 80, 0.05), baseline), [
+            'throughput 70 req/s vs 100 baseline',
+            'login: p95 80ms vs 50ms baseline',
+            'login: error rate 5.00% vs 0.00% baseline',
+        ])
+        # Steps missing from the baseline aren't compared
+        self.assertEqual(compare(run(100, 80, 0.05), {'overall': baseline['overall'], 'steps': {}}), [])
+
+
+class LoadTestCommandTests(LiveServerTestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(username='gen-0', email='gen-0@example.com', password='password123')
+
+    def load_test(self, *args):
+        out = StringIO()
+        call_command('load_test', '--base-url', self.live_server_url, '--scenario', 'member_flow',
+                     '--users', '1', '--concurrency', '1', '--iterations', '2', *args, stdout=out)
+        return out.getvalue()
+
+    def test_short_run_reports_and_compares_against_a_baseline(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            self.assertIn('member_flow: 2 completed, 0 failed', self.load_test('--output', output))
+            with open(output) as f:
+                results = json.load(f)
+            self.assertEqual((results['overall']['requests'], results['overall']['errors']), (8, 0))
+            self.assertEqual(set(results['steps']), {'login', 'dashboard stats', 'activities', 'notifications'})
+
+            # An impossibly fast baseline fails the run
+            results['overall']['rps'] *= 1000
+            results['steps'] = {'login': dict(results['steps']['login'], p95_ms=results['steps']['login']['p95_ms'] / 1000)}
+            baseline = os.path.join(directory, 'baseline.json')
+            with open(baseline, 'w') as f:
+                json.dump(results, f)
+            with self.assertRaisesMessage(CommandError, '2 regression(s)'):
+                self.load_test('--baseline', baseline)
+
+
+class DatasetGeneratorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        DatasetGenerator(users=30, seed=7).generate()
+
+    def test_rows_keep_their_generated_history(self):
+        members = User.objects.filter(username__startswith='gen-', is_superuser=False)
+        self.assertFalse(members.exclude(created_at=F('date_joined')).exists())
+        self.assertTrue(Application.objects.filter(created_at__lt=timezone.now() - timedelta(days=30)).exists())
+        self.assertTrue(Application._meta.get_field('created_at').auto_now_add)
+
+    def test_activity_log_matches_the_live_describers(self):
+        expected = {
+            'pending': ['Payment Started'],
+            'failed': ['Payment Started', 'Payment Failed'],
+            'refunded': ['Payment Started', 'Payment Refunded'],
+            'completed': ['Payment Made'],
+        }
+        for payment in Payment.objects.all():
+            actions = ActivityEvent.objects.filter(activity_type='payment', object_id=payment.pk).order_by('created_at')
+            self.assertEqual(list(actions.values_list('action', flat=True)), expected[payment.status])
+        for application in Application.objects.exclude(status='pending'):
+            actions = ActivityEvent.objects.filter(activity_type='application', object_id=application.pk).order_by('created_at')
+            self.assertEqual(list(actions.values_list('action', flat=True)),
+                             ['Application Submitted', f'Application {application.get_status_display()}'])
+
+
+class QueryPlanTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        # Raises CommandError if any hot query plans a sequential scan
+        call_command('check_query_plans', stdout=StringIO())
+
+
+class EndpointQueryCountTests(TestCase):
+    def test_query_counts_do_not_grow_with_data(self):
+        # Raises CommandError if any endpoint's query count grows between scales
+        call_command('benchmark_endpoints', '--in-place', '--scales', '5', '50', '--repeat', '0', stdout=StringIO())
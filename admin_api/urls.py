@@ -47,6 +47,9 @@ urlpatterns = [
     path('contacts/', views.admin_contacts_list, name='admin_contacts_list'),
     path('contacts/<int:contact_id>/', views.admin_update_contact, name='admin_update_contact'),
     
+    # Data Export
+    path('export/<str:resource>/', views.admin_export, name='admin_export'),
+    
     # Document endpoints
     path('claims/<int:claim_id>/documents/', views.get_claim_documents, name='get_claim_documents'),
 ]
\ No newline at end of file
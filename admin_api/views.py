@@ -4,12 +4,19 @@ from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
 from django.db.models import Count, Sum
+from django.http import StreamingHttpResponse
 from applications.models import Application
 from claims.models import Claim
-from notifications.models import Event, Announcement, Notification, Meeting, ContactMessage, AdminNotification
+from notifications.models import Event, Announcement, Notification, Meeting, ContactMessage, AdminNotification, BroadcastNotification
 from payments.models import Payment
+from accounts.activity import serialize_admin_activity
+from accounts.models import ActivityEvent
 from .permissions import IsAdminOrStaff
+from .pagination import KeysetPagination
+from .exports import EXPORT_RESOURCES, stream_csv, stream_ndjson
+from .stats import get_dashboard_stats
 from notifications.email_service import send_approval_email, send_rejection_email, send_claim_status_email
+from notifications.bulk_mail import create_campaign
 
 User = get_user_model()
 
@@ -17,57 +24,21 @@ User = get_user_model()
 @permission_classes([IsAdminOrStaff])
 def admin_dashboard_stats(request):
     """Get admin dashboard statistics"""
-    stats = {
-        'total_users': User.objects.count(),
-        'total_applications': Application.objects.count(),
-        'pending_applications': Application.objects.filter(status='pending').count(),
-        'total_claims': Claim.objects.count(),
-        'pending_claims': Claim.objects.filter(status='pending').count()
-    }
-    return Response(stats)
+    return Response(get_dashboard_stats())
 
 @api_view(['GET'])
 @permission_classes([IsAdminOrStaff])
 def recent_activities(request):
     """Get recent admin activities"""
-    activities = []
-    
-    # Recent applications
-    recent_apps = Application.objects.order_by('-created_at')[:5]
-    for app in recent_apps:
-        activities.append({
-            'id': app.id,
-            'type': 'application',
-            'title': f'New {app.application_type} application',
-            'description': f'{app.first_name} {app.last_name} submitted application',
-            'date': app.created_at.isoformat(),
-            'status': app.status,
-            'user': f'{app.first_name} {app.last_name}'
-        })
-    
-    # Recent claims
-    recent_claims = Claim.objects.order_by('-created_at')[:5]
-    for claim in recent_claims:
-        activities.append({
-            'id': claim.id,
-            'type': 'claim',
-            'title': f'{claim.get_claim_type_display()} claim',
-            'description': f'${claim.amount_requested} claim submitted',
-            'date': claim.created_at.isoformat(),
-            'status': claim.status,
-            'user': claim.user.username if claim.user else 'Unknown'
-        })
-    
-    # Sort by date
-    activities.sort(key=lambda x: x['date'], reverse=True)
-    
-    return Response(activities[:10])
+    events = ActivityEvent.objects.select_related('user').order_by('-created_at', '-id')[:10]
+    return Response([serialize_admin_activity(event, event.user) for event in events])
 
 @api_view(['GET'])
 @permission_classes([IsAdminOrStaff])
 def users_list(request):
     """Get list of all users"""
-    users = User.objects.all().order_by('-date_joined')
+    paginator = KeysetPagination()
+    users = paginator.paginate_queryset(User.objects.all(), request)
     users_data = []
     
     for user in users:
@@ -82,13 +53,14 @@ def users_list(request):
             'date_joined': user.date_joined.isoformat()
         })
     
-    return Response(users_data)
+    return paginator.get_paginated_response(users_data)
 
 @api_view(['GET'])
 @permission_classes([IsAdminOrStaff])
 def applications_list(request):
     """Get list of all applications"""
-    applications = Application.objects.all().order_by('-created_at')
+    paginator = KeysetPagination()
+    applications = paginator.paginate_queryset(Application.objects.all(), request)
     apps_data = []
     
     for app in applications:
@@ -102,7 +74,7 @@ def applications_list(request):
             'created_at': app.created_at.isoformat()
         })
     
-    return Response(apps_data)
+    return paginator.get_paginated_response(apps_data)
 
 @api_view(['POST'])
 @permission_classes([IsAdminOrStaff])
@@ -157,20 +129,21 @@ def create_announcement(request):
         created_by=request.user
     )
     
-    # Create notifications for high priority announcements
+    # Broadcast high priority announcements to all members (one row, read receipts per user)
+    broadcast = None
     if announcement.priority in ['high', 'urgent']:
-        users = User.objects.filter(is_active=True)
-        notifications = []
-        
-        for user in users:
-            notifications.append(Notification(
-                user=user,
-                title=f'Important: {announcement.title}',
-                message=announcement.content[:200] + '...' if len(announcement.content) > 200 else announcement.content,
-                notification_type='announcement'
-            ))
-        
-        Notification.objects.bulk_create(notifications)
+        broadcast = BroadcastNotification.objects.create(
+            title=f'Important: {announcement.title}',
+            message=announcement.content[:200] + '...' if len(announcement.content) > 200 else announcement.content,
+            notification_type='announcement',
+            source_type='announcement',
+            source_id=announcement.id,
+            created_by=request.user
+        )
+    
+    # Email all active members if requested
+    if data.get('send_email', False):
+        create_campaign(announcement.title, announcement.content, 'announcement', announcement.id, request.user)
     
     return Response({
         'id': announcement.id,
@@ -179,7 +152,8 @@ def create_announcement(request):
         'priority': announcement.priority,
         'is_pinned': announcement.is_pinned,
         'created_by': announcement.created_by.username,
-        'created_at': announcement.created_at.isoformat()
+        'created_at': announcement.created_at.isoformat(),
+        'broadcast_id': broadcast.id if broadcast else None
     }, status=status.HTTP_201_CREATED)
 
 @api_view(['POST'])
@@ -200,19 +174,19 @@ def create_event(request):
         created_by=request.user
     )
     
-    # Create notifications for all users
-    users = User.objects.filter(is_active=True)
-    notifications = []
-    
-    for user in users:
-        notifications.append(Notification(
-            user=user,
-            title='New Event Created',
-            message=f'New event "{event.title}" has been created.',
-            notification_type='event_created'
-        ))
+    # Broadcast to all members
+    broadcast = BroadcastNotification.objects.create(
+        title='New Event Created',
+        message=f'New event "{event.title}" has been created.',
+        notification_type='event_created',
+        source_type='event',
+        source_id=event.id,
+        created_by=request.user
+    )
     
-    Notification.objects.bulk_create(notifications)
+    # Email all active members if requested
+    if data.get('send_email', False):
+        create_campaign(event.title, event.description, 'event', event.id, request.user)
     
     return Response({
         'id': event.id,
@@ -223,7 +197,8 @@ def create_event(request):
         'is_featured': event.is_featured,
         'registration_required': event.registration_required,
         'created_by': event.created_by.username,
-        'created_at': event.created_at.isoformat()
+        'created_at': event.created_at.isoformat(),
+        'broadcast_id': broadcast.id
     }, status=status.HTTP_201_CREATED)
 
 @api_view(['POST'])
@@ -245,20 +220,21 @@ def create_meeting(request):
         created_by=request.user
     )
     
-    # Send notifications if enabled
+    # Broadcast to all members if enabled
+    broadcast = None
     if meeting.send_notifications:
-        users = User.objects.filter(is_active=True)
-        notifications = []
-        
-        for user in users:
-            notifications.append(Notification(
-                user=user,
-                title='New Meeting Scheduled',
-                message=f'Meeting "{meeting.title}" has been scheduled.',
-                notification_type='general'
-            ))
-        
-        Notification.objects.bulk_create(notifications)
+        broadcast = BroadcastNotification.objects.create(
+            title='New Meeting Scheduled',
+            message=f'Meeting "{meeting.title}" has been scheduled.',
+            notification_type='general',
+            source_type='meeting',
+            source_id=meeting.id,
+            created_by=request.user
+        )
+    
+    # Email all active members if requested
+    if data.get('send_email', False):
+        create_campaign(meeting.title, meeting.description, 'meeting', meeting.id, request.user)
     
     return Response({
         'id': meeting.id,
@@ -271,7 +247,8 @@ def create_meeting(request):
         'meeting_link': meeting.meeting_link,
         'require_registration': meeting.require_registration,
         'created_by': meeting.created_by.username,
-        'created_at': meeting.created_at.isoformat()
+        'created_at': meeting.created_at.isoformat(),
+        'broadcast_id': broadcast.id if broadcast else None
     }, status=status.HTTP_201_CREATED)
 
 @api_view(['GET', 'PATCH', 'DELETE'])
@@ -313,7 +290,8 @@ def user_detail(request, user_id):
 @permission_classes([IsAdminOrStaff])
 def admin_claims_list(request):
     """Get all claims for admin"""
-    claims = Claim.objects.all().order_by('-created_at')
+    paginator = KeysetPagination()
+    claims = paginator.paginate_queryset(Claim.objects.select_related('user'), request)
     claims_data = []
     
     for claim in claims:
@@ -332,7 +310,7 @@ def admin_claims_list(request):
             
         claims_data.append(claim_data)
     
-    return Response(claims_data)
+    return paginator.get_paginated_response(claims_data)
 
 @api_view(['PATCH'])
 @permission_classes([IsAdminOrStaff])
@@ -423,7 +401,8 @@ def get_application_documents(request, app_id):
 @permission_classes([IsAdminOrStaff])
 def admin_payments_list(request):
     """Get all payments for admin"""
-    payments = Payment.objects.all().order_by('-created_at')
+    paginator = KeysetPagination()
+    payments = paginator.paginate_queryset(Payment.objects.select_related('user'), request)
     payments_data = []
     
     for payment in payments:
@@ -439,14 +418,15 @@ def admin_payments_list(request):
             'updated_at': payment.updated_at.isoformat()
         })
     
-    return Response(payments_data)
+    return paginator.get_paginated_response(payments_data)
 
 # Content Management CRUD Operations
 @api_view(['GET'])
 @permission_classes([IsAdminOrStaff])
 def admin_announcements_list(request):
     """Get all announcements for admin"""
-    announcements = Announcement.objects.all().order_by('-created_at')
+    paginator = KeysetPagination()
+    announcements = paginator.paginate_queryset(Announcement.objects.select_related('created_by'), request)
     data = []
     for ann in announcements:
         data.append({
@@ -460,7 +440,7 @@ def admin_announcements_list(request):
             'created_at': ann.created_at.isoformat(),
             'updated_at': ann.updated_at.isoformat()
         })
-    return Response(data)
+    return paginator.get_paginated_response(data)
 
 @api_view(['PUT'])
 @permission_classes([IsAdminOrStaff])
@@ -496,6 +476,7 @@ def admin_delete_announcement(request, announcement_id):
     try:
         announcement = Announcement.objects.get(id=announcement_id)
         announcement.delete()
+        BroadcastNotification.objects.filter(source_type='announcement', source_id=announcement_id).delete()
         return Response({'message': 'Announcement deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
     except Announcement.DoesNotExist:
         return Response({'error': 'Announcement not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -504,7 +485,8 @@ def admin_delete_announcement(request, announcement_id):
 @permission_classes([IsAdminOrStaff])
 def admin_events_list(request):
     """Get all events for admin"""
-    events = Event.objects.all().order_by('-created_at')
+    paginator = KeysetPagination()
+    events = paginator.paginate_queryset(Event.objects.select_related('created_by'), request)
     data = []
     for event in events:
         data.append({
@@ -519,7 +501,7 @@ def admin_events_list(request):
             'created_by': event.created_by.username,
             'created_at': event.created_at.isoformat()
         })
-    return Response(data)
+    return paginator.get_paginated_response(data)
 
 @api_view(['PUT'])
 @permission_classes([IsAdminOrStaff])
@@ -560,6 +542,7 @@ def admin_delete_event(request, event_id):
     try:
         event = Event.objects.get(id=event_id)
         event.delete()
+        BroadcastNotification.objects.filter(source_type='event', source_id=event_id).delete()
         return Response({'message': 'Event deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
     except Event.DoesNotExist:
         return Response({'error': 'Event not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -568,7 +551,8 @@ def admin_delete_event(request, event_id):
 @permission_classes([IsAdminOrStaff])
 def admin_meetings_list(request):
     """Get all meetings for admin"""
-    meetings = Meeting.objects.all().order_by('-created_at')
+    paginator = KeysetPagination()
+    meetings = paginator.paginate_queryset(Meeting.objects.select_related('created_by'), request)
     data = []
     for meeting in meetings:
         data.append({
@@ -584,7 +568,7 @@ def admin_meetings_list(request):
             'created_by': meeting.created_by.username,
             'created_at': meeting.created_at.isoformat()
         })
-    return Response(data)
+    return paginator.get_paginated_response(data)
 
 @api_view(['PUT'])
 @permission_classes([IsAdminOrStaff])
@@ -625,6 +609,7 @@ def admin_delete_meeting(request, meeting_id):
     try:
         meeting = Meeting.objects.get(id=meeting_id)
         meeting.delete()
+        BroadcastNotification.objects.filter(source_type='meeting', source_id=meeting_id).delete()
         return Response({'message': 'Meeting deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
     except Meeting.DoesNotExist:
         return Response({'error': 'Meeting not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -633,7 +618,8 @@ def admin_delete_meeting(request, meeting_id):
 @permission_classes([IsAdminOrStaff])
 def admin_contacts_list(request):
     """Get all contact messages for admin"""
-    contacts = ContactMessage.objects.all().order_by('-created_at')
+    paginator = KeysetPagination()
+    contacts = paginator.paginate_queryset(ContactMessage.objects.all(), request)
     data = []
     for contact in contacts:
         data.append({
@@ -646,7 +632,7 @@ def admin_contacts_list(request):
             'status': contact.status,
             'created_at': contact.created_at.isoformat()
         })
-    return Response(data)
+    return paginator.get_paginated_response(data)
 
 @api_view(['PATCH'])
 @permission_classes([IsAdminOrStaff])
@@ -698,4 +684,24 @@ def get_claim_documents(request, claim_id):
         return Response(documents)
         
     except Claim.DoesNotExist:
-        return Response({'error': 'Claim not found'}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        return Response({'error': 'Claim not found'}, status=status.HTTP_404_NOT_FOUND)
+
+@api_view(['GET'])
+@permission_classes([IsAdminOrStaff])
+def admin_export(request, resource):
+    """Stream a full export of members, applications, claims or payments as NDJSON or CSV"""
+    if resource not in EXPORT_RESOURCES:
+        return Response({'error': 'Unknown export resource'}, status=status.HTTP_404_NOT_FOUND)
+    
+    output = request.GET.get('output', 'ndjson')
+    if output == 'csv':
+        response = StreamingHttpResponse(stream_csv(resource), content_type='text/csv')
+        filename = f'{resource}.csv'
+    elif output == 'ndjson':
+        response = StreamingHttpResponse(stream_ndjson(resource), content_type='application/x-ndjson')
+        filename = f'{resource}.ndjson'
+    else:
+        return Response({'error': 'Invalid output format'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
\ No newline at end of file
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Application
+from accounts.signals import sync_after_update
 
 @admin.register(Application)
 class ApplicationAdmin(admin.ModelAdmin):
@@ -18,16 +19,20 @@ class ApplicationAdmin(admin.ModelAdmin):
     
     def approve_applications(self, request, queryset):
         from django.utils import timezone
-        updated = queryset.filter(status='pending').update(
+        pks = list(queryset.filter(status='pending').values_list('pk', flat=True))
+        updated = Application.objects.filter(pk__in=pks, status='pending').update(
             status='approved',
             approved_by=request.user,
             approved_at=timezone.now()
         )
+        sync_after_update(Application, pks)
         self.message_user(request, f'{updated} applications approved successfully.')
     approve_applications.short_description = 'Approve selected applications'
     
     def reject_applications(self, request, queryset):
-        updated = queryset.filter(status='pending').update(status='rejected')
+        pks = list(queryset.filter(status='pending').values_list('pk', flat=True))
+        updated = Application.objects.filter(pk__in=pks, status='pending').update(status='rejected')
+        sync_after_update(Application, pks)
         self.message_user(request, f'{updated} applications rejected successfully.')
     reject_applications.short_description = 'Reject selected applications'
     
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0005_application_registration_fee'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['status', '-created_at'], name='app_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['-created_at', '-id'], name='app_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['-created_at'], name='app_pending_created_idx'),
+        ),
+    ]
@@ -1,9 +1,11 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
+from pamoja_kenya.tracking import TrackedFieldsMixin
 
 User = get_user_model()
 
-class Application(models.Model):
+class Application(TrackedFieldsMixin, models.Model):
     APPLICATION_TYPES = [
         ('single', 'Single Family'),
         ('double', 'Double Family'),
@@ -118,10 +120,24 @@ class Application(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-created_at'], name='app_status_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='app_created_id_idx'),
+            models.Index(fields=['-created_at'], condition=models.Q(status='pending'), name='app_pending_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} - {self.application_type} ({self.status})"
 
+    def save(self, *args, **kwargs):
+        # Stamp approval here rather than in pre_save so the dirty-field save picks it up.
+        # Only a loaded or saved instance can tell that its status moved to approved.
+        if self.has_snapshot and self.status == 'approved' and self.loaded_value('status') != 'approved':
+            self.approved_at = timezone.now()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'approved_at'}
+        super().save(*args, **kwargs)
+
     @property
     def full_name(self):
         return f"{self.first_name} {self.middle_name} {self.last_name}".strip()
\ No newline at end of file
@@ -1,3 +1,97 @@
-from django.test import TestCase
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from accounts.dashboard import get_summary
+from accounts.models import ActivityEvent
+from .models import Application
+
+User = get_user_model()
+
+
+def create_application(user, **fields):
+    return Application.objects.create(
+        user=user, application_type='single', first_name='Jane', last_name='Doe', email=user.email,
+        phone='555-0100', city='Minneapolis', state='MN', zip_code='55401', amount=Decimal('200.00'), **fields
+    )
+
+
+class ApplicationAdminActionTests(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(username='admin', email='admin@example.com', password='x')
+        self.member = User.objects.create_user(username='member', email='member@example.com', password='x')
+        self.request = RequestFactory().post('/admin/applications/application/')
+        self.request.user = self.admin_user
+        self.model_admin = site._registry[Application]
+
+    @mock.patch('applications.signals.send_approval_email')
+    def test_bulk_approve_keeps_summary_and_activity_in_step(self, send_approval_email):
+        application = create_application(self.member)
+        self.assertEqual(get_summary(self.member).pending_applications, 1)
+
+        with mock.patch.object(self.model_admin, 'message_user'), self.captureOnCommitCallbacks(execute=True):
+            self.model_admin.approve_applications(self.request, Application.objects.filter(pk=application.pk))
+
+        summary = get_summary(self.member)
+        self.assertEqual((summary.total_applications, summary.pending_applications), (1, 0))
+        self.assertEqual(
+            list(ActivityEvent.objects.filter(user=self.member).values_list('action', flat=True).order_by('id')),
+            ['Application Submitted', 'Application Approved'],
+        )
+        # Bulk actions don't email each applicant
+        send_approval_email.assert_not_called()
+
+
+class DirtyFieldSaveTests(TestCase):
+    def setUp(self):
+        self.member = User.objects.create_user(username='member', email='member@example.com', password='x')
+        self.application = create_application(self.member)
+
+    def test_unchanged_instance_saves_without_a_query(self):
+        application = Application.objects.get(pk=self.application.pk)
+        with self.assertNumQueries(0):
+            application.save()
+
+    def test_save_writes_only_changed_columns(self):
+        application = Application.objects.get(pk=self.application.pk)
+        application.phone = '555-0199'
+        self.assertEqual(application.changed_fields, ['phone'])
+        self.assertEqual(application.loaded_value('phone'), '555-0100')
+        with CaptureQueriesContext(connection) as queries:
+            application.save()
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "applications_application"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"phone"', updates[0])
+        self.assertIn('"updated_at"', updates[0])
+        self.assertNotIn('"city"', updates[0])
+        self.assertEqual(application.changed_fields, [])
+
+    @mock.patch('applications.signals.send_approval_email')
+    def test_concurrent_edits_to_different_fields_both_survive(self, send_approval_email):
+        first = Application.objects.get(pk=self.application.pk)
+        second = Application.objects.get(pk=self.application.pk)
+        first.city = 'St Paul'
+        first.save()
+        second.status = 'approved'
+        second.save()
+        self.application.refresh_from_db()
+        self.assertEqual((self.application.city, self.application.status), ('St Paul', 'approved'))
+
+    @mock.patch('applications.signals.send_approval_email')
+    def test_approved_at_is_stamped_on_the_transition_only(self, send_approval_email):
+        application = Application.objects.get(pk=self.application.pk)
+        application.status = 'approved'
+        application.save(update_fields=['status'])
+        approved_at = Application.objects.values_list('approved_at', flat=True).get(pk=application.pk)
+        self.assertIsNotNone(approved_at)
+
+        # Neither a create nor an instance built without a loaded snapshot is a transition
+        self.assertIsNone(create_application(self.member, status='approved').approved_at)
+        copy = Application(**{field.attname: getattr(application, field.attname) for field in Application._meta.concrete_fields})
+        copy.save()
+        self.assertEqual(Application.objects.values_list('approved_at', flat=True).get(pk=application.pk), approved_at)
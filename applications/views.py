@@ -5,9 +5,11 @@ from rest_framework.response import Response
 from django.utils import timezone
 from .models import Application
 from notifications.email_service import send_application_confirmation_email
+from accounts.idempotency import idempotent
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@idempotent
 def create_application(request):
     """Create a new membership application"""
     data = request.data
@@ -94,6 +96,7 @@ def my_applications(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@idempotent
 def submit_application(request):
     """Submit new application"""
     data = request.data
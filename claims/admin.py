@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.utils import timezone
 from .models import Claim, Beneficiary, BenefitPayment
+from accounts.signals import sync_after_update
 
 @admin.register(Claim)
 class ClaimAdmin(admin.ModelAdmin):
@@ -13,20 +14,24 @@ class ClaimAdmin(admin.ModelAdmin):
     actions = ['approve_claims', 'reject_claims']
     
     def approve_claims(self, request, queryset):
-        updated = queryset.filter(status='pending').update(
+        pks = list(queryset.filter(status='pending').values_list('pk', flat=True))
+        updated = Claim.objects.filter(pk__in=pks, status='pending').update(
             status='approved',
             reviewed_by=request.user,
             reviewed_at=timezone.now()
         )
+        sync_after_update(Claim, pks)
         self.message_user(request, f'{updated} claims approved successfully.')
     approve_claims.short_description = 'Approve selected claims'
     
     def reject_claims(self, request, queryset):
-        updated = queryset.filter(status='pending').update(
+        pks = list(queryset.filter(status='pending').values_list('pk', flat=True))
+        updated = Claim.objects.filter(pk__in=pks, status='pending').update(
             status='rejected',
             reviewed_by=request.user,
             reviewed_at=timezone.now()
         )
+        sync_after_update(Claim, pks)
         self.message_user(request, f'{updated} claims rejected successfully.')
     reject_claims.short_description = 'Reject selected claims'
     
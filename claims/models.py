@@ -1,9 +1,10 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from pamoja_kenya.tracking import TrackedFieldsMixin
 
 User = get_user_model()
 
-class Claim(models.Model):
+class Claim(TrackedFieldsMixin, models.Model):
     CLAIM_TYPES = [
         ('death', 'Death Benefit'),
         ('medical', 'Medical Benefit'),
@@ -37,6 +38,12 @@ class Claim(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='claim_user_created_idx'),
+            models.Index(fields=['status'], name='claim_status_idx'),
+            models.Index(fields=['-created_at', '-id'], name='claim_created_id_idx'),
+            models.Index(fields=['-created_at'], condition=models.Q(status='pending'), name='claim_pending_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.get_claim_type_display()} - ${self.amount_requested}"
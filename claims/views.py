@@ -6,10 +6,12 @@ from django.utils import timezone
 from .models import Claim, Beneficiary, BenefitPayment
 from .serializers import ClaimSerializer, ClaimCreateSerializer, BeneficiarySerializer
 from notifications.models import Notification
+from accounts.idempotency import idempotent
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 @parser_classes([parsers.MultiPartParser, parsers.FormParser])
+@idempotent
 def submit_claim(request):
     """Submit claim with multipart form data and file upload"""
     # Get user
@@ -92,7 +94,7 @@ def user_claims(request):
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def admin_claims_list(request):
-    claims = Claim.objects.all()
+    claims = Claim.objects.select_related('user')
     claims_data = []
     
     for claim in claims:
@@ -154,7 +156,7 @@ def admin_review_claim(request, claim_id):
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def beneficiaries_list(request):
-    beneficiaries = Beneficiary.objects.filter(is_active=True)
+    beneficiaries = Beneficiary.objects.filter(is_active=True).select_related('user')
     beneficiaries_data = []
     
     for beneficiary in beneficiaries:
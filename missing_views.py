@@ -22,11 +22,13 @@ def profile(request):
 @permission_classes([IsAuthenticated])
 def stats(request):
     user = request.user
+    from accounts.dashboard import get_summary
+    summary = get_summary(user)
     return Response({
-        'applications': user.applications.count() if hasattr(user, 'applications') else 0,
-        'payments': user.payment_set.filter(status='completed').count() if hasattr(user, 'payment_set') else 0,
+        'applications': summary.total_applications,
+        'payments': summary.completed_payments,
         'membershipStatus': getattr(user, 'membership_status', 'active'),
-        'totalPaid': 0
+        'totalPaid': float(summary.total_paid)
     })
 
 @api_view(['POST'])
@@ -37,22 +39,5 @@ def password_reset(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def admin_stats(request):
-    from applications.models import Application
-    from payments.models import Payment
-    
-    try:
-        from claims.models import Claim
-        claims_count = Claim.objects.count()
-        pending_claims = Claim.objects.filter(status='pending').count()
-    except:
-        claims_count = 0
-        pending_claims = 0
-    
-    return Response({
-        'total_users': User.objects.count(),
-        'total_applications': Application.objects.count(),
-        'pending_applications': Application.objects.filter(status='pending').count(),
-        'total_claims': claims_count,
-        'pending_claims': pending_claims,
-        'total_payments': Payment.objects.count()
-    })
\ No newline at end of file
+    from admin_api.stats import get_dashboard_stats
+    return Response(get_dashboard_stats())
@@ -1,8 +1,12 @@
 from django.contrib import admin
 from .models import (
     Notification, Event, Announcement, EventRegistration,
-    Meeting, ContactMessage, AdminNotification
+    Meeting, ContactMessage, AdminNotification, OutboundEmail,
+    EmailCampaign, EmailCampaignRecipient,
+    BroadcastNotification, BroadcastReceipt, NotificationReadState
 )
+from .public_cache import bump_content_version
+from .unread import rebuild_unread_counts
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
@@ -16,14 +20,43 @@ class NotificationAdmin(admin.ModelAdmin):
     
     def mark_as_read(self, request, queryset):
         updated = queryset.update(is_read=True)
+        rebuild_unread_counts(queryset.values_list('user_id', flat=True).distinct())
         self.message_user(request, f'{updated} notifications marked as read.')
     mark_as_read.short_description = 'Mark selected notifications as read'
     
     def mark_as_unread(self, request, queryset):
         updated = queryset.update(is_read=False)
+        rebuild_unread_counts(queryset.values_list('user_id', flat=True).distinct())
         self.message_user(request, f'{updated} notifications marked as unread.')
     mark_as_unread.short_description = 'Mark selected notifications as unread'
 
+@admin.register(BroadcastNotification)
+class BroadcastNotificationAdmin(admin.ModelAdmin):
+    list_display = ('title', 'get_notification_type_display', 'source_type', 'is_active', 'created_at')
+    list_filter = ('notification_type', 'source_type', 'is_active', 'created_at')
+    search_fields = ('title', 'message')
+    readonly_fields = ('created_at',)
+    date_hierarchy = 'created_at'
+
+@admin.register(BroadcastReceipt)
+class BroadcastReceiptAdmin(admin.ModelAdmin):
+    list_display = ('user', 'broadcast', 'read_at')
+    search_fields = ('user__username', 'user__email', 'broadcast__title')
+    raw_id_fields = ('broadcast', 'user')
+
+@admin.register(NotificationReadState)
+class NotificationReadStateAdmin(admin.ModelAdmin):
+    list_display = ('user', 'unread_count', 'last_read_at', 'updated_at')
+    search_fields = ('user__username', 'user__email')
+    readonly_fields = ('updated_at',)
+    
+    actions = ['recount_unread']
+    
+    def recount_unread(self, request, queryset):
+        rebuild_unread_counts(queryset.values_list('pk', flat=True))
+        self.message_user(request, f'{queryset.count()} unread counters recounted.')
+    recount_unread.short_description = 'Recount unread notifications'
+
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
     list_display = ('title', 'date', 'location', 'is_active', 'is_featured', 'created_by', 'created_at')
@@ -51,16 +84,19 @@ class EventAdmin(admin.ModelAdmin):
     
     def activate_events(self, request, queryset):
         updated = queryset.update(is_active=True)
+        bump_content_version(Event)
         self.message_user(request, f'{updated} events activated.')
     activate_events.short_description = 'Activate selected events'
     
     def deactivate_events(self, request, queryset):
         updated = queryset.update(is_active=False)
+        bump_content_version(Event)
         self.message_user(request, f'{updated} events deactivated.')
     deactivate_events.short_description = 'Deactivate selected events'
     
     def feature_events(self, request, queryset):
         updated = queryset.update(is_featured=True)
+        bump_content_version(Event)
         self.message_user(request, f'{updated} events featured.')
     feature_events.short_description = 'Feature selected events'
 
@@ -91,16 +127,19 @@ class AnnouncementAdmin(admin.ModelAdmin):
     
     def activate_announcements(self, request, queryset):
         updated = queryset.update(is_active=True)
+        bump_content_version(Announcement)
         self.message_user(request, f'{updated} announcements activated.')
     activate_announcements.short_description = 'Activate selected announcements'
     
     def deactivate_announcements(self, request, queryset):
         updated = queryset.update(is_active=False)
+        bump_content_version(Announcement)
         self.message_user(request, f'{updated} announcements deactivated.')
     deactivate_announcements.short_description = 'Deactivate selected announcements'
     
     def pin_announcements(self, request, queryset):
         updated = queryset.update(is_pinned=True)
+        bump_content_version(Announcement)
         self.message_user(request, f'{updated} announcements pinned.')
     pin_announcements.short_description = 'Pin selected announcements'
 
@@ -166,4 +205,57 @@ class AdminNotificationAdmin(admin.ModelAdmin):
     def mark_as_read(self, request, queryset):
         updated = queryset.update(is_read=True)
         self.message_user(request, f'{updated} admin notifications marked as read.')
-    mark_as_read.short_description = 'Mark as read'
\ No newline at end of file
+    mark_as_read.short_description = 'Mark as read'
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('subject', 'recipients', 'last_error')
+    readonly_fields = ('created_at', 'sent_at', 'locked_at')
+    date_hierarchy = 'created_at'
+    
+    actions = ['requeue_emails']
+    
+    def requeue_emails(self, request, queryset):
+        from django.utils import timezone
+        updated = queryset.exclude(status='sent').update(
+            status='pending', attempts=0, next_attempt_at=timezone.now(), locked_at=None
+        )
+        self.message_user(request, f'{updated} emails requeued for delivery.')
+    requeue_emails.short_description = 'Requeue selected emails'
+
+@admin.register(EmailCampaign)
+class EmailCampaignAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'source_type', 'status', 'total_recipients', 'sent_count', 'failed_count', 'created_at')
+    list_filter = ('status', 'source_type', 'created_at')
+    search_fields = ('subject',)
+    readonly_fields = ('created_at', 'started_at', 'completed_at', 'sent_count', 'failed_count', 'total_recipients',
+                       'next_attempt_at', 'locked_at')
+    date_hierarchy = 'created_at'
+    
+    actions = ['resume_campaigns']
+    
+    def resume_campaigns(self, request, queryset):
+        from .bulk_mail import dispatch_campaign
+        campaigns = queryset.exclude(status='completed')
+        # Failed campaigns carry on with their pending recipients
+        campaigns.filter(status='failed').update(status='sending')
+        for campaign in campaigns:
+            dispatch_campaign(campaign.pk)
+        self.message_user(request, f'{campaigns.count()} campaigns dispatched.')
+    resume_campaigns.short_description = 'Resume sending selected campaigns'
+
+@admin.register(EmailCampaignRecipient)
+class EmailCampaignRecipientAdmin(admin.ModelAdmin):
+    list_display = ('email', 'campaign', 'status', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('email', 'campaign__subject')
+    raw_id_fields = ('campaign', 'user')
+    
+    actions = ['requeue_recipients']
+    
+    def requeue_recipients(self, request, queryset):
+        updated = queryset.exclude(status='sent').update(status='pending', error='')
+        self.message_user(request, f'{updated} recipients requeued; resume their campaigns to send.')
+    requeue_recipients.short_description = 'Requeue selected recipients'
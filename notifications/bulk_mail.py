@@ -0,0 +1,247 @@
+"""
+Bulk mailer for broadcast announcements, events and meetings.
+
+A campaign is rendered once, its recipient list is materialised in batches, and
+messages go out through a single reused connection via ``send_messages``,
+paced to ``EMAIL_BULK_RATE_PER_SECOND``. The connection is SMTP, or the Firebase
+bulk function when ``USE_FIREBASE_EMAIL`` is set; if that function's circuit
+breaker is open the campaign pauses and is re-queued for when it may recover.
+Each recipient row records its own delivery status so a restarted campaign only
+sends to who is still pending.
+
+A worker leases the campaign while it sends and renews the lease after every
+batch. ``notifications.tasks.resume_email_campaigns`` re-dispatches campaigns
+that were never picked up (the broker was down), whose pause is over, or whose
+worker died mid-send, so none stay queued forever.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .firebase_email_service import CircuitOpenError, DeliveryUnknownError, PartialDeliveryError
+from .models import EmailCampaign, EmailCampaignRecipient
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+def create_campaign(title, content, source_type='', source_id=None, created_by=None):
+    """Render a broadcast once and queue it for background delivery to all active members."""
+    context = {
+        'title': title,
+        'content': content,
+        'site_name': 'Pamoja Kenya MN',
+        'frontend_url': settings.FRONTEND_URL,
+    }
+    campaign = EmailCampaign.objects.create(
+        subject=f'{title} - Pamoja Kenya MN',
+        body=render_to_string('emails/broadcast.txt', context),
+        html_body=render_to_string('emails/broadcast.html', context),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        source_type=source_type,
+        source_id=source_id,
+        created_by=created_by,
+    )
+    transaction.on_commit(lambda: dispatch_campaign(campaign.pk))
+    return campaign
+
+
+def dispatch_campaign(campaign_id, countdown=None):
+    """Hand a campaign to a worker; if the broker is down the periodic sweep picks it up."""
+    from .tasks import send_email_campaign
+    try:
+        send_email_campaign.apply_async((campaign_id,), countdown=countdown)
+    except Exception as e:
+        logger.warning(f"Could not enqueue email campaign {campaign_id}, leaving it for the sweep: {e}")
+
+
+def resumable_campaigns(now):
+    """Queued or paused campaigns that are due and not leased by a live worker."""
+    lease_expired = now - timedelta(seconds=getattr(settings, 'EMAIL_CAMPAIGN_LEASE_SECONDS', 600))
+    return EmailCampaign.objects.filter(
+        Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now),
+        Q(locked_at__isnull=True) | Q(locked_at__lt=lease_expired),
+        status__in=['queued', 'sending'],
+    )
+
+
+def claim_campaign(campaign_id):
+    """Atomically take the campaign's lease. None if another worker holds it or it isn't due."""
+    now = timezone.now()
+    if not resumable_campaigns(now).filter(pk=campaign_id).update(locked_at=now):
+        return None
+    return EmailCampaign.objects.get(pk=campaign_id)
+
+
+def due_campaign_ids(limit=100):
+    return list(resumable_campaigns(timezone.now()).order_by('created_at').values_list('pk', flat=True)[:limit])
+
+
+def populate_recipients(campaign):
+    """Snapshot active members into recipient rows; safe to re-run thanks to ignore_conflicts."""
+    users = (
+        User.objects.filter(is_active=True)
+        .exclude(email='')
+        .order_by('id')
+        .values_list('id', 'email')
+        .iterator(chunk_size=2000)
+    )
+    batch = []
+    for user_id, email in users:
+        batch.append(EmailCampaignRecipient(campaign=campaign, user_id=user_id, email=email))
+        if len(batch) >= 1000:
+            EmailCampaignRecipient.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        EmailCampaignRecipient.objects.bulk_create(batch, ignore_conflicts=True)
+
+    campaign.total_recipients = campaign.recipients.count()
+    campaign.save(update_fields=['total_recipients'])
+
+
+def campaign_connection():
+    if getattr(settings, 'USE_FIREBASE_EMAIL', False):
+        return get_connection('notifications.firebase_email_service.FirebaseEmailBackend', fail_silently=False)
+    return get_connection(fail_silently=False)
+
+
+def _build_message(campaign, recipient, connection):
+    message = EmailMultiAlternatives(
+        campaign.subject, campaign.body, campaign.from_email or settings.DEFAULT_FROM_EMAIL,
+        [recipient.email], connection=connection,
+    )
+    if campaign.html_body:
+        message.attach_alternative(campaign.html_body, 'text/html')
+    return message
+
+
+def _send_batch(campaign, batch, connection):
+    """
+    Send one batch; on a batch-level error fall back to per-message sends to
+    attribute failures. Returns (sent pks, {failed pk: error}, unknown pks).
+    Recipients whose delivery timed out are ``unknown``; the batch stops there
+    and recipients after them are left pending.
+    """
+    try:
+        connection.send_messages([_build_message(campaign, r, connection) for r in batch])
+        return [r.pk for r in batch], {}, []
+    except CircuitOpenError:
+        raise
+    except DeliveryUnknownError as e:
+        # Resending could duplicate whatever the timed-out call delivered
+        logger.warning(f"Campaign {campaign.pk} batch timed out; {len(e.unknown)} recipients left for reconciliation")
+        return (
+            [r.pk for r in batch if r.email in e.delivered],
+            {r.pk: e.failed[r.email] for r in batch if r.email in e.failed},
+            [r.pk for r in batch if r.email in e.unknown],
+        )
+    except PartialDeliveryError as e:
+        # The transport said which addresses failed; the rest were delivered
+        failed = {r.pk: e.failed[r.email] for r in batch if r.email in e.failed}
+        return [r.pk for r in batch if r.pk not in failed], failed, []
+    except Exception as e:
+        logger.warning(f"Campaign {campaign.pk} batch failed ({e}); retrying recipients individually")
+
+    # The connection may have been dropped by the server; start a fresh one
+    connection.close()
+    connection.open()
+    sent, failed = [], {}
+    for recipient in batch:
+        try:
+            connection.send_messages([_build_message(campaign, recipient, connection)])
+            sent.append(recipient.pk)
+        except CircuitOpenError:
+            raise
+        except DeliveryUnknownError:
+            return sent, failed, [recipient.pk]
+        except Exception as e:
+            failed[recipient.pk] = str(e)
+    return sent, failed, []
+
+
+def send_campaign(campaign_id):
+    """
+    Deliver all pending recipients of a campaign over one persistent connection.
+    Returns None when the campaign is finished, paused or being sent by another worker.
+    """
+    campaign = claim_campaign(campaign_id)
+    if campaign is None:
+        return None
+
+    if campaign.status == 'queued':
+        populate_recipients(campaign)
+        campaign.started_at = timezone.now()
+    campaign.status = 'sending'
+    campaign.next_attempt_at = None
+    campaign.save(update_fields=['status', 'started_at', 'next_attempt_at'])
+
+    batch_size = getattr(settings, 'EMAIL_BULK_BATCH_SIZE', 100)
+    rate = getattr(settings, 'EMAIL_BULK_RATE_PER_SECOND', 0)
+    pending = campaign.recipients.filter(status='pending').order_by('id')
+
+    connection = campaign_connection()
+    connection.open()
+    paused = None
+    try:
+        last_id = 0
+        while True:
+            batch = list(pending.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            started = time.monotonic()
+
+            sent, failed, unknown = _send_batch(campaign, batch, connection)
+            # Recipients after a timed-out call were never tried; the next batch starts with them
+            last_id = max(unknown) if unknown else batch[-1].pk
+            now = timezone.now()
+            if sent:
+                EmailCampaignRecipient.objects.filter(pk__in=sent).update(status='sent', sent_at=now)
+            for pk, error in failed.items():
+                EmailCampaignRecipient.objects.filter(pk=pk).update(status='failed', error=error)
+            if unknown:
+                EmailCampaignRecipient.objects.filter(pk__in=unknown).update(
+                    status='unknown', error='Delivery timed out; the message may have been sent'
+                )
+            EmailCampaign.objects.filter(pk=campaign.pk).update(
+                sent_count=F('sent_count') + len(sent),
+                failed_count=F('failed_count') + len(failed),
+                locked_at=now,
+            )
+
+            # Throttle to the provider's sending rate
+            if rate:
+                remaining = len(batch) / rate - (time.monotonic() - started)
+                if remaining > 0:
+                    time.sleep(remaining)
+    except CircuitOpenError as e:
+        paused = e
+    except Exception as e:
+        logger.error(f"Email campaign {campaign.pk} aborted: {e}")
+        EmailCampaign.objects.filter(pk=campaign.pk).update(status='failed', locked_at=None)
+        raise
+    finally:
+        connection.close()
+
+    if paused:
+        # Unsent recipients stay pending; a later run resumes after them
+        logger.warning(f"Email campaign {campaign.pk} paused: {paused}")
+        EmailCampaign.objects.filter(pk=campaign.pk).update(
+            next_attempt_at=timezone.now() + timedelta(seconds=paused.retry_after), locked_at=None
+        )
+        dispatch_campaign(campaign.pk, countdown=paused.retry_after)
+        campaign.refresh_from_db()
+        return campaign
+
+    EmailCampaign.objects.filter(pk=campaign.pk).update(status='completed', completed_at=timezone.now(), locked_at=None)
+    campaign.refresh_from_db()
+    logger.info(f"Email campaign {campaign.pk} completed: {campaign.sent_count} sent, {campaign.failed_count} failed")
+    return campaign
@@ -1,18 +1,21 @@
-from django.core.mail import send_mail
+from django.template import TemplateDoesNotExist
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from .models import Notification, ContactMessage, AdminNotification
+from .outbox import queue_email
+
+def render_html_message(template_name, context):
+    """Render the HTML alternative; returns None (plain text only) when the template is missing"""
+    try:
+        return render_to_string(template_name, context)
+    except TemplateDoesNotExist:
+        return None
 
 def send_registration_email(user, application):
     """Send email when user registers"""
-    # Use Firebase email service if configured
-    if getattr(settings, 'USE_FIREBASE_EMAIL', False):
-        return firebase_email_service.send_application_confirmation(user, application)
-    
-    # Fallback to Django email
     subject = 'Welcome to Pamoja Kenya - Registration Received'
     
     context = {
@@ -21,7 +24,7 @@ def send_registration_email(user, application):
         'site_name': 'Pamoja Kenya MN'
     }
     
-    html_message = render_to_string('emails/registration_confirmation.html', context)
+    html_message = render_html_message('emails/registration_confirmation.html', context)
     plain_message = f"""
     Dear {application.full_name},
     
@@ -42,13 +45,12 @@ def send_registration_email(user, application):
     """
     
     try:
-        send_mail(
+        queue_email(
             subject=subject,
             message=plain_message,
             from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=[application.email],
             html_message=html_message,
-            fail_silently=False,
         )
         
         # Create notification
@@ -66,11 +68,6 @@ def send_registration_email(user, application):
 
 def send_approval_email(user, application):
     """Send email when application is approved"""
-    # Use Firebase email service if configured
-    if getattr(settings, 'USE_FIREBASE_EMAIL', False):
-        return firebase_email_service.send_application_status_update(user, application)
-    
-    # Fallback to Django email
     subject = 'Congratulations! Your Pamoja Kenya Application Approved'
     
     context = {
@@ -79,7 +76,7 @@ def send_approval_email(user, application):
         'site_name': 'Pamoja Kenya MN'
     }
     
-    html_message = render_to_string('emails/application_approved.html', context)
+    html_message = render_html_message('emails/application_approved.html', context)
     plain_message = f"""
     Dear {application.full_name},
     
@@ -97,13 +94,12 @@ def send_approval_email(user, application):
     """
     
     try:
-        send_mail(
+        queue_email(
             subject=subject,
             message=plain_message,
             from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=[application.email],
             html_message=html_message,
-            fail_silently=False,
         )
         
         # Create notification
@@ -130,7 +126,7 @@ def send_rejection_email(user, application, reason):
         'site_name': 'Pamoja Kenya MN'
     }
     
-    html_message = render_to_string('emails/application_rejected.html', context)
+    html_message = render_html_message('emails/application_rejected.html', context)
     plain_message = f"""
     Dear {application.full_name},
     
@@ -150,13 +146,12 @@ def send_rejection_email(user, application, reason):
     """
     
     try:
-        send_mail(
+        queue_email(
             subject=subject,
             message=plain_message,
             from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=[application.email],
             html_message=html_message,
-            fail_silently=False,
         )
         
         # Create notification
@@ -174,11 +169,6 @@ def send_rejection_email(user, application, reason):
 
 def send_document_review_email(user, application):
     """Send document review notification email"""
-    # Use Firebase email service if configured
-    if getattr(settings, 'USE_FIREBASE_EMAIL', False):
-        return firebase_email_service.send_document_review_notification(user, application)
-    
-    # Fallback to Django email
     status_text = application.get_identity_document_status_display()
     subject = f'Document Review {status_text} - Pamoja Kenya MN'
     
@@ -198,12 +188,11 @@ def send_document_review_email(user, application):
     """
     
     try:
-        send_mail(
+        queue_email(
             subject=subject,
             message=message,
             from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=[user.email],
-            fail_silently=False,
         )
         
         # Create notification
@@ -221,11 +210,6 @@ def send_document_review_email(user, application):
 
 def send_payment_confirmation_email(user, payment):
     """Send email when payment is received"""
-    # Use Firebase email service if configured
-    if getattr(settings, 'USE_FIREBASE_EMAIL', False):
-        return firebase_email_service.send_payment_confirmation(user, payment)
-    
-    # Fallback to Django email
     subject = 'Payment Confirmation - Pamoja Kenya MN'
     
     context = {
@@ -234,7 +218,7 @@ def send_payment_confirmation_email(user, payment):
         'site_name': 'Pamoja Kenya MN'
     }
     
-    html_message = render_to_string('emails/payment_confirmation.html', context)
+    html_message = render_html_message('emails/payment_confirmation.html', context)
     plain_message = f"""
     Dear {payment.payer_name},
     
@@ -253,13 +237,12 @@ def send_payment_confirmation_email(user, payment):
     """
     
     try:
-        send_mail(
+        queue_email(
             subject=subject,
             message=plain_message,
             from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=[payment.payer_email],
             html_message=html_message,
-            fail_silently=False,
         )
         
         # Create notification
@@ -285,7 +268,7 @@ def send_welcome_email(user):
         'frontend_url': settings.FRONTEND_URL
     }
     
-    html_message = render_to_string('emails/welcome_email.html', context)
+    html_message = render_html_message('emails/welcome_email.html', context)
     plain_message = f"""
     Dear {user.first_name} {user.last_name},
     
@@ -306,13 +289,12 @@ def send_welcome_email(user):
     """
     
     try:
-        send_mail(
+        queue_email(
             subject=subject,
             message=plain_message,
             from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=[user.email],
             html_message=html_message,
-            fail_silently=False,
         )
         
         # Create notification
@@ -339,7 +321,7 @@ def send_application_confirmation_email(user, application):
         'frontend_url': settings.FRONTEND_URL
     }
     
-    html_message = render_to_string('emails/application_confirmation.html', context)
+    html_message = render_html_message('emails/application_confirmation.html', context)
     plain_message = f"""
     Dear {application.full_name},
     
@@ -362,13 +344,12 @@ def send_application_confirmation_email(user, application):
     """
     
     try:
-        send_mail(
+        queue_email(
             subject=subject,
             message=plain_message,
             from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=[application.email],
             html_message=html_message,
-            fail_silently=False,
         )
         
         # Create notification
@@ -397,7 +378,7 @@ def send_claim_status_email(user, claim):
         'frontend_url': settings.FRONTEND_URL
     }
     
-    html_message = render_to_string('emails/claim_status_update.html', context)
+    html_message = render_html_message('emails/claim_status_update.html', context)
     
     if claim.status == 'approved':
         message_content = f"Your claim for {claim.beneficiary.full_name} has been approved. The claim amount of ${claim.amount} will be processed."
@@ -431,13 +412,12 @@ def send_claim_status_email(user, claim):
     """
     
     try:
-        send_mail(
+        queue_email(
             subject=subject,
             message=plain_message,
             from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=[user.email],
             html_message=html_message,
-            fail_silently=False,
         )
         
         # Create notification
@@ -477,12 +457,11 @@ def send_contact_form_notification(contact_message):
     """
     
     try:
-        send_mail(
+        queue_email(
             subject=subject,
             message=plain_message,
             from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=admin_emails,
-            fail_silently=False,
         )
         
         # Create admin notification
@@ -510,7 +489,7 @@ def send_password_reset_email(user, reset_url):
         'frontend_url': settings.FRONTEND_URL
     }
     
-    html_message = render_to_string('emails/password_reset.html', context)
+    html_message = render_html_message('emails/password_reset.html', context)
     plain_message = f"""
     Dear {user.first_name} {user.last_name},
     
@@ -528,13 +507,12 @@ def send_password_reset_email(user, reset_url):
     """
     
     try:
-        send_mail(
+        queue_email(
             subject=subject,
             message=plain_message,
             from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=[user.email],
             html_message=html_message,
-            fail_silently=False,
         )
         
         return True
@@ -1,12 +1,121 @@
-import json
+"""
+Email delivery through the Firebase email functions.
+
+All calls share one pooled keep-alive ``requests.Session`` with short
+connect/read timeouts. ``send_batch`` packs up to ``FIREBASE_EMAIL_BATCH_SIZE``
+messages into each call to the ``sendBulkEmails`` function, and
+``FirebaseEmailBackend`` exposes that as a Django email backend for the bulk
+mailer. A ``CircuitBreaker`` stops calling the function after repeated
+failures; while it is open, calls raise ``CircuitOpenError`` at once and
+callers spool the mail to the outbox (``notifications.outbox``) instead.
+
+The bulk function sends its batch one message at a time, so a call that times
+out while reading may already have delivered part of it. That raises
+``DeliveryUnknownError`` naming the addresses in doubt, and callers record them
+for reconciliation rather than resend them. The read timeout of a bulk call
+grows with its size (``FIREBASE_EMAIL_SECONDS_PER_MESSAGE``) so a healthy batch
+finishes inside it.
+"""
+import threading
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
+from django.core.mail.backends.base import BaseEmailBackend
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+class FirebaseEmailError(Exception):
+    def __init__(self, *args):
+        super().__init__(*args)
+        # Set by send_batch: messages handled before the failing call, and the rejections among them
+        self.completed, self.failures = 0, {}
+
+
+class CircuitOpenError(FirebaseEmailError):
+    def __init__(self, retry_after):
+        super().__init__(f"Firebase email function unavailable, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class DeliveryUnknownError(FirebaseEmailError):
+    """
+    A call timed out after it was sent, so any of ``unknown`` (addresses) may
+    have been delivered. ``delivered`` and ``failed`` (address -> error) are
+    the outcomes confirmed by earlier calls; later messages were never sent.
+    """
+    def __init__(self, message, unknown):
+        super().__init__(message)
+        self.unknown = unknown
+        self.delivered, self.failed = [], {}
+
+
+class PartialDeliveryError(FirebaseEmailError):
+    """Some messages of a batch were rejected; ``failed`` maps address -> error."""
+
+    def __init__(self, failed):
+        super().__init__(f"Firebase email function rejected {len(failed)} message(s)")
+        self.failed = failed
+
+
+class CircuitBreaker:
+    """
+    Fail fast while the email function is degraded.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    ``before_call`` raises ``CircuitOpenError`` for ``reset_timeout`` seconds.
+    Then a single trial call is let through: success closes the breaker, failure
+    opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return 'closed'
+            if self.trial_running or self.clock() < self.opened_at + self.reset_timeout:
+                return 'open'
+            return 'half_open'
+
+    def before_call(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            remaining = self.opened_at + self.reset_timeout - self.clock()
+            if remaining > 0 or self.trial_running:
+                raise CircuitOpenError(max(remaining, 1))
+            self.trial_running = True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.error(f"Firebase email circuit opened after {self.failures} consecutive failures")
+                self.opened_at = self.clock()
+
+
 class FirebaseEmailService:
     """
     Firebase Email Service for sending emails through Firebase Functions
@@ -14,8 +123,68 @@ class FirebaseEmailService:
     
     def __init__(self):
         self.firebase_function_url = getattr(settings, 'FIREBASE_EMAIL_FUNCTION_URL', None)
+        self.firebase_bulk_function_url = getattr(settings, 'FIREBASE_EMAIL_BULK_FUNCTION_URL', None)
         self.firebase_api_key = getattr(settings, 'FIREBASE_API_KEY', None)
-        
+        self.batch_size = getattr(settings, 'FIREBASE_EMAIL_BATCH_SIZE', 25)
+        self.timeout = (
+            getattr(settings, 'FIREBASE_EMAIL_CONNECT_TIMEOUT', 3.05),
+            getattr(settings, 'FIREBASE_EMAIL_READ_TIMEOUT', 10),
+        )
+        self.seconds_per_message = getattr(settings, 'FIREBASE_EMAIL_SECONDS_PER_MESSAGE', 1.5)
+        self.breaker = CircuitBreaker(
+            getattr(settings, 'FIREBASE_EMAIL_BREAKER_THRESHOLD', 5),
+            getattr(settings, 'FIREBASE_EMAIL_BREAKER_RESET_SECONDS', 30),
+        )
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """Keep-alive session shared by every thread; connections are reused from its pool."""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_maxsize=getattr(settings, 'FIREBASE_EMAIL_POOL_SIZE', 10))
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    if self.firebase_api_key:
+                        session.headers['Authorization'] = f'Bearer {self.firebase_api_key}'
+                    self._session = session
+        return self._session
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def build_message(self, to_email, subject, html_content, text_content=None):
+        return {
+            'to': to_email,
+            'subject': subject,
+            'html': html_content,
+            'text': text_content or strip_tags(html_content),
+        }
+
+    def post(self, url, payload, messages=1):
+        """
+        POST through the circuit breaker. Server errors, 429s and network errors
+        count as failures. The read timeout allows for ``messages`` sent in turn.
+        """
+        self.breaker.before_call()
+        connect_timeout, read_timeout = self.timeout
+        timeout = (connect_timeout, max(read_timeout, messages * self.seconds_per_message))
+        try:
+            response = self.session.post(url, json=payload, timeout=timeout)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        if response.status_code >= 500 or response.status_code == 429:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
     def send_email(self, to_email, subject, html_content, text_content=None):
         """
         Send email through Firebase Function
@@ -24,41 +193,104 @@ class FirebaseEmailService:
             logger.warning("Firebase email function URL not configured")
             return False
             
-        if not text_content:
-            text_content = strip_tags(html_content)
-            
-        payload = {
-            'to': to_email,
-            'subject': subject,
-            'html': html_content,
-            'text': text_content
-        }
-        
-        headers = {
-            'Content-Type': 'application/json',
-        }
-        
-        if self.firebase_api_key:
-            headers['Authorization'] = f'Bearer {self.firebase_api_key}'
-            
         try:
-            response = requests.post(
-                self.firebase_function_url,
-                json=payload,
-                headers=headers,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                logger.info(f"Email sent successfully to {to_email}")
-                return True
-            else:
-                logger.error(f"Failed to send email to {to_email}: {response.status_code} - {response.text}")
-                return False
-                
+            response = self.post(self.firebase_function_url, self.build_message(to_email, subject, html_content, text_content))
+        except CircuitOpenError as e:
+            logger.warning(f"Not sending email to {to_email}: {e}")
+            return False
         except requests.exceptions.RequestException as e:
             logger.error(f"Error sending email to {to_email}: {str(e)}")
             return False
+
+        if response.status_code == 200:
+            logger.info(f"Email sent successfully to {to_email}")
+            return True
+        logger.error(f"Failed to send email to {to_email}: {response.status_code} - {response.text}")
+        return False
+
+    def send_batch(self, messages):
+        """
+        Send ``build_message`` dicts, ``batch_size`` per call to the bulk function.
+        Returns {index: error} for rejected messages. Raises ``CircuitOpenError``
+        while the breaker is open, ``DeliveryUnknownError`` if a call timed out
+        after it was sent and ``FirebaseEmailError`` if a call fails outright;
+        the exception's ``completed`` is how many messages were already handled
+        and ``failures`` the rejections among them.
+        """
+        if not self.firebase_bulk_function_url:
+            return self._send_each(messages)
+
+        failures = {}
+        for start in range(0, len(messages), self.batch_size):
+            batch = messages[start:start + self.batch_size]
+            try:
+                errors = self._send_bulk(batch)
+            except FirebaseEmailError as e:
+                raise self._stopped_at(e, messages, start, failures)
+            for offset, message in enumerate(batch):
+                if message['to'] in errors:
+                    failures[start + offset] = errors[message['to']]
+        return failures
+
+    def _stopped_at(self, error, messages, completed, failures):
+        """Record on ``error`` how far a send got before the call that raised it."""
+        error.completed, error.failures = completed, failures
+        if isinstance(error, DeliveryUnknownError):
+            error.delivered = [message['to'] for index, message in enumerate(messages[:completed])
+                               if index not in failures]
+            error.failed = {messages[index]['to']: reason for index, reason in failures.items()}
+        return error
+
+    def _send_bulk(self, batch):
+        """One call to the bulk function; returns {address: error} for rejected messages."""
+        try:
+            response = self.post(self.firebase_bulk_function_url, {'emails': batch}, messages=len(batch))
+        except requests.exceptions.ReadTimeout as e:
+            raise DeliveryUnknownError(
+                f"Bulk email call timed out after it was sent: {e}", [message['to'] for message in batch]
+            ) from e
+        except requests.exceptions.RequestException as e:
+            raise FirebaseEmailError(f"Bulk email call failed: {e}") from e
+        if response.status_code != 200:
+            raise FirebaseEmailError(f"Bulk email call failed: {response.status_code} - {response.text[:200]}")
+        try:
+            errors = response.json().get('errors', [])
+        except ValueError as e:
+            raise FirebaseEmailError(f"Bulk email call returned invalid JSON: {response.text[:200]}") from e
+        return {error.get('to'): error.get('error', 'rejected') for error in errors}
+
+    def _send_each(self, messages):
+        if not self.firebase_function_url:
+            raise FirebaseEmailError("Firebase email function URL not configured")
+        failures = {}
+        for index, message in enumerate(messages):
+            try:
+                response = self.post(self.firebase_function_url, message)
+                if response.status_code >= 500:
+                    raise FirebaseEmailError(f"Email call failed: {response.status_code} - {response.text[:200]}")
+            except requests.exceptions.ReadTimeout as e:
+                error = DeliveryUnknownError(f"Email call timed out after it was sent: {e}", [message['to']])
+                raise self._stopped_at(error, messages, index, failures) from e
+            except requests.exceptions.RequestException as e:
+                raise self._stopped_at(FirebaseEmailError(f"Email call failed: {e}"), messages, index, failures) from e
+            except FirebaseEmailError as e:
+                raise self._stopped_at(e, messages, index, failures)
+            if response.status_code != 200:
+                failures[index] = f"{response.status_code} - {response.text[:200]}"
+        return failures
+
+    def send_or_spool(self, to_email, subject, html_content, text_content=None):
+        """Send now, or hand the message to the outbox when the function is unavailable."""
+        try:
+            return not self.send_batch([self.build_message(to_email, subject, html_content, text_content)])
+        except CircuitOpenError:
+            from .outbox import queue_email
+            queue_email(subject, text_content or strip_tags(html_content), None, [to_email], html_message=html_content)
+            logger.warning(f"Firebase email circuit open, spooled email to {to_email} to the outbox")
+            return True
+        except FirebaseEmailError as e:
+            logger.error(f"Error sending email to {to_email}: {e}")
+            return False
     
     def send_application_confirmation(self, user, application):
         """
@@ -75,7 +307,7 @@ class FirebaseEmailService:
         html_content = render_to_string('emails/application_confirmation.html', context)
         text_content = render_to_string('emails/application_confirmation.txt', context)
         
-        return self.send_email(user.email, subject, html_content, text_content)
+        return self.send_or_spool(user.email, subject, html_content, text_content)
     
     def send_application_status_update(self, user, application):
         """
@@ -94,7 +326,7 @@ class FirebaseEmailService:
         html_content = render_to_string('emails/application_status_update.html', context)
         text_content = render_to_string('emails/application_status_update.txt', context)
         
-        return self.send_email(user.email, subject, html_content, text_content)
+        return self.send_or_spool(user.email, subject, html_content, text_content)
     
     def send_document_review_notification(self, user, application):
         """
@@ -114,7 +346,7 @@ class FirebaseEmailService:
         html_content = render_to_string('emails/document_review_notification.html', context)
         text_content = render_to_string('emails/document_review_notification.txt', context)
         
-        return self.send_email(user.email, subject, html_content, text_content)
+        return self.send_or_spool(user.email, subject, html_content, text_content)
     
     def send_payment_confirmation(self, user, payment):
         """
@@ -131,7 +363,7 @@ class FirebaseEmailService:
         html_content = render_to_string('emails/payment_confirmation.html', context)
         text_content = render_to_string('emails/payment_confirmation.txt', context)
         
-        return self.send_email(user.email, subject, html_content, text_content)
+        return self.send_or_spool(user.email, subject, html_content, text_content)
     
     def send_claim_notification(self, user, claim):
         """
@@ -150,7 +382,45 @@ class FirebaseEmailService:
         html_content = render_to_string('emails/claim_notification.html', context)
         text_content = render_to_string('emails/claim_notification.txt', context)
         
-        return self.send_email(user.email, subject, html_content, text_content)
+        return self.send_or_spool(user.email, subject, html_content, text_content)
+
+
+
+class FirebaseEmailBackend(BaseEmailBackend):
+    """
+    Django email backend that sends through ``firebase_email_service.send_batch``.
+    Rejected addresses raise ``PartialDeliveryError`` so callers can attribute them;
+    a timed-out call raises ``DeliveryUnknownError`` as it is.
+    """
+
+    def send_messages(self, email_messages):
+        messages, owners = [], []
+        for position, email_message in enumerate(email_messages):
+            html = next((content for content, mimetype in getattr(email_message, 'alternatives', [])
+                         if mimetype == 'text/html'), None)
+            for recipient in email_message.recipients():
+                messages.append(firebase_email_service.build_message(
+                    recipient, email_message.subject, html or email_message.body, email_message.body
+                ))
+                owners.append(position)
+        if not messages:
+            return 0
+
+        try:
+            failures = firebase_email_service.send_batch(messages)
+        except FirebaseEmailError as e:
+            if self.fail_silently:
+                return 0
+            if isinstance(e, DeliveryUnknownError) or not e.completed:
+                raise
+            # Earlier calls went through: report the unsent tail as failed rather than have it all resent
+            failed = {messages[index]['to']: error for index, error in e.failures.items()}
+            failed.update({message['to']: str(e) for message in messages[e.completed:]})
+            raise PartialDeliveryError(failed) from e
+        if failures and not self.fail_silently:
+            raise PartialDeliveryError({messages[index]['to']: error for index, error in failures.items()})
+        return len(set(owners) - {owners[index] for index in failures})
+
 
 # Global instance
 firebase_email_service = FirebaseEmailService()
\ No newline at end of file
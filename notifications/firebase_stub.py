@@ -0,0 +1,133 @@
+"""
+Local stand-in for the Firebase email functions (``firebase_setup/index.js``).
+
+``StubEmailFunction`` serves ``POST /sendEmail`` and ``POST /sendBulkEmails``
+with the same request and response shapes as the deployed functions, but it
+delivers nothing. It records what it received and can add latency, reject
+addresses or fail every call, for tests and ``benchmark_firebase_email``.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubEmailFunction:
+    """
+    with StubEmailFunction(latency=0.01) as stub:
+        settings.FIREBASE_EMAIL_FUNCTION_URL = stub.url
+    """
+
+    def __init__(self, latency=0.0, per_message_latency=0.0, host='127.0.0.1', port=0):
+        self.latency = latency
+        self.per_message_latency = per_message_latency
+        self.fail_status = None  # answer every call with this status when set
+        self.rejected = set()  # addresses the function reports as failed
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.connections = 0
+        self.delivered = []
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def url(self):
+        return f'{self.base_url}/sendEmail'
+
+    @property
+    def bulk_url(self):
+        return f'{self.base_url}/sendBulkEmails'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def deliver(self, message):
+        """Validate one message like the function does; returns an error string or None."""
+        if not message.get('to') or not message.get('subject') or not (message.get('html') or message.get('text')):
+            return 'Missing required fields: to, subject, and html or text'
+        if message['to'] in self.rejected:
+            return 'Recipient rejected'
+        with self.lock:
+            self.delivered.append(message)
+        return None
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, like the real function behind Google's front end
+            # Write each response in one segment so keep-alive clients don't wait on delayed ACKs
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with stub.lock:
+                    stub.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def respond(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                with stub.lock:
+                    stub.calls += 1
+                if stub.fail_status:
+                    time.sleep(stub.latency)
+                    return self.respond(stub.fail_status, {'error': 'Stub failure'})
+
+                if self.path.rstrip('/').endswith('/sendBulkEmails'):
+                    emails = payload.get('emails')
+                    if not isinstance(emails, list):
+                        return self.respond(400, {'error': 'emails array is required'})
+                    time.sleep(stub.latency)
+                    results, errors = [], []
+                    # One message at a time, like the deployed function
+                    for email in emails:
+                        time.sleep(stub.per_message_latency)
+                        error = stub.deliver(email)
+                        if error:
+                            errors.append({'to': email.get('to'), 'error': error})
+                        else:
+                            results.append({'to': email['to'], 'messageId': f'stub-{len(stub.delivered)}', 'success': True})
+                    return self.respond(200, {
+                        'success': True, 'sent': len(results), 'failed': len(errors),
+                        'results': results, 'errors': errors,
+                    })
+
+                if self.path.rstrip('/').endswith('/sendEmail'):
+                    time.sleep(stub.latency + stub.per_message_latency)
+                    error = stub.deliver(payload)
+                    if error:
+                        return self.respond(400, {'error': error})
+                    return self.respond(200, {'success': True, 'messageId': f'stub-{len(stub.delivered)}'})
+
+                self.respond(404, {'error': 'Not found'})
+
+        return Handler
@@ -0,0 +1,133 @@
+import json
+import queue
+import threading
+import time
+
+import requests
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from admin_api.loadtest import percentile
+from notifications.firebase_email_service import FirebaseEmailError, FirebaseEmailService
+from notifications.firebase_stub import StubEmailFunction
+
+
+def legacy_send(url, message):
+    """The transport before pooling: a fresh requests.post per message with a 30 s timeout."""
+    try:
+        response = requests.post(url, json=message, headers={'Content-Type': 'application/json'}, timeout=30)
+        return response.status_code == 200
+    except requests.exceptions.RequestException:
+        return False
+
+
+def run_workers(jobs, concurrency, work):
+    """Run ``work(job)`` over ``jobs`` on ``concurrency`` threads; returns (seconds, [(size, latency, ok)])."""
+    pending = queue.Queue()
+    for job in jobs:
+        pending.put(job)
+    samples, lock = [], threading.Lock()
+
+    def worker():
+        while True:
+            try:
+                job = pending.get_nowait()
+            except queue.Empty:
+                return
+            started = time.perf_counter()
+            ok = work(job)
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                samples.append((len(job) if isinstance(job, list) else 1, elapsed, ok))
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, samples
+
+
+class Command(BaseCommand):
+    help = ('Compare the Firebase email transport with the old per-message requests.post against a local '
+            'stand-in function: throughput, p99 per message, connections opened and behaviour while degraded')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=4, help='Sending threads (workers)')
+        parser.add_argument('--latency', type=float, default=0.02, help='Seconds the stand-in spends per call')
+        parser.add_argument('--per-message-latency', type=float, default=0.001,
+                            help='Extra seconds the stand-in spends per message in a call')
+        parser.add_argument('--batch-size', type=int, default=25)
+        parser.add_argument('--degraded-latency', type=float, default=1.0,
+                            help='Seconds a degraded function takes before answering 503')
+        parser.add_argument('--degraded-messages', type=int, default=20)
+        parser.add_argument('--output', help='Write the results as JSON to this path')
+
+    def handle(self, *args, **options):
+        messages = [
+            {'to': f'member{i}@example.com', 'subject': 'Benchmark', 'html': '<p>Hello</p>', 'text': 'Hello'}
+            for i in range(options['messages'])
+        ]
+        results = {}
+        with StubEmailFunction(latency=options['latency'], per_message_latency=options['per_message_latency']) as stub:
+            with override_settings(FIREBASE_EMAIL_FUNCTION_URL=stub.url, FIREBASE_EMAIL_BULK_FUNCTION_URL=stub.bulk_url,
+                                   FIREBASE_EMAIL_BATCH_SIZE=options['batch_size'], FIREBASE_API_KEY=''):
+                modes = [
+                    ('legacy', messages, lambda service: lambda m: legacy_send(stub.url, m)),
+                    ('pooled', messages, lambda service: lambda m: service.send_email(m['to'], m['subject'], m['html'], m['text'])),
+                    ('batched', [messages[i:i + options['batch_size']] for i in range(0, len(messages), options['batch_size'])],
+                     lambda service: lambda batch: not service.send_batch(batch)),
+                ]
+                for name, jobs, make_work in modes:
+                    service = FirebaseEmailService()
+                    results[name] = self.measure(stub, jobs, options['concurrency'], make_work(service))
+                    service.close()
+
+                stub.fail_status = 503
+                stub.latency = options['degraded_latency']
+                degraded = messages[:options['degraded_messages']]
+                results['legacy degraded'] = self.measure(
+                    stub, degraded, options['concurrency'], lambda m: legacy_send(stub.url, m)
+                )
+                service = FirebaseEmailService()
+                results['breaker degraded'] = self.measure(stub, degraded, options['concurrency'], lambda m: self.send_failing_fast(service, m))
+                service.close()
+
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+    def send_failing_fast(self, service, message):
+        try:
+            return not service.send_batch([message])
+        except FirebaseEmailError:
+            return False
+
+    def measure(self, stub, jobs, concurrency, work):
+        calls, connections = stub.calls, stub.connections
+        seconds, samples = run_workers(jobs, concurrency, work)
+        # Every message in a batch waits for the whole call
+        latencies = [latency for size, latency, _ in samples for _ in range(size)]
+        sent = sum(size for size, _, ok in samples if ok)
+        return {
+            'messages': len(latencies),
+            'sent': sent,
+            'seconds': round(seconds, 3),
+            'per_second': round(len(latencies) / seconds, 1) if seconds else None,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'calls': stub.calls - calls,
+            'connections': stub.connections - connections,
+        }
+
+    def report(self, results):
+        self.stdout.write(f'{"mode":<18}{"msgs":>7}{"sent":>7}{"msg/s":>10}{"p50 ms":>10}{"p99 ms":>10}{"calls":>8}{"conns":>8}')
+        for name, r in results.items():
+            self.stdout.write(
+                f'{name:<18}{r["messages"]:>7}{r["sent"]:>7}{r["per_second"]:>10}{r["p50_ms"]:>10}'
+                f'{r["p99_ms"]:>10}{r["calls"]:>8}{r["connections"]:>8}'
+            )
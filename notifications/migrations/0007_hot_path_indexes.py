@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0006_broadcastnotification'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['expires_at', 'is_pinned', 'created_at'], name='announcement_public_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='broadcastnotification',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at'], name='broadcast_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['date'], name='event_active_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['date'], name='meeting_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-created_at'], name='notif_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read'], name='notif_user_read_idx'),
+        ),
+    ]
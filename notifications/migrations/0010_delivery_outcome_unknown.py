@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0009_emailcampaign_lease'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='emailcampaignrecipient',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed'), ('unknown', 'Outcome Unknown')], default='pending', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='outboundemail',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('dead', 'Dead Letter'), ('unknown', 'Outcome Unknown')], default='pending', max_length=10),
+        ),
+    ]
@@ -1,9 +1,11 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
+from pamoja_kenya.tracking import TrackedFieldsMixin
 
 User = get_user_model()
 
-class Notification(models.Model):
+class Notification(TrackedFieldsMixin, models.Model):
     NOTIFICATION_TYPES = [
         ('application_submitted', 'Application Submitted'),
         ('application_approved', 'Application Approved'),
@@ -27,10 +29,58 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='notif_user_created_idx'),
+            models.Index(fields=['user', 'is_read'], name='notif_user_read_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.title}"
 
+class BroadcastNotification(models.Model):
+    """A notification addressed to every member, stored once instead of once per user"""
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    notification_type = models.CharField(max_length=30, choices=Notification.NOTIFICATION_TYPES)
+    source_type = models.CharField(max_length=20, blank=True)  # announcement, event, meeting
+    source_id = models.PositiveBigIntegerField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], condition=models.Q(is_active=True), name='broadcast_active_created_idx'),
+        ]
+    
+    def __str__(self):
+        return self.title
+
+class BroadcastReceipt(models.Model):
+    """Per-user read state for a broadcast notification"""
+    broadcast = models.ForeignKey(BroadcastNotification, on_delete=models.CASCADE, related_name='receipts')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='broadcast_receipts')
+    read_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['broadcast', 'user']
+    
+    def __str__(self):
+        return f"{self.user.username} read {self.broadcast.title}"
+
+class NotificationReadState(models.Model):
+    """Per-member read watermark and unread counter, maintained by notifications.unread"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_state')
+    # Notifications created at or before this are read ("mark all read")
+    last_read_at = models.DateTimeField(null=True, blank=True)
+    # Unread personal notifications newer than the watermark
+    unread_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username}: {self.unread_count} unread"
+
 class Event(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
@@ -48,6 +98,9 @@ class Event(models.Model):
     
     class Meta:
         ordering = ['date']
+        indexes = [
+            models.Index(fields=['date'], condition=models.Q(is_active=True), name='event_active_date_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -77,6 +130,9 @@ class Announcement(models.Model):
     
     class Meta:
         ordering = ['-is_pinned', '-created_at']
+        indexes = [
+            models.Index(fields=['expires_at', 'is_pinned', 'created_at'], condition=models.Q(is_active=True), name='announcement_public_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -109,6 +165,9 @@ class Meeting(models.Model):
     
     class Meta:
         ordering = ['date']
+        indexes = [
+            models.Index(fields=['date'], name='meeting_date_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -127,7 +186,7 @@ class EventRegistration(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.event.title}"
 
-class ContactMessage(models.Model):
+class ContactMessage(TrackedFieldsMixin, models.Model):
     HELP_TYPE_CHOICES = [
         ('membership', 'Membership'),
         ('technical', 'Technical Support'),
@@ -178,4 +237,93 @@ class AdminNotification(models.Model):
         ordering = ['-created_at']
     
     def __str__(self):
-        return f"{self.type} - {self.title}"
\ No newline at end of file
+        return f"{self.type} - {self.title}"
+
+class OutboundEmail(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead Letter'),
+        ('unknown', 'Outcome Unknown'),  # timed out mid-send; reconcile before requeueing
+    ]
+    
+    recipients = models.JSONField()
+    from_email = models.CharField(max_length=254, blank=True)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{', '.join(self.recipients)} - {self.subject} ({self.status})"
+
+
+class EmailCampaign(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('sending', 'Sending'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    source_type = models.CharField(max_length=20, blank=True)  # announcement, event, meeting
+    source_id = models.PositiveBigIntegerField(null=True, blank=True)
+    total_recipients = models.PositiveIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)  # set while paused by the circuit breaker
+    locked_at = models.DateTimeField(null=True, blank=True)  # lease held by the sending worker
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.subject} ({self.status})"
+
+
+class EmailCampaignRecipient(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+        ('unknown', 'Outcome Unknown'),  # timed out mid-send; reconcile before requeueing
+    ]
+    
+    campaign = models.ForeignKey(EmailCampaign, on_delete=models.CASCADE, related_name='recipients')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    email = models.EmailField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        unique_together = ['campaign', 'email']
+        indexes = [
+            models.Index(fields=['campaign', 'status', 'id'], name='campaign_rcpt_status_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.email} - {self.status}"
@@ -0,0 +1,153 @@
+"""
+Durable outbound email queue.
+
+Request handlers call ``queue_email`` instead of ``send_mail``: the rendered
+message is written to the ``OutboundEmail`` table and handed to a Celery worker
+once the surrounding transaction commits. Delivery failures are retried with
+exponential backoff by ``notifications.tasks.drain_outbox`` and parked as dead
+letters after ``max_attempts``. While the Firebase email function's circuit
+breaker is open, rows are deferred until it lets a trial call through, without
+using up an attempt. If a call times out after it was sent, the recipients it
+may have reached are not retried: the row keeps only the recipients never
+tried, or is parked as ``unknown`` for an admin to reconcile.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .firebase_email_service import CircuitOpenError, DeliveryUnknownError
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+class EmailDeliveryError(Exception):
+    pass
+
+
+def queue_email(subject, message, from_email, recipient_list, html_message=None, **kwargs):
+    """Store an email in the outbox and schedule delivery; mirrors ``send_mail``'s signature."""
+    email = OutboundEmail.objects.create(
+        recipients=list(recipient_list),
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        subject=subject,
+        body=message,
+        html_body=html_message or '',
+        max_attempts=getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5),
+    )
+    transaction.on_commit(lambda: dispatch_email(email.pk))
+    return email
+
+
+def dispatch_email(email_id):
+    """Hand an outbox row to a worker; if the broker is down the periodic drain picks it up."""
+    from .tasks import deliver_outbound_email
+    try:
+        deliver_outbound_email.delay(email_id)
+    except Exception as e:
+        logger.warning(f"Could not enqueue outbound email {email_id}, leaving it for the drain: {e}")
+
+
+def retry_delay(attempts):
+    base = getattr(settings, 'EMAIL_OUTBOX_RETRY_BASE_SECONDS', 60)
+    return timedelta(seconds=min(base * (2 ** max(attempts - 1, 0)), 6 * 60 * 60))
+
+
+def claim_email(email_id):
+    """
+    Atomically take ownership of a due outbox row. Rows stuck in ``sending``
+    (a worker died mid-send) become claimable again once their lease expires.
+    """
+    now = timezone.now()
+    lease_expired = now - timedelta(seconds=getattr(settings, 'EMAIL_OUTBOX_LEASE_SECONDS', 600))
+    claimed = OutboundEmail.objects.filter(
+        Q(status='pending', next_attempt_at__lte=now) |
+        Q(status='sending', locked_at__lt=lease_expired),
+        pk=email_id,
+    ).update(status='sending', locked_at=now)
+    if not claimed:
+        return None
+    return OutboundEmail.objects.get(pk=email_id)
+
+
+def send_outbound_email(email):
+    """Push one message through the configured transport (Firebase function or Django mail)."""
+    if getattr(settings, 'USE_FIREBASE_EMAIL', False):
+        from .firebase_email_service import firebase_email_service
+        failures = firebase_email_service.send_batch([
+            firebase_email_service.build_message(recipient, email.subject, email.html_body or email.body, email.body)
+            for recipient in email.recipients
+        ])
+        if failures:
+            rejected = ', '.join(email.recipients[index] for index in failures)
+            raise EmailDeliveryError(f"Firebase email function rejected message to {rejected}")
+        return
+
+    message = EmailMultiAlternatives(email.subject, email.body, email.from_email, email.recipients)
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    message.send(fail_silently=False)
+
+
+def deliver_email(email):
+    """Attempt delivery of a claimed row and record the outcome. Returns True when sent."""
+    email.attempts += 1
+    try:
+        send_outbound_email(email)
+    except CircuitOpenError as e:
+        email.attempts -= 1
+        email.status = 'pending'
+        email.locked_at = None
+        email.next_attempt_at = timezone.now() + timedelta(seconds=e.retry_after)
+        email.save(update_fields=['status', 'locked_at', 'next_attempt_at'])
+        logger.info(f"Outbound email {email.pk} deferred: {e}")
+        return False
+    except DeliveryUnknownError as e:
+        reached = set(e.delivered) | set(e.failed) | set(e.unknown)
+        untried = [recipient for recipient in email.recipients if recipient not in reached]
+        email.last_error = f"Delivery to {', '.join(e.unknown)} timed out and may have been sent: {e}"
+        email.locked_at = None
+        if untried:
+            email.recipients = untried
+            email.status = 'pending'
+            email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+        else:
+            email.status = 'unknown'
+        logger.warning(f"Outbound email {email.pk}: {email.last_error}")
+        email.save(update_fields=['attempts', 'recipients', 'status', 'last_error', 'locked_at', 'next_attempt_at'])
+        return False
+    except Exception as e:
+        email.last_error = str(e)
+        email.locked_at = None
+        if email.attempts >= email.max_attempts:
+            email.status = 'dead'
+            logger.error(f"Outbound email {email.pk} dead-lettered after {email.attempts} attempts: {e}")
+        else:
+            email.status = 'pending'
+            email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+            logger.warning(f"Outbound email {email.pk} failed (attempt {email.attempts}), retrying: {e}")
+        email.save(update_fields=['attempts', 'status', 'last_error', 'locked_at', 'next_attempt_at'])
+        return False
+
+    email.status = 'sent'
+    email.sent_at = timezone.now()
+    email.locked_at = None
+    email.last_error = ''
+    email.save(update_fields=['attempts', 'status', 'sent_at', 'locked_at', 'last_error'])
+    return True
+
+
+def due_email_ids(limit=500):
+    now = timezone.now()
+    lease_expired = now - timedelta(seconds=getattr(settings, 'EMAIL_OUTBOX_LEASE_SECONDS', 600))
+    return list(
+        OutboundEmail.objects.filter(
+            Q(status='pending', next_attempt_at__lte=now) |
+            Q(status='sending', locked_at__lt=lease_expired)
+        ).order_by('next_attempt_at').values_list('pk', flat=True)[:limit]
+    )
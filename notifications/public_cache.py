@@ -0,0 +1,80 @@
+"""
+HTTP caching for the public announcement, event and meeting feeds.
+
+Each model has a content version in the cache that ``notifications.signals``
+bumps whenever a row is saved or deleted. A rendered feed is cached under the
+current version and its query params together with a strong ETag, so repeat
+requests are served from the cache and conditional ones get a 304 without
+touching the database. Feeds also change as time passes (an announcement
+expires, an event starts), so an entry is only kept until the first such moment.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+PUBLIC_CONTENT_PREFIX = 'notifications:public'
+
+
+def version_key(model):
+    return f'{PUBLIC_CONTENT_PREFIX}:version:{model._meta.model_name}'
+
+
+def content_version(model):
+    key = version_key(model)
+    version = cache.get(key)
+    if version is None:
+        version = f'{time.time():.6f}'
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_content_version(model):
+    """Make every cached feed built from ``model`` stale."""
+    cache.set(version_key(model), f'{time.time():.6f}', timeout=None)
+
+
+def public_content_response(request, model, params, build):
+    """
+    Serve a public feed through the cache. ``build()`` queries and returns
+    ``(data, valid_until)``, where ``valid_until`` is the first time the
+    result would change without a write (or None).
+    """
+    # Read the version before the rows so a concurrent write can only leave this entry under a stale version
+    version = content_version(model)
+    key = f'{PUBLIC_CONTENT_PREFIX}:{model._meta.model_name}:{version}:' + ':'.join(
+        f'{name}={value}' for name, value in sorted(params.items())
+    )
+    entry = cache.get(key)
+    if entry is None:
+        data, valid_until = build()
+        body = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder)
+        timeout = settings.PUBLIC_CONTENT_CACHE_TIMEOUT
+        if valid_until is not None:
+            timeout = max(1, min(timeout, int((valid_until - timezone.now()).total_seconds())))
+        entry = {
+            'data': data,
+            'etag': '"%s"' % hashlib.sha256(body.encode()).hexdigest()[:32],
+            'last_modified': int(time.time()),
+        }
+        cache.set(key, entry, timeout)
+
+    headers = {
+        'ETag': entry['etag'],
+        'Last-Modified': http_date(entry['last_modified']),
+        'Cache-Control': f'public, max-age={settings.PUBLIC_CONTENT_MAX_AGE}',
+    }
+    not_modified = get_conditional_response(request, etag=entry['etag'], last_modified=entry['last_modified'])
+    if not_modified is not None:
+        for name, value in headers.items():
+            not_modified[name] = value
+        return not_modified
+    return Response(entry['data'], headers=headers)
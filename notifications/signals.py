@@ -0,0 +1,59 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from pamoja_kenya.live import publish_on_commit
+from .models import AdminNotification, Announcement, BroadcastNotification, Event, Meeting, Notification
+from .public_cache import bump_content_version
+from .unread import adjust_unread
+
+PUBLIC_CONTENT_MODELS = [Announcement, Event, Meeting]
+
+
+def invalidate_public_content(sender, **kwargs):
+    """Bump the model's content version once the write is committed, making its cached public feeds stale"""
+    transaction.on_commit(lambda: bump_content_version(sender))
+
+
+for model in PUBLIC_CONTENT_MODELS:
+    post_save.connect(invalidate_public_content, sender=model, dispatch_uid=f'public_content_save_{model.__name__}')
+    post_delete.connect(invalidate_public_content, sender=model, dispatch_uid=f'public_content_delete_{model.__name__}')
+
+
+def count_unread_on_save(sender, instance, created, **kwargs):
+    """Keep the member's unread counter in step with new and re-read notifications"""
+    if created:
+        if not instance.is_read:
+            adjust_unread(instance.user_id, 1, instance.created_at)
+    elif instance.has_snapshot and instance.loaded_value('is_read') != instance.is_read:
+        adjust_unread(instance.user_id, -1 if instance.is_read else 1, instance.created_at)
+
+
+def count_unread_on_delete(sender, instance, **kwargs):
+    if not instance.is_read:
+        adjust_unread(instance.user_id, -1, instance.created_at)
+
+
+post_save.connect(count_unread_on_save, sender=Notification, dispatch_uid='unread_count_save')
+post_delete.connect(count_unread_on_delete, sender=Notification, dispatch_uid='unread_count_delete')
+
+
+def publish_notification(sender, instance, created, **kwargs):
+    """Push new notifications to the live stream of whoever they are for"""
+    if not created:
+        return
+    data = {
+        'id': instance.id,
+        'title': instance.title,
+        'message': instance.message,
+        'type': instance.notification_type if sender is not AdminNotification else instance.type,
+        'created_at': instance.created_at,
+    }
+    if sender is Notification:
+        publish_on_commit(f'user:{instance.user_id}', 'notification', {**data, 'is_broadcast': False})
+    elif sender is BroadcastNotification:
+        publish_on_commit('members', 'notification', {**data, 'is_broadcast': True})
+    else:
+        publish_on_commit('admin', 'admin_notification', {**data, 'priority': instance.priority})
+
+
+for model in [Notification, BroadcastNotification, AdminNotification]:
+    post_save.connect(publish_notification, sender=model, dispatch_uid=f'live_notification_{model.__name__}')
@@ -0,0 +1,71 @@
+"""
+Server-Sent Events stream helpers for ``notifications.views.live_events``.
+
+A connection subscribes to its member channel, the all-members channel and,
+for staff, the admin channel of ``pamoja_kenya.live``. It then writes each
+published event as an SSE frame, with a comment heartbeat while idle so
+proxies keep the connection open.
+
+A token is only checked when the stream opens, so a stream opened with one
+sends a ``token_expired`` event and closes when the token's ``exp`` passes.
+The client then reconnects with a fresh access token. ``?token=`` URLs end up
+in proxy and access logs, which is why the access token lifetime must stay
+short (``SIMPLE_JWT['ACCESS_TOKEN_LIFETIME']``, 10 minutes).
+"""
+import time
+
+from django.conf import settings
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from accounts.authentication import CachedJWTAuthentication
+from pamoja_kenya.live import format_event, get_broker, hub
+
+
+def authenticate_stream(request):
+    """
+    ``(user, expires_at)`` from a Bearer header, a ``?token=`` access token
+    (EventSource cannot set headers) or the session. ``expires_at`` is the
+    token's ``exp`` timestamp, None for a session; user is None if unauthenticated.
+    """
+    authentication = CachedJWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else request.GET.get('token')
+    if raw_token:
+        try:
+            token = authentication.get_validated_token(raw_token)
+            return authentication.get_user(token), token['exp']
+        except (InvalidToken, AuthenticationFailed):
+            return None, None
+    user = request.user
+    return (user, None) if user.is_authenticated else (None, None)
+
+
+def stream_channels(user):
+    channels = [f'user:{user.pk}', 'members']
+    if user.is_staff or user.is_superuser or getattr(user, 'role', None) == 'admin':
+        channels.append('admin')
+    return channels
+
+
+async def event_stream(channels, expires_at=None):
+    """SSE frames for ``channels`` until the client disconnects or ``expires_at`` (epoch seconds) passes."""
+    await get_broker().ensure_listening()
+    # Subscribe inside the generator so a client that disconnects before streaming starts leaves nothing behind
+    subscription = hub.subscribe(channels, maxsize=settings.LIVE_EVENTS_QUEUE_SIZE)
+    try:
+        yield f'retry: {settings.LIVE_EVENTS_RETRY_MS}\n\n'
+        while True:
+            timeout = settings.LIVE_EVENTS_HEARTBEAT_SECONDS
+            if expires_at is not None:
+                remaining = expires_at - time.time()
+                if remaining <= 0:
+                    yield 'event: token_expired\ndata: {}\n\n'
+                    return
+                timeout = min(timeout, remaining)
+            message = await subscription.get(timeout=timeout)
+            if message is not None:
+                yield format_event(message)
+            elif expires_at is None or time.time() < expires_at:
+                yield ': ping\n\n'
+    finally:
+        subscription.close()
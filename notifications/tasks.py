@@ -0,0 +1,42 @@
+from celery import shared_task
+from .outbox import claim_email, deliver_email, due_email_ids
+from .bulk_mail import dispatch_campaign, due_campaign_ids, send_campaign
+import logging
+
+logger = logging.getLogger(__name__)
+
+@shared_task(ignore_result=True)
+def deliver_outbound_email(email_id):
+    """Deliver a single queued email"""
+    email = claim_email(email_id)
+    if email is None:
+        # Already sent, owned by another worker, or not yet due for retry
+        return False
+    return deliver_email(email)
+
+@shared_task(ignore_result=True)
+def drain_outbox():
+    """Retry due and abandoned outbox rows (scheduled by celery beat)"""
+    delivered = 0
+    for email_id in due_email_ids():
+        email = claim_email(email_id)
+        if email and deliver_email(email):
+            delivered += 1
+    logger.info(f"Outbox drain delivered {delivered} emails")
+    return delivered
+
+@shared_task(ignore_result=True)
+def send_email_campaign(campaign_id):
+    """Deliver a broadcast email campaign in batches"""
+    campaign = send_campaign(campaign_id)
+    return campaign.sent_count if campaign else None
+
+@shared_task(ignore_result=True)
+def resume_email_campaigns():
+    """Re-dispatch campaigns left queued, paused or abandoned (scheduled by celery beat)"""
+    campaign_ids = due_campaign_ids()
+    for campaign_id in campaign_ids:
+        dispatch_campaign(campaign_id)
+    if campaign_ids:
+        logger.info(f"Resumed {len(campaign_ids)} email campaigns")
+    return len(campaign_ids)
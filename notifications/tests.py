@@ -0,0 +1,389 @@
+import asyncio
+import os
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from pamoja_kenya.live import hub, publish, reset_broker
+from . import firebase_email_service as firebase
+from .bulk_mail import claim_campaign, create_campaign, due_campaign_ids, send_campaign
+from .firebase_stub import StubEmailFunction
+from .models import Announcement, BroadcastNotification, EmailCampaign, Notification, NotificationReadState, OutboundEmail
+from .outbox import claim_email, deliver_email, due_email_ids, queue_email
+from .stream import authenticate_stream, event_stream
+from .tasks import resume_email_campaigns
+from .unread import get_read_state
+
+User = get_user_model()
+
+
+@override_settings(USE_FIREBASE_EMAIL=False)
+class EmailCampaignTests(TestCase):
+    def setUp(self):
+        for i in range(3):
+            User.objects.create_user(username=f'member{i}', email=f'member{i}@example.com', password='x')
+
+    def create_campaign(self):
+        with mock.patch('notifications.bulk_mail.dispatch_campaign'), self.captureOnCommitCallbacks(execute=True):
+            return create_campaign('Picnic', 'Bring food', 'event', 1)
+
+    def test_campaign_left_queued_by_a_broker_outage_is_resumed(self):
+        campaign = self.create_campaign()
+        self.assertEqual(due_campaign_ids(), [campaign.pk])
+
+        with mock.patch('notifications.tasks.dispatch_campaign') as dispatch_campaign:
+            self.assertEqual(resume_email_campaigns(), 1)
+        dispatch_campaign.assert_called_once_with(campaign.pk)
+
+        send_campaign(campaign.pk)
+        campaign.refresh_from_db()
+        self.assertEqual((campaign.status, campaign.sent_count, campaign.locked_at), ('completed', 3, None))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(due_campaign_ids(), [])
+
+    def test_plain_text_body_is_not_html_escaped(self):
+        with mock.patch('notifications.bulk_mail.dispatch_campaign'):
+            campaign = create_campaign('Picnic', "Tom & Jerry's <b>picnic</b>", 'event', 1)
+        self.assertIn("Tom & Jerry's <b>picnic</b>", campaign.body)
+        self.assertIn('Tom &amp; Jerry&#x27;s &lt;b&gt;picnic&lt;/b&gt;', campaign.html_body)
+
+    def test_leased_campaign_is_not_sent_twice(self):
+        campaign = self.create_campaign()
+        self.assertIsNotNone(claim_campaign(campaign.pk))
+        self.assertIsNone(send_campaign(campaign.pk))
+        self.assertEqual(due_campaign_ids(), [])
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_abandoned_lease_expires(self):
+        campaign = self.create_campaign()
+        EmailCampaign.objects.filter(pk=campaign.pk).update(
+            status='sending', locked_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(due_campaign_ids(), [campaign.pk])
+
+    def test_paused_campaign_waits_for_its_next_attempt(self):
+        campaign = self.create_campaign()
+        EmailCampaign.objects.filter(pk=campaign.pk).update(
+            status='sending', next_attempt_at=timezone.now() + timedelta(minutes=5)
+        )
+        self.assertEqual(due_campaign_ids(), [])
+        self.assertIsNone(send_campaign(campaign.pk))
+
+        EmailCampaign.objects.filter(pk=campaign.pk).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(due_campaign_ids(), [campaign.pk])
+
+
+@override_settings(USE_FIREBASE_EMAIL=False, EMAIL_OUTBOX_MAX_ATTEMPTS=2, EMAIL_OUTBOX_RETRY_BASE_SECONDS=60)
+class OutboxTests(TestCase):
+    def queue(self):
+        with mock.patch('notifications.outbox.dispatch_email'), self.captureOnCommitCallbacks(execute=True):
+            return queue_email('Hello', 'Hello there', None, ['member@example.com'])
+
+    def make_due(self, email):
+        OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+
+    def test_failed_delivery_backs_off_then_dead_letters(self):
+        email = self.queue()
+        with mock.patch('notifications.outbox.send_outbound_email', side_effect=OSError('SMTP down')):
+            self.assertFalse(deliver_email(claim_email(email.pk)))
+            email.refresh_from_db()
+            self.assertEqual((email.status, email.attempts, email.last_error), ('pending', 1, 'SMTP down'))
+            self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=50))
+            self.assertIsNone(claim_email(email.pk))  # backing off
+
+            self.make_due(email)
+            self.assertFalse(deliver_email(claim_email(email.pk)))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('dead', 2))
+        self.make_due(email)
+        self.assertEqual(due_email_ids(), [])
+
+    def test_retry_delivers_and_abandoned_lease_is_reclaimed(self):
+        email = self.queue()
+        self.assertIsNotNone(claim_email(email.pk))
+        self.assertIsNone(claim_email(email.pk))  # leased to the first worker
+        OutboundEmail.objects.filter(pk=email.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(due_email_ids(), [email.pk])
+
+        self.assertTrue(deliver_email(claim_email(email.pk)))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('sent', 1))
+        self.assertEqual(mail.outbox[0].to, ['member@example.com'])
+
+
+class FirebaseEmailTransportTests(TestCase):
+    def setUp(self):
+        self.stub = StubEmailFunction().start()
+        self.addCleanup(self.stub.stop)
+        with self.settings(FIREBASE_EMAIL_FUNCTION_URL=self.stub.url, FIREBASE_EMAIL_BULK_FUNCTION_URL=self.stub.bulk_url,
+                           FIREBASE_EMAIL_BATCH_SIZE=25, FIREBASE_EMAIL_BREAKER_THRESHOLD=2, FIREBASE_API_KEY=''):
+            self.service = firebase.FirebaseEmailService()
+        self.addCleanup(self.service.close)
+
+    def message(self, i):
+        return self.service.build_message(f'member{i}@example.com', 'Hello', '<p>Hello</p>')
+
+    def test_batches_share_one_connection(self):
+        self.stub.rejected.add('member7@example.com')
+        failures = self.service.send_batch([self.message(i) for i in range(60)])
+        self.assertEqual(list(failures), [7])
+        self.assertEqual(len(self.stub.delivered), 59)
+        self.assertEqual((self.stub.calls, self.stub.connections), (3, 1))
+
+    def test_open_circuit_fails_fast_and_outbox_defers(self):
+        self.stub.fail_status = 503
+        for _ in range(2):
+            with self.assertRaises(firebase.FirebaseEmailError):
+                self.service.send_batch([self.message(0)])
+        with self.assertRaises(firebase.CircuitOpenError):
+            self.service.send_batch([self.message(0)])
+        self.assertEqual(self.stub.calls, 2)
+
+        email = OutboundEmail.objects.create(recipients=['member0@example.com'], subject='Hello', body='Hello')
+        with self.settings(USE_FIREBASE_EMAIL=True), mock.patch.object(firebase, 'firebase_email_service', self.service):
+            self.assertFalse(deliver_email(claim_email(email.pk)))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('pending', 0))
+        self.assertIsNone(claim_email(email.pk))  # not due until the breaker may close
+        self.assertEqual(self.stub.calls, 2)
+
+    def test_error_outcomes_are_not_shared_between_errors(self):
+        first = firebase.DeliveryUnknownError('Timed out', ['a@example.com'])
+        first.failures[0] = 'rejected'
+        first.delivered.append('b@example.com')
+        second = firebase.DeliveryUnknownError('Timed out', ['c@example.com'])
+        self.assertEqual((second.completed, second.failures, second.delivered, second.failed), (0, {}, [], {}))
+
+
+@override_settings(USE_FIREBASE_EMAIL=True)
+class FirebaseDeliveryTimeoutTests(TestCase):
+    """The stub sends 0.2 s per message, so a two-message call outlasts the 0.3 s read timeout."""
+
+    def setUp(self):
+        self.stub = StubEmailFunction(per_message_latency=0.2).start()
+        self.addCleanup(self.stub.stop)
+        with self.settings(FIREBASE_EMAIL_FUNCTION_URL=self.stub.url, FIREBASE_EMAIL_BULK_FUNCTION_URL=self.stub.bulk_url,
+                           FIREBASE_EMAIL_BATCH_SIZE=2, FIREBASE_EMAIL_READ_TIMEOUT=0.3,
+                           FIREBASE_EMAIL_SECONDS_PER_MESSAGE=0.01, FIREBASE_API_KEY=''):
+            self.service = firebase.FirebaseEmailService()
+        self.addCleanup(self.service.close)
+        patcher = mock.patch.object(firebase, 'firebase_email_service', self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_timed_out_call_is_not_resent(self):
+        messages = [self.service.build_message(f'member{i}@example.com', 'Hello', '<p>Hello</p>') for i in range(3)]
+        with self.assertRaises(firebase.DeliveryUnknownError) as raised:
+            self.service.send_batch(messages)
+        self.assertEqual(raised.exception.unknown, ['member0@example.com', 'member1@example.com'])
+        self.assertEqual((raised.exception.completed, raised.exception.delivered), (0, []))
+        self.assertEqual(self.stub.calls, 1)
+
+    def test_campaign_marks_timed_out_recipients_unknown_and_sends_the_rest(self):
+        for i in range(3):
+            User.objects.create_user(username=f'member{i}', email=f'member{i}@example.com', password='x')
+        with mock.patch('notifications.bulk_mail.dispatch_campaign'), self.captureOnCommitCallbacks(execute=True):
+            campaign = create_campaign('Picnic', 'Bring food', 'event', 1)
+
+        send_campaign(campaign.pk)
+        statuses = dict(campaign.recipients.values_list('email', 'status'))
+        self.assertEqual(statuses, {
+            'member0@example.com': 'unknown', 'member1@example.com': 'unknown', 'member2@example.com': 'sent',
+        })
+        # One timed-out bulk call and one for the untried recipient; no per-message resends
+        self.assertEqual(self.stub.calls, 2)
+
+    def test_outbox_keeps_only_untried_recipients(self):
+        email = OutboundEmail.objects.create(
+            recipients=['member0@example.com', 'member1@example.com', 'member2@example.com'], subject='Hello', body='Hello'
+        )
+        self.assertFalse(deliver_email(claim_email(email.pk)))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.recipients), ('pending', ['member2@example.com']))
+
+        email.recipients = ['member0@example.com', 'member1@example.com']
+        email.save(update_fields=['recipients'])
+        OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+        self.assertFalse(deliver_email(claim_email(email.pk)))
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'unknown')
+        self.assertIsNone(claim_email(email.pk))
+
+
+class PublicFeedCacheTests(TestCase):
+    url = '/api/notifications/announcements/'
+
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user(username='admin', email='admin@example.com', password='x', is_staff=True)
+        self.announcement = Announcement.objects.create(
+            title='Picnic', content='Bring food', created_by=author, expires_at=timezone.now() + timedelta(days=1)
+        )
+
+    def test_repeat_and_conditional_requests_skip_the_database(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.json()[0]['title'], 'Picnic')
+        self.assertIn('public', first['Cache-Control'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url)['ETag'], first['ETag'])
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], first['ETag'])
+
+    def test_write_changes_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.announcement.title = 'Picnic moved'
+            self.announcement.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()[0]['title'], 'Picnic moved')
+
+    def test_cached_feed_is_dropped_when_its_first_item_expires(self):
+        Announcement.objects.filter(pk=self.announcement.pk).update(expires_at=timezone.now() + timedelta(seconds=1))
+        self.assertEqual(len(self.client.get(self.url).json()), 1)
+        time.sleep(1.2)
+        self.assertEqual(self.client.get(self.url).json(), [])
+
+
+class UnreadCounterTests(TestCase):
+    def setUp(self):
+        self.member = User.objects.create_user(username='member', email='member@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+
+    def notify(self, title='Payment received'):
+        return Notification.objects.create(
+            user=self.member, title=title, message='Thanks', notification_type='payment_received'
+        )
+
+    def test_read_state_is_built_from_the_table_on_first_access(self):
+        self.notify()
+        self.notify()
+        self.assertFalse(NotificationReadState.objects.filter(pk=self.member.pk).exists())
+        self.assertEqual(get_read_state(self.member).unread_count, 2)
+
+    def test_new_notification_increments_the_counter(self):
+        get_read_state(self.member)
+        self.notify()
+        self.assertEqual(NotificationReadState.objects.get(pk=self.member.pk).unread_count, 1)
+
+    def test_mark_read_decrements_once(self):
+        notification = self.notify()
+        self.notify()
+        get_read_state(self.member)
+        url = f'/api/notifications/mark-read/{notification.pk}/'
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertEqual(NotificationReadState.objects.get(pk=self.member.pk).unread_count, 1)
+
+    def test_mark_read_of_someone_elses_notification_is_404(self):
+        other = User.objects.create_user(username='other', email='other@example.com', password='x')
+        notification = Notification.objects.create(user=other, title='Hi', message='Hi', notification_type='general')
+        response = self.client.post(f'/api/notifications/mark-read/{notification.pk}/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_mark_all_read_moves_the_watermark(self):
+        self.notify()
+        self.notify()
+        get_read_state(self.member)
+        response = self.client.post('/api/notifications/mark-all-read/')
+        self.assertEqual(response.status_code, 200)
+        state = NotificationReadState.objects.get(pk=self.member.pk)
+        self.assertEqual((state.unread_count, state.last_read_at.isoformat()), (0, response.json()['last_read_at']))
+        # Rows are left alone; the watermark is what marks them read
+        self.assertEqual(Notification.objects.filter(user=self.member, is_read=False).count(), 2)
+
+        self.notify('After the watermark')
+        self.assertEqual(NotificationReadState.objects.get(pk=self.member.pk).unread_count, 1)
+
+    def test_unread_count_includes_broadcasts(self):
+        self.notify()
+        BroadcastNotification.objects.create(title='Meeting', message='Sunday', notification_type='event_created')
+        response = self.client.get('/api/notifications/unread-count/')
+        self.assertEqual(response.json(), {'unread_count': 2, 'personal': 1, 'broadcasts': 1, 'last_read_at': None})
+
+        self.client.post('/api/notifications/mark-all-read/')
+        counts = self.client.get('/api/notifications/unread-count/').json()
+        self.assertEqual((counts['unread_count'], counts['personal'], counts['broadcasts']), (0, 0, 0))
+        self.assertIsNotNone(counts['last_read_at'])
+
+
+class LiveStreamTests(TestCase):
+    def test_query_token_carries_its_expiry(self):
+        member = User.objects.create_user(username='member', email='member@example.com', password='x')
+        token = AccessToken.for_user(member)
+        request = RequestFactory().get('/api/notifications/stream/', {'token': str(token)})
+        self.assertEqual(authenticate_stream(request), (member, token['exp']))
+
+    @override_settings(LIVE_EVENTS_HEARTBEAT_SECONDS=0.05)
+    async def test_stream_closes_when_token_expires(self):
+        frames = [frame async for frame in event_stream(['user:1'], expires_at=time.time() + 0.2)]
+        self.assertIn(': ping\n\n', frames)
+        self.assertEqual(frames[-1], 'event: token_expired\ndata: {}\n\n')
+
+
+@override_settings(LIVE_EVENTS_BROKER='pamoja_kenya.live.InMemoryBroker', LIVE_EVENTS_HEARTBEAT_SECONDS=60)
+class LiveEventStreamTests(TestCase):
+    connections = int(os.environ.get('LIVE_STREAM_TEST_CONNECTIONS', 5000))
+
+    def setUp(self):
+        reset_broker()
+        self.addCleanup(reset_broker)
+        user = User.objects.create_user(username='streamer', email='streamer@example.com', password='x')
+        self.token = str(AccessToken.for_user(user))
+
+    async def open_stream(self, application, received, disconnect):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': '/api/notifications/stream/', 'raw_path': b'/api/notifications/stream/',
+            'query_string': f'token={self.token}'.encode(), 'headers': [(b'host', b'testserver')],
+            'client': ('127.0.0.1', 1234), 'server': ('testserver', 80),
+        }
+        messages = iter([{'type': 'http.request', 'body': b'', 'more_body': False}])
+
+        async def receive():
+            message = next(messages, None)
+            if message is None:
+                await disconnect.wait()
+                message = {'type': 'http.disconnect'}
+            return message
+
+        async def send(message):
+            received.append(message)
+
+        await application(scope, receive, send)
+
+    async def test_one_process_holds_many_idle_connections(self):
+        application = get_asgi_application()
+        disconnect = asyncio.Event()
+        streams = [[] for _ in range(self.connections)]
+        tasks = [asyncio.create_task(self.open_stream(application, received, disconnect)) for received in streams]
+
+        async def wait_for(condition, timeout):
+            deadline = asyncio.get_running_loop().time() + timeout
+            while not condition():
+                self.assertLess(asyncio.get_running_loop().time(), deadline)
+                await asyncio.sleep(0.05)
+
+        try:
+            await wait_for(lambda: hub.connection_count == self.connections, timeout=120)
+            self.assertTrue(all(received[0]['status'] == 200 for received in streams))
+
+            publish('members', 'notification', {'title': 'Hello'})
+            await wait_for(lambda: all(b'event: notification' in received[-1].get('body', b'') for received in streams),
+                           timeout=10)
+        finally:
+            disconnect.set()
+            await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), timeout=60)
+        self.assertEqual(hub.connection_count, 0)
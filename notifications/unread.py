@@ -0,0 +1,96 @@
+"""
+Unread notification counters.
+
+``NotificationReadState`` keeps a read watermark per member and the number of
+unread personal notifications newer than it. A notification counts as read when
+``is_read`` is set or it is no newer than the watermark, so "mark all read" is
+one write that moves the watermark and zeroes the counter. ``notifications.signals``
+adjusts the counter with F-expression UPDATEs as notifications are created,
+read or deleted. Broadcasts have no per-user rows until they are read, so their
+unread count is one indexed query at read time.
+"""
+from django.db.models import Exists, F, OuterRef, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import BroadcastNotification, BroadcastReceipt, Notification, NotificationReadState
+
+
+def count_unread(user_id, last_read_at):
+    notifications = Notification.objects.filter(user_id=user_id, is_read=False)
+    if last_read_at:
+        notifications = notifications.filter(created_at__gt=last_read_at)
+    return notifications.count()
+
+
+def get_read_state(user):
+    """Return the member's read state, building it from their notifications on first access."""
+    state = NotificationReadState.objects.filter(pk=user.pk).first()
+    if state is None:
+        state, _ = NotificationReadState.objects.get_or_create(
+            user_id=user.pk, defaults={'unread_count': count_unread(user.pk, None)}
+        )
+    return state
+
+
+def is_read(notification, state):
+    return notification.is_read or bool(state.last_read_at and notification.created_at <= state.last_read_at)
+
+
+def adjust_unread(user_id, delta, created_at):
+    """
+    Add ``delta`` to the member's counter if a notification created at
+    ``created_at`` is newer than their watermark. Members without a row are
+    skipped; ``get_read_state`` counts from the table on first read.
+    """
+    NotificationReadState.objects.filter(
+        Q(last_read_at__isnull=True) | Q(last_read_at__lt=created_at), pk=user_id
+    ).update(unread_count=Greatest(F('unread_count') + delta, 0), updated_at=timezone.now())
+
+
+def rebuild_unread_counts(user_ids):
+    """Recount members whose notifications changed through queryset.update()."""
+    for state in NotificationReadState.objects.filter(pk__in=user_ids):
+        NotificationReadState.objects.filter(pk=state.pk).update(
+            unread_count=count_unread(state.pk, state.last_read_at), updated_at=timezone.now()
+        )
+
+
+def mark_read(user, notification_id):
+    """Mark one of the member's notifications read without loading the model. False if it isn't theirs."""
+    notification = Notification.objects.filter(id=notification_id, user=user).values('is_read', 'created_at').first()
+    if notification is None:
+        return False
+    # The is_read filter makes concurrent marks of the same row decrement once
+    if not notification['is_read'] and Notification.objects.filter(id=notification_id, is_read=False).update(is_read=True):
+        adjust_unread(user.pk, -1, notification['created_at'])
+    return True
+
+
+def mark_all_read(user):
+    """Move the member's watermark to now and zero the counter in one write."""
+    now = timezone.now()
+    changes = {'last_read_at': now, 'unread_count': 0}
+    if not NotificationReadState.objects.filter(pk=user.pk).update(updated_at=now, **changes):
+        NotificationReadState.objects.update_or_create(user_id=user.pk, defaults=changes)
+    return now
+
+
+def unread_broadcasts(user, state):
+    broadcasts = BroadcastNotification.objects.filter(is_active=True, created_at__gte=user.date_joined)
+    if state.last_read_at:
+        broadcasts = broadcasts.filter(created_at__gt=state.last_read_at)
+    return broadcasts.filter(
+        ~Exists(BroadcastReceipt.objects.filter(broadcast=OuterRef('pk'), user=user))
+    ).count()
+
+
+def unread_counts(user):
+    state = get_read_state(user)
+    broadcasts = unread_broadcasts(user, state)
+    return {
+        'unread_count': state.unread_count + broadcasts,
+        'personal': state.unread_count,
+        'broadcasts': broadcasts,
+        'last_read_at': state.last_read_at.isoformat() if state.last_read_at else None,
+    }
@@ -10,6 +10,10 @@ urlpatterns = [
     # Protected endpoints (auth required)
     path('user/', views.user_notifications, name='user_notifications'),
     path('mark-read/<int:notification_id>/', views.mark_notification_read, name='mark_notification_read'),
+    path('mark-read/broadcast/<int:broadcast_id>/', views.mark_broadcast_read, name='mark_broadcast_read'),
+    path('mark-all-read/', views.mark_all_notifications_read, name='mark_all_notifications_read'),
+    path('unread-count/', views.unread_count, name='unread_count'),
+    path('stream/', views.live_events, name='live_events'),
     
     # Legacy endpoints
     path('list/', views.notifications_list, name='notifications_list'),
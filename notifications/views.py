@@ -2,70 +2,102 @@ from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Exists, OuterRef
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
-from .models import Notification, Event, Announcement, Meeting, EventRegistration
+from django.views.decorators.http import require_GET
+from heapq import merge
+from .models import Notification, Event, Announcement, Meeting, EventRegistration, BroadcastNotification, BroadcastReceipt
 from .serializers import NotificationSerializer, EventSerializer, AnnouncementSerializer
+from .public_cache import public_content_response
+from .unread import get_read_state, is_read, mark_all_read, mark_read, unread_counts
+from .stream import authenticate_stream, event_stream, stream_channels
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def public_announcements(request):
     """Get public announcements (no authentication required)"""
     limit = int(request.GET.get('limit', 10))
-    announcements = Announcement.objects.filter(
-        is_active=True,
-        expires_at__gt=timezone.now()
-    ).order_by('-is_pinned', '-created_at')[:limit]
-    
-    data = []
-    for ann in announcements:
-        data.append({
-            'id': ann.id,
-            'title': ann.title,
-            'content': ann.content,
-            'priority': ann.priority,
-            'is_pinned': ann.is_pinned,
-            'created_at': ann.created_at.isoformat()
-        })
+
+    def build():
+        announcements = Announcement.objects.filter(
+            is_active=True,
+            expires_at__gt=timezone.now()
+        ).order_by('-is_pinned', '-created_at')[:limit]
+        
+        data = []
+        for ann in announcements:
+            data.append({
+                'id': ann.id,
+                'title': ann.title,
+                'content': ann.content,
+                'priority': ann.priority,
+                'is_pinned': ann.is_pinned,
+                'created_at': ann.created_at.isoformat()
+            })
+        # The feed changes when the first of these expires
+        return data, min((ann.expires_at for ann in announcements), default=None)
     
-    return Response(data)
+    return public_content_response(request, Announcement, {'limit': limit}, build)
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def public_events(request):
     """Get public events (no authentication required)"""
     limit = int(request.GET.get('limit', 10))
-    events = Event.objects.filter(
-        is_active=True,
-        date__gt=timezone.now()
-    ).order_by('date')[:limit]
-    
-    data = []
-    for event in events:
-        data.append({
-            'id': event.id,
-            'title': event.title,
-            'description': event.description,
-            'date': event.date.isoformat(),
-            'location': event.location,
-            'is_featured': event.is_featured,
-            'registration_required': event.registration_required
-        })
+
+    def build():
+        events = Event.objects.filter(
+            is_active=True,
+            date__gt=timezone.now()
+        ).order_by('date')[:limit]
+        
+        data = []
+        for event in events:
+            data.append({
+                'id': event.id,
+                'title': event.title,
+                'description': event.description,
+                'date': event.date.isoformat(),
+                'location': event.location,
+                'is_featured': event.is_featured,
+                'registration_required': event.registration_required
+            })
+        # The feed changes when the next event starts
+        return data, min((event.date for event in events), default=None)
     
-    return Response(data)
+    return public_content_response(request, Event, {'limit': limit}, build)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_notifications(request):
-    """Get user notifications (authentication required)"""
-    notifications = Notification.objects.filter(user=request.user)[:20]
+    """Get user notifications merged with member-wide broadcasts (authentication required)"""
+    limit = 20
+    state = get_read_state(request.user)
+    personal = Notification.objects.filter(user=request.user)[:limit]
+    broadcasts = BroadcastNotification.objects.filter(
+        is_active=True,
+        created_at__gte=request.user.date_joined
+    ).annotate(
+        is_read=Exists(BroadcastReceipt.objects.filter(broadcast=OuterRef('pk'), user=request.user))
+    ).order_by('-created_at')[:limit]
+    
+    # Both sources are already newest-first, so a lazy merge keeps the order
+    latest = merge(personal, broadcasts, key=lambda n: n.created_at, reverse=True)
+    
     data = []
-    for notif in notifications:
+    for notif in latest:
+        if len(data) == limit:
+            break
         data.append({
             'id': notif.id,
             'title': notif.title,
             'message': notif.message,
             'type': notif.notification_type,
-            'is_read': notif.is_read,
+            'is_read': is_read(notif, state),
+            'is_broadcast': isinstance(notif, BroadcastNotification),
             'created_at': notif.created_at.isoformat()
         })
     
@@ -75,36 +107,73 @@ def user_notifications(request):
 @permission_classes([IsAuthenticated])
 def mark_notification_read(request, notification_id):
     """Mark notification as read"""
-    try:
-        notification = Notification.objects.get(id=notification_id, user=request.user)
-        notification.is_read = True
-        notification.save()
-        return Response({'message': 'Notification marked as read'})
-    except Notification.DoesNotExist:
+    if not mark_read(request.user, notification_id):
         return Response({'error': 'Notification not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({'message': 'Notification marked as read'})
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def mark_all_notifications_read(request):
+    """Mark every notification and broadcast read by moving the user's read watermark"""
+    last_read_at = mark_all_read(request.user)
+    return Response({'message': 'All notifications marked as read', 'last_read_at': last_read_at.isoformat()})
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def unread_count(request):
+    """Unread badge count for the current user (personal + broadcast)"""
+    return Response(unread_counts(request.user))
+
+@require_GET
+async def live_events(request):
+    """Server-Sent Events stream of new notifications, dashboard deltas and, for staff, admin counters"""
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Live events are only served by the ASGI application (pamoja_kenya.asgi)'},
+                            status=501)
+    user, expires_at = await sync_to_async(authenticate_stream)(request)
+    if user is None:
+        return JsonResponse({'error': 'Authentication credentials were not provided.'}, status=401)
+    
+    response = StreamingHttpResponse(event_stream(stream_channels(user), expires_at), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # stop nginx buffering the stream
+    return response
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def mark_broadcast_read(request, broadcast_id):
+    """Mark a broadcast notification as read for the current user"""
+    if not BroadcastNotification.objects.filter(id=broadcast_id, is_active=True).exists():
+        return Response({'error': 'Notification not found'}, status=status.HTTP_404_NOT_FOUND)
+    BroadcastReceipt.objects.get_or_create(broadcast_id=broadcast_id, user=request.user)
+    return Response({'message': 'Notification marked as read'})
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def public_meetings(request):
     """Get public meetings (no authentication required)"""
     limit = int(request.GET.get('limit', 10))
-    meetings = Meeting.objects.filter(
-        date__gt=timezone.now()
-    ).order_by('date')[:limit]
-    
-    data = []
-    for meeting in meetings:
-        data.append({
-            'id': meeting.id,
-            'title': meeting.title,
-            'description': meeting.description,
-            'date': meeting.date.isoformat(),
-            'duration': meeting.duration,
-            'type': meeting.type,
-            'require_registration': meeting.require_registration
-        })
+
+    def build():
+        meetings = Meeting.objects.filter(
+            date__gt=timezone.now()
+        ).order_by('date')[:limit]
+        
+        data = []
+        for meeting in meetings:
+            data.append({
+                'id': meeting.id,
+                'title': meeting.title,
+                'description': meeting.description,
+                'date': meeting.date.isoformat(),
+                'duration': meeting.duration,
+                'type': meeting.type,
+                'require_registration': meeting.require_registration
+            })
+        # The feed changes when the next meeting starts
+        return data, min((meeting.date for meeting in meetings), default=None)
     
-    return Response(data)
+    return public_content_response(request, Meeting, {'limit': limit}, build)
 
 # Legacy view functions for URL compatibility
 @api_view(['GET'])
@@ -0,0 +1,185 @@
+"""
+Live event pub/sub for the Server-Sent Events stream.
+
+Code anywhere in the project calls ``publish(channel, event, data)`` (usually
+through ``publish_on_commit`` from a signal handler). The configured broker
+carries the message to every process, where the process-local ``Hub`` hands it
+to the queues of the SSE connections subscribed to that channel.
+
+- ``InMemoryBroker`` delivers straight to this process's hub. It is meant for
+  tests and single-process development servers.
+- ``RedisBroker`` publishes with Redis PUBLISH. Each process keeps one
+  pattern subscription, however many clients it serves, and feeds its hub from it.
+
+Channels in use: ``user:<id>`` (one member), ``members`` (every member) and
+``admin`` (staff).
+"""
+import asyncio
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """One connection's queue of messages for its channels."""
+
+    def __init__(self, hub, channels, loop, maxsize):
+        self.hub = hub
+        self.channels = channels
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def deliver(self, message):
+        # Runs on the subscriber's event loop
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def get(self, timeout):
+        """Next message, or None when ``timeout`` seconds pass without one."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class Hub:
+    """Process-local fan-out from channels to subscriptions; safe to call from any thread."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.channels = {}
+
+    def subscribe(self, channels, maxsize=100):
+        subscription = Subscription(self, list(channels), asyncio.get_running_loop(), maxsize)
+        with self.lock:
+            for channel in subscription.channels:
+                self.channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for channel in subscription.channels:
+                subscribers = self.channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self.channels[channel]
+
+    @property
+    def connection_count(self):
+        with self.lock:
+            return len({s for subscribers in self.channels.values() for s in subscribers})
+
+    def dispatch(self, channel, message):
+        with self.lock:
+            subscribers = list(self.channels.get(channel, ()))
+        for subscription in subscribers:
+            if subscription.loop.is_closed():
+                continue
+            subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+        return len(subscribers)
+
+
+hub = Hub()
+
+
+class InMemoryBroker:
+    """Deliver to this process only."""
+
+    def __init__(self, url=None):
+        pass
+
+    def publish(self, channel, message):
+        hub.dispatch(channel, message)
+
+    async def ensure_listening(self):
+        pass
+
+
+class RedisBroker:
+    """Redis PUBLISH, with one pattern subscription per process feeding the hub."""
+
+    prefix = 'pamoja:live:'
+
+    def __init__(self, url):
+        self.url = url
+        self.client = None
+        self.listener = None
+
+    def publish(self, channel, message):
+        import redis
+        if self.client is None:
+            self.client = redis.Redis.from_url(self.url, socket_timeout=1, socket_connect_timeout=1)
+        self.client.publish(self.prefix + channel, json.dumps(message, cls=DjangoJSONEncoder))
+
+    async def ensure_listening(self):
+        if self.listener is None or self.listener.done():
+            self.listener = asyncio.get_running_loop().create_task(self.listen())
+
+    async def listen(self):
+        import redis.asyncio as aioredis
+        delay = 1
+        while True:
+            try:
+                client = aioredis.Redis.from_url(self.url)
+                async with client.pubsub() as pubsub:
+                    await pubsub.psubscribe(self.prefix + '*')
+                    delay = 1
+                    async for item in pubsub.listen():
+                        if item['type'] != 'pmessage':
+                            continue
+                        channel = item['channel'].decode()[len(self.prefix):]
+                        hub.dispatch(channel, json.loads(item['data']))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Live events Redis subscription failed, retrying in {delay}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(settings.LIVE_EVENTS_BROKER)(settings.LIVE_EVENTS_BROKER_URL)
+    return _broker
+
+
+def reset_broker():
+    """Forget the configured broker (tests that switch LIVE_EVENTS_BROKER)."""
+    global _broker
+    _broker = None
+
+
+def publish(channel, event, data):
+    """Send ``event`` with JSON-serialisable ``data`` to everyone subscribed to ``channel``."""
+    message = {'event': event, 'data': json.loads(json.dumps(data, cls=DjangoJSONEncoder))}
+    try:
+        get_broker().publish(channel, message)
+    except Exception as e:
+        # Live updates are best effort; clients resync from the REST endpoints on reconnect
+        logger.error(f"Could not publish live event {event} to {channel}: {e}")
+
+
+def publish_on_commit(channel, event, data):
+    transaction.on_commit(lambda: publish(channel, event, data))
+
+
+def format_event(message):
+    return f"event: {message['event']}\ndata: {json.dumps(message['data'])}\n\n"
@@ -114,10 +114,15 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.User'
 
+# Reverse proxies in front of Django that append to X-Forwarded-For (1 on PythonAnywhere). With 0 the
+# client address is REMOTE_ADDR; never set it higher than the real number, or clients can spoof their address
+NUM_PROXIES = config('NUM_PROXIES', default=0, cast=int)
+
 # REST Framework Configuration
 REST_FRAMEWORK = {
+    'NUM_PROXIES': NUM_PROXIES,  # DRF throttles identify clients the same way as accounts.login.client_ip
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -132,7 +137,7 @@ REST_FRAMEWORK = {
 
 # JWT Configuration - Different timeouts for users vs admins
 SIMPLE_JWT = {
-    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=10),  # Default 10-minute for regular users
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=10),  # Default 10-minute for regular users; keep short, the live events stream takes it as ?token=
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
@@ -144,6 +149,7 @@ SIMPLE_JWT = {
     'AUTH_HEADER_NAME': 'HTTP_AUTHORIZATION',
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.jwt_utils.CachedTokenRefreshSerializer',
 }
 
 # Admin JWT Configuration - No timeout
@@ -212,12 +218,32 @@ if DEBUG:
 PAYPAL_MODE = config('PAYPAL_MODE', default='sandbox')  # sandbox or live
 PAYPAL_CLIENT_ID = config('PAYPAL_CLIENT_ID', default='')
 PAYPAL_CLIENT_SECRET = config('PAYPAL_CLIENT_SECRET', default='')
+PAYPAL_WEBHOOK_ID = config('PAYPAL_WEBHOOK_ID', default='')
 
 # Stripe Settings
 STRIPE_PUBLISHABLE_KEY = config('STRIPE_PUBLISHABLE_KEY', default='')
 STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY', default='')
 STRIPE_WEBHOOK_SECRET = config('STRIPE_WEBHOOK_SECRET', default='')
 
+# M-Pesa (Daraja) STK push callbacks are unsigned: the callback URL carries this token
+MPESA_CALLBACK_TOKEN = config('MPESA_CALLBACK_TOKEN', default='')
+MPESA_ALLOWED_IPS = config('MPESA_ALLOWED_IPS', default='', cast=lambda v: [ip.strip() for ip in v.split(',') if ip.strip()])
+
+# Payment webhooks (payments.webhooks, payments.events)
+PAYMENT_WEBHOOK_TOLERANCE_SECONDS = 300  # reject signed deliveries older than this (replays)
+PAYMENT_EVENT_MATCH_WINDOW_SECONDS = 3600  # keep retrying events whose payment isn't recorded yet
+PAYMENT_EVENT_LOCK_SECONDS = 300
+
+# Provider API clients (payments.providers): built on first use, one pooled session per process
+PAYMENT_PROVIDER_CONNECT_TIMEOUT = 3.05
+PAYMENT_PROVIDER_READ_TIMEOUT = config('PAYMENT_PROVIDER_READ_TIMEOUT', default=15, cast=float)
+PAYMENT_PROVIDER_BUDGET_SECONDS = config('PAYMENT_PROVIDER_BUDGET_SECONDS', default=20, cast=float)  # all calls of one operation
+PAYMENT_PROVIDER_POOL_SIZE = 10
+PAYMENT_PROVIDER_STATUS_CACHE_SECONDS = 60  # succeeded, canceled, approved, ...
+PAYMENT_PROVIDER_PENDING_STATUS_CACHE_SECONDS = 2  # statuses that can still change
+# Replay provider responses from this file instead of calling PayPal/Stripe (offline tests and benchmarks)
+PAYMENT_PROVIDER_RECORDINGS = config('PAYMENT_PROVIDER_RECORDINGS', default='')
+
 # SendGrid Settings (Alternative email service)
 SENDGRID_API_KEY = config('SENDGRID_API_KEY', default='')
 
@@ -231,6 +257,93 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=False, cast=bool)
+# Fail fast when the broker is down so web requests never wait on it; the outbox drain retries
+CELERY_TASK_PUBLISH_RETRY = False
+CELERY_BROKER_TRANSPORT_OPTIONS = {'max_retries': 1, 'interval_start': 0, 'interval_step': 0.2, 'interval_max': 0.2}
+CELERY_BEAT_SCHEDULE = {
+    'drain-email-outbox': {
+        'task': 'notifications.tasks.drain_outbox',
+        'schedule': 30.0,
+    },
+    'prune-expired-tokens': {
+        'task': 'accounts.tasks.prune_expired_tokens',
+        'schedule': 3600.0,
+    },
+    'process-payment-events': {
+        'task': 'payments.tasks.process_payment_events',
+        'schedule': 60.0,
+    },
+    'prune-idempotency-records': {
+        'task': 'accounts.tasks.prune_idempotency_records',
+        'schedule': 3600.0,
+    },
+    'resume-email-campaigns': {
+        'task': 'notifications.tasks.resume_email_campaigns',
+        'schedule': 60.0,
+    },
+}
+
+# Outbound email queue (notifications.outbox)
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = config('EMAIL_OUTBOX_RETRY_BASE_SECONDS', default=60, cast=int)
+EMAIL_OUTBOX_LEASE_SECONDS = 600
+
+# Bulk broadcast email (notifications.bulk_mail)
+EMAIL_BULK_BATCH_SIZE = config('EMAIL_BULK_BATCH_SIZE', default=100, cast=int)
+EMAIL_BULK_RATE_PER_SECOND = config('EMAIL_BULK_RATE_PER_SECOND', default=0, cast=float)  # 0 = unthrottled
+EMAIL_CAMPAIGN_LEASE_SECONDS = 600  # renewed after every batch; must outlast one batch
+
+# Cache - shared Redis cache when CACHE_URL is set, per-process memory otherwise
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Admin dashboard stats snapshot (admin_api.stats); signals invalidate it on writes
+ADMIN_STATS_CACHE_TIMEOUT = 300
+
+# Live events over SSE (pamoja_kenya.live, GET /api/notifications/stream/ under ASGI). Redis carries events
+# between processes; the in-memory broker only reaches clients connected to the publishing process
+LIVE_EVENTS_BROKER_URL = config('LIVE_EVENTS_BROKER_URL', default='')
+LIVE_EVENTS_BROKER = 'pamoja_kenya.live.RedisBroker' if LIVE_EVENTS_BROKER_URL else 'pamoja_kenya.live.InMemoryBroker'
+LIVE_EVENTS_HEARTBEAT_SECONDS = 15
+LIVE_EVENTS_RETRY_MS = 3000
+LIVE_EVENTS_QUEUE_SIZE = 100
+
+# Public announcement/event/meeting feeds (notifications.public_cache); signals bump a content version on writes
+PUBLIC_CONTENT_CACHE_TIMEOUT = 300
+PUBLIC_CONTENT_MAX_AGE = config('PUBLIC_CONTENT_MAX_AGE', default=60, cast=int)  # browser/CDN Cache-Control max-age
+
+# JWT user lookups (accounts.authentication); saves invalidate the cached user, 0 disables the cache
+AUTH_USER_CACHE_TIMEOUT = config('AUTH_USER_CACHE_TIMEOUT', default=60, cast=int)
+
+# Refresh-token blacklist (accounts.token_blacklist). Trusting cached "active" states skips the
+# blacklist query on refresh; only safe when every process shares the cache, hence the CACHE_URL default
+TOKEN_BLACKLIST_TRUST_CACHE = config('TOKEN_BLACKLIST_TRUST_CACHE', default=bool(CACHE_URL), cast=bool)
+TOKEN_PRUNE_BATCH_SIZE = 1000
+
+# Idempotency-Key replay for mutating POSTs (accounts.idempotency)
+IDEMPOTENCY_KEY_TTL_HOURS = 24  # how long a key's response is replayed
+IDEMPOTENCY_CACHE_SECONDS = 24 * 60 * 60
+IDEMPOTENCY_LOCK_SECONDS = 30  # longest a request may hold its key
+IDEMPOTENCY_WAIT_SECONDS = 5  # how long a concurrent duplicate waits for the first response
+
+# Login throttling (accounts.login): (attempts, window seconds), charged before password hashing
+LOGIN_THROTTLE_RATES = {
+    'ip': (config('LOGIN_THROTTLE_IP_ATTEMPTS', default=30, cast=int), 60),
+    'account': (config('LOGIN_THROTTLE_ACCOUNT_ATTEMPTS', default=10, cast=int), 300),
+}
 
 # Frontend URL for password reset links
 FRONTEND_URL = config('FRONTEND_URL', default='http://localhost:4200')
@@ -239,6 +352,21 @@ FRONTEND_URL = config('FRONTEND_URL', default='http://localhost:4200')
 FIREBASE_EMAIL_FUNCTION_URL = config('FIREBASE_EMAIL_FUNCTION_URL', default='https://us-central1-pamoja-kenya.cloudfunctions.net/sendEmail')
 FIREBASE_API_KEY = config('FIREBASE_API_KEY', default='')
 USE_FIREBASE_EMAIL = config('USE_FIREBASE_EMAIL', default=True, cast=bool)
+# Transport (notifications.firebase_email_service): pooled keep-alive session, up to FIREBASE_EMAIL_BATCH_SIZE
+# messages per call to the bulk function, and a circuit breaker that fails fast after repeated errors
+FIREBASE_EMAIL_BULK_FUNCTION_URL = config(
+    'FIREBASE_EMAIL_BULK_FUNCTION_URL', default=FIREBASE_EMAIL_FUNCTION_URL.rsplit('/', 1)[0] + '/sendBulkEmails'
+)
+# sendBulkEmails sends its batch one message at a time, so a bulk call's read timeout is
+# max(FIREBASE_EMAIL_READ_TIMEOUT, messages * FIREBASE_EMAIL_SECONDS_PER_MESSAGE). Keep
+# BATCH_SIZE * SECONDS_PER_MESSAGE under the function's own timeout (60 s by default).
+FIREBASE_EMAIL_BATCH_SIZE = config('FIREBASE_EMAIL_BATCH_SIZE', default=25, cast=int)
+FIREBASE_EMAIL_POOL_SIZE = 10
+FIREBASE_EMAIL_CONNECT_TIMEOUT = 3.05
+FIREBASE_EMAIL_READ_TIMEOUT = config('FIREBASE_EMAIL_READ_TIMEOUT', default=10, cast=float)
+FIREBASE_EMAIL_SECONDS_PER_MESSAGE = config('FIREBASE_EMAIL_SECONDS_PER_MESSAGE', default=1.5, cast=float)
+FIREBASE_EMAIL_BREAKER_THRESHOLD = 5
+FIREBASE_EMAIL_BREAKER_RESET_SECONDS = 30
 
 # File Upload Settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = config('MAX_UPLOAD_SIZE', default=5242880, cast=int)  # 5MB
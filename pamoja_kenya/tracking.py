@@ -0,0 +1,88 @@
+"""
+Change tracking for model instances.
+
+``TrackedFieldsMixin`` remembers the column values an instance was loaded with,
+so code can ask what changed without re-reading the row, saves that change
+nothing are skipped, and ``save()`` only writes the dirty columns.
+"""
+from django.db import models
+
+
+class TrackedFieldsMixin(models.Model):
+    """
+    Snapshot loaded field values and save only what changed.
+
+    ``save()`` without ``update_fields`` on a loaded instance becomes
+    ``save(update_fields=<changed fields + auto_now fields>)`` and returns
+    without a query when nothing changed. Signal handlers can read the stored
+    values with ``loaded_value()`` or ``changed_fields`` until the save
+    finishes, after which the snapshot is refreshed.
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        fields = {field.attname: field for field in cls._meta.concrete_fields}
+        instance._loaded_values = {
+            attname: cls._comparable(fields[attname], value) for attname, value in zip(field_names, values)
+        }
+        return instance
+
+    @staticmethod
+    def _comparable(field, value):
+        # File fields hold mutable FieldFile objects; track the stored name instead
+        if isinstance(field, models.FileField):
+            return getattr(value, 'name', value)
+        return value
+
+    @property
+    def has_snapshot(self):
+        return getattr(self, '_loaded_values', None) is not None and not self._state.adding
+
+    @property
+    def changed_fields(self):
+        """Names of concrete fields whose value differs from what was loaded."""
+        loaded = getattr(self, '_loaded_values', None) or {}
+        changed = []
+        for field in self._meta.concrete_fields:
+            # Deferred fields that were never touched are not in __dict__ and can't have changed
+            if field.primary_key or field.attname not in self.__dict__:
+                continue
+            current = self._comparable(field, self.__dict__[field.attname])
+            if field.attname not in loaded or current != loaded[field.attname]:
+                changed.append(field.name)
+        return changed
+
+    def has_changed(self, field_name):
+        return field_name in self.changed_fields
+
+    def loaded_value(self, field_name):
+        """The value ``field_name`` had when the instance was loaded or last saved."""
+        attname = self._meta.get_field(field_name).attname
+        return (getattr(self, '_loaded_values', None) or {}).get(attname)
+
+    def _snapshot(self, fields=None):
+        loaded = getattr(self, '_loaded_values', None) or {}
+        for field in self._meta.concrete_fields:
+            if field.attname not in self.__dict__:
+                continue
+            if fields is None or field.name in fields or field.attname in fields:
+                loaded[field.attname] = self._comparable(field, self.__dict__[field.attname])
+        self._loaded_values = loaded
+
+    def save(self, *args, **kwargs):
+        if self.has_snapshot and not args and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            changed = self.changed_fields
+            if not changed:
+                return
+            auto_now = [f.name for f in self._meta.concrete_fields if getattr(f, 'auto_now', False)]
+            kwargs['update_fields'] = set(changed) | set(auto_now)
+        super().save(*args, **kwargs)
+        self._snapshot(kwargs.get('update_fields'))
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._snapshot(fields)
@@ -5,19 +5,12 @@ from django.utils import timezone
 import logging
 import uuid
 
+from payments.providers import budget, cached_status, forget_status, provider_clients
+
 logger = logging.getLogger(__name__)
 
 class PaymentService:
-    def __init__(self):
-        # PayPal Configuration
-        paypalrestsdk.configure({
-            "mode": settings.PAYPAL_MODE,  # sandbox or live
-            "client_id": settings.PAYPAL_CLIENT_ID,
-            "client_secret": settings.PAYPAL_CLIENT_SECRET
-        })
-        
-        # Stripe Configuration
-        stripe.api_key = settings.STRIPE_SECRET_KEY
+    # The SDK clients are built on first use and shared by the process (see payments.providers)
     
     def create_paypal_payment(self, amount, currency='USD', description='Pamoja Kenya MN Payment'):
         """Create PayPal payment"""
@@ -47,9 +40,11 @@ class PaymentService:
                     },
                     "description": description
                 }]
-            })
+            }, api=provider_clients.paypal)
             
-            if payment.create():
+            with budget():
+                created = payment.create()
+            if created:
                 logger.info(f"PayPal payment created: {payment.id}")
                 return {
                     'success': True,
@@ -68,9 +63,13 @@ class PaymentService:
     def execute_paypal_payment(self, payment_id, payer_id):
         """Execute PayPal payment after approval"""
         try:
-            payment = paypalrestsdk.Payment.find(payment_id)
+            # Execute by id; the response carries the whole payment, so there is no lookup first
+            payment = paypalrestsdk.Payment({"id": payment_id}, api=provider_clients.paypal)
             
-            if payment.execute({"payer_id": payer_id}):
+            with budget():
+                executed = payment.execute({"payer_id": payer_id})
+            forget_status('paypal', payment_id)
+            if executed:
                 logger.info(f"PayPal payment executed: {payment_id}")
                 return {
                     'success': True,
@@ -90,15 +89,17 @@ class PaymentService:
     def create_stripe_payment_intent(self, amount, currency='usd', description='Pamoja Kenya MN Payment'):
         """Create Stripe payment intent"""
         try:
-            intent = stripe.PaymentIntent.create(
-                amount=int(amount * 100),  # Stripe uses cents
-                currency=currency,
-                description=description,
-                metadata={
-                    'organization': 'Pamoja Kenya MN',
-                    'timestamp': str(timezone.now())
-                }
-            )
+            with budget():
+                intent = stripe.PaymentIntent.create(
+                    amount=int(amount * 100),  # Stripe uses cents
+                    currency=currency,
+                    description=description,
+                    metadata={
+                        'organization': 'Pamoja Kenya MN',
+                        'timestamp': str(timezone.now())
+                    },
+                    **provider_clients.stripe_options()
+                )
             
             logger.info(f"Stripe payment intent created: {intent.id}")
             return {
@@ -147,23 +148,10 @@ class PaymentService:
             return {'success': False, 'error': str(e)}
     
     def verify_payment_status(self, payment_id, method):
-        """Verify payment status across different methods"""
+        """Verify payment status across different methods (provider lookups are cached briefly)"""
         try:
-            if method == 'paypal':
-                payment = paypalrestsdk.Payment.find(payment_id)
-                return {
-                    'status': payment.state,
-                    'amount': payment.transactions[0].amount.total if payment.transactions else None,
-                    'currency': payment.transactions[0].amount.currency if payment.transactions else None
-                }
-            
-            elif method == 'stripe':
-                intent = stripe.PaymentIntent.retrieve(payment_id)
-                return {
-                    'status': intent.status,
-                    'amount': intent.amount / 100,  # Convert from cents
-                    'currency': intent.currency
-                }
+            if method in ('paypal', 'stripe'):
+                return cached_status(method, payment_id, lambda: self.fetch_payment_status(payment_id, method))
             
             elif method == 'bank_transfer':
                 # For bank transfers, status would be manually updated
@@ -174,4 +162,22 @@ class PaymentService:
                 
         except Exception as e:
             logger.error(f"Payment verification error: {str(e)}")
-            return {'error': str(e)}
\ No newline at end of file
+            return {'error': str(e)}
+    
+    def fetch_payment_status(self, payment_id, method):
+        """Ask the provider for a payment's current status"""
+        with budget():
+            if method == 'paypal':
+                payment = paypalrestsdk.Payment.find(payment_id, api=provider_clients.paypal)
+                return {
+                    'status': payment.state,
+                    'amount': payment.transactions[0].amount.total if payment.transactions else None,
+                    'currency': payment.transactions[0].amount.currency if payment.transactions else None
+                }
+            
+            intent = stripe.PaymentIntent.retrieve(payment_id, **provider_clients.stripe_options())
+            return {
+                'status': intent.status,
+                'amount': intent.amount / 100,  # Convert from cents
+                'currency': intent.currency
+            }
@@ -1,27 +1,32 @@
 from django.contrib import admin
-from .models import Payment
+from .models import Payment, PaymentEvent
+from accounts.signals import sync_after_update
 
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
     list_display = ('payer_name', 'amount', 'get_payment_method_display', 'get_status_display', 'created_at', 'user')
     list_filter = ('payment_method', 'status', 'currency', 'created_at', 'completed_at')
-    search_fields = ('payer_name', 'payer_email', 'transaction_id', 'paypal_order_id', 'stripe_payment_intent_id', 'user__username')
-    readonly_fields = ('created_at', 'updated_at', 'completed_at')
+    search_fields = ('payer_name', 'payer_email', 'transaction_id', 'paypal_order_id', 'stripe_payment_intent_id', 'mpesa_checkout_request_id', 'user__username')
+    readonly_fields = ('created_at', 'updated_at', 'completed_at', 'provider_event_at')
     date_hierarchy = 'created_at'
     
     actions = ['mark_as_completed', 'mark_as_failed']
     
     def mark_as_completed(self, request, queryset):
         from django.utils import timezone
-        updated = queryset.filter(status='pending').update(
+        pks = list(queryset.filter(status='pending').values_list('pk', flat=True))
+        updated = Payment.objects.filter(pk__in=pks, status='pending').update(
             status='completed',
             completed_at=timezone.now()
         )
+        sync_after_update(Payment, pks)
         self.message_user(request, f'{updated} payments marked as completed.')
     mark_as_completed.short_description = 'Mark selected payments as completed'
     
     def mark_as_failed(self, request, queryset):
-        updated = queryset.filter(status='pending').update(status='failed')
+        pks = list(queryset.filter(status='pending').values_list('pk', flat=True))
+        updated = Payment.objects.filter(pk__in=pks, status='pending').update(status='failed')
+        sync_after_update(Payment, pks)
         self.message_user(request, f'{updated} payments marked as failed.')
     mark_as_failed.short_description = 'Mark selected payments as failed'
     
@@ -33,7 +38,8 @@ class PaymentAdmin(admin.ModelAdmin):
             'fields': ('payer_name', 'payer_email')
         }),
         ('Transaction Details', {
-            'fields': ('paypal_order_id', 'stripe_payment_intent_id', 'transaction_id')
+            'fields': ('paypal_order_id', 'stripe_payment_intent_id', 'mpesa_checkout_request_id', 'transaction_id',
+                       'provider_event_at')
         }),
         ('Additional Information', {
             'fields': ('description', 'notes')
@@ -50,4 +56,24 @@ class PaymentAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('user', 'application')
\ No newline at end of file
+        return super().get_queryset(request).select_related('user', 'application')
+
+
+@admin.register(PaymentEvent)
+class PaymentEventAdmin(admin.ModelAdmin):
+    list_display = ('event_id', 'provider', 'event_type', 'status', 'occurred_at', 'received_at', 'attempts', 'payment')
+    list_filter = ('provider', 'status', 'event_type', 'received_at')
+    search_fields = ('event_id', 'event_type')
+    readonly_fields = ('provider', 'event_id', 'event_type', 'payload', 'occurred_at', 'received_at', 'payment',
+                       'attempts', 'processed_at', 'last_error')
+    list_select_related = ('payment',)
+    
+    actions = ['reprocess_events']
+    
+    def reprocess_events(self, request, queryset):
+        from django.utils import timezone
+        from .events import dispatch_processing
+        updated = queryset.exclude(status='pending').update(status='pending', next_attempt_at=timezone.now(), last_error='')
+        dispatch_processing()
+        self.message_user(request, f'{updated} events queued for processing.')
+    reprocess_events.short_description = 'Process selected events again'
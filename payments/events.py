@@ -0,0 +1,237 @@
+"""
+Payment webhook event processing.
+
+The webhook views verify a callback, store it with ``record_event`` and return
+straight away. ``process_events`` then applies stored events to ``Payment`` rows
+in the order the provider says they happened. It runs as a Celery task, with a
+beat schedule as backstop, and only one processor runs at a time.
+
+- A (provider, event id) pair is stored once, so redelivered callbacks are
+  dropped at insert.
+- An event older than the last one applied to its payment is ignored, so a
+  late "failed" can't undo a "completed".
+- Events that arrive before their payment exists are retried until
+  ``PAYMENT_EVENT_MATCH_WINDOW_SECONDS`` have passed.
+- Only the changes in ``Payment.ALLOWED_TRANSITIONS`` are applied, so a late
+  denial can't fail a completed payment and a refunded one stays refunded. A
+  partial refund leaves the status alone.
+"""
+import logging
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Payment, PaymentEvent
+
+logger = logging.getLogger(__name__)
+
+PROCESSOR_LOCK_KEY = 'payments:event_processor'
+
+STRIPE_STATUSES = {
+    'payment_intent.succeeded': 'completed',
+    'payment_intent.payment_failed': 'failed',
+    'payment_intent.canceled': 'failed',
+    'charge.refunded': 'refunded',
+}
+
+PAYPAL_STATUSES = {
+    'PAYMENT.CAPTURE.COMPLETED': 'completed',
+    'PAYMENT.CAPTURE.DENIED': 'failed',
+    'PAYMENT.CAPTURE.DECLINED': 'failed',
+    'PAYMENT.CAPTURE.REFUNDED': 'refunded',
+    'PAYMENT.SALE.COMPLETED': 'completed',
+    'PAYMENT.SALE.DENIED': 'failed',
+    'PAYMENT.SALE.REFUNDED': 'refunded',
+}
+
+MPESA_STATUSES = {
+    'stk_callback.success': 'completed',
+    'stk_callback.failed': 'failed',
+}
+
+
+# What an event does: the payment lookup, its new status, the provider's transaction id and, for
+# refunds, the amount refunded so far (None if the event doesn't say)
+ProviderUpdate = namedtuple('ProviderUpdate', ['lookup', 'status', 'transaction_id', 'refunded_amount'])
+
+
+class IgnoreEvent(Exception):
+    """Raised by an update function for a handled event type that must not change any payment."""
+
+
+def record_event(provider, webhook_event):
+    """Store a verified ``WebhookEvent``; returns False if it was already stored."""
+    try:
+        with transaction.atomic():
+            PaymentEvent.objects.create(
+                provider=provider,
+                event_id=webhook_event.event_id,
+                event_type=webhook_event.event_type,
+                occurred_at=webhook_event.occurred_at,
+                payload=webhook_event.payload,
+            )
+    except IntegrityError:
+        return False
+    transaction.on_commit(dispatch_processing)
+    return True
+
+
+def dispatch_processing():
+    from .tasks import process_payment_events
+    try:
+        process_payment_events.delay()
+    except Exception as e:
+        logger.warning(f"Could not enqueue payment event processing, leaving it for beat: {e}")
+
+
+def stripe_update(event):
+    """The ``ProviderUpdate`` for an event, or None if its type isn't handled."""
+    status = STRIPE_STATUSES.get(event.event_type)
+    if status is None:
+        return None
+    obj = event.payload.get('data', {}).get('object', {})
+    if obj.get('object') == 'charge':
+        intent_id, transaction_id = obj.get('payment_intent'), obj.get('id') or ''
+    else:
+        intent_id, transaction_id = obj.get('id'), obj.get('latest_charge') or ''
+    if not intent_id:
+        # A blank id would match every payment that isn't a Stripe one
+        raise IgnoreEvent('Event has no payment intent id')
+    refunded_amount = None
+    if status == 'refunded' and obj.get('amount_refunded') is not None:
+        refunded_amount = Decimal(obj['amount_refunded']) / 100  # Stripe amounts are in cents
+    return ProviderUpdate(Q(stripe_payment_intent_id=intent_id), status, transaction_id, refunded_amount)
+
+
+def paypal_update(event):
+    status = PAYPAL_STATUSES.get(event.event_type)
+    if status is None:
+        return None
+    resource = event.payload.get('resource', {})
+    order_ids = {
+        resource.get('supplementary_data', {}).get('related_ids', {}).get('order_id'),
+        resource.get('parent_payment'),
+    }
+    transaction_ids = {resource.get('sale_id')}
+    if status == 'refunded':
+        # A refund resource links "up" to the capture it refunds
+        transaction_ids.update(link.get('href', '').rstrip('/').rsplit('/', 1)[-1]
+                               for link in resource.get('links', []) if link.get('rel') == 'up')
+    else:
+        transaction_ids.add(resource.get('id'))
+    order_ids -= {None, ''}
+    transaction_ids -= {None, ''}
+    if not (order_ids or transaction_ids):
+        raise IgnoreEvent('Event has no order or transaction id')
+    refunded_amount = None
+    if status == 'refunded':
+        # Capture refunds carry the running total; sale refunds only their own amount
+        total = resource.get('seller_payable_breakdown', {}).get('total_refunded_amount') or resource.get('amount') or {}
+        if total.get('value') or total.get('total'):
+            refunded_amount = Decimal(total.get('value') or total.get('total'))
+    lookup = Q(paypal_order_id__in=order_ids) | Q(transaction_id__in=transaction_ids)
+    return ProviderUpdate(lookup, status, resource.get('id', '') if status == 'completed' else '', refunded_amount)
+
+
+def mpesa_update(event):
+    callback = event.payload['Body']['stkCallback']
+    items = {item.get('Name'): item.get('Value') for item in (callback.get('CallbackMetadata') or {}).get('Item', [])}
+    return ProviderUpdate(
+        Q(mpesa_checkout_request_id=callback['CheckoutRequestID']),
+        MPESA_STATUSES[event.event_type],
+        str(items.get('MpesaReceiptNumber') or ''),
+        None,
+    )
+
+
+PROVIDER_UPDATES = {
+    'stripe': stripe_update,
+    'paypal': paypal_update,
+    'mpesa': mpesa_update,
+}
+
+
+def finish(event, status, error='', payment=None):
+    event.status = status
+    event.last_error = error
+    event.payment = payment or event.payment
+    event.processed_at = timezone.now()
+    event.save(update_fields=['status', 'last_error', 'payment', 'processed_at', 'attempts'])
+
+
+def apply_event(event):
+    """Apply one stored event to its payment and record the outcome."""
+    event.attempts += 1
+    try:
+        update = PROVIDER_UPDATES[event.provider](event)
+    except IgnoreEvent as e:
+        return finish(event, 'ignored', str(e))
+    if update is None:
+        return finish(event, 'ignored', f'Event type {event.event_type} is not handled')
+    lookup, status, transaction_id, refunded_amount = update
+
+    with transaction.atomic():
+        payment = Payment.objects.select_for_update().filter(lookup).first()
+        if payment is None:
+            window = timedelta(seconds=settings.PAYMENT_EVENT_MATCH_WINDOW_SECONDS)
+            if timezone.now() - event.received_at < window:
+                # The callback can beat the request that records the payment; look again shortly
+                event.next_attempt_at = timezone.now() + timedelta(seconds=60)
+                event.save(update_fields=['attempts', 'next_attempt_at'])
+                return
+            return finish(event, 'failed', 'No matching payment')
+
+        if payment.provider_event_at and event.occurred_at < payment.provider_event_at:
+            return finish(event, 'ignored', 'Older than the last event applied to this payment', payment)
+        if status == 'refunded' and refunded_amount is not None and refunded_amount < payment.amount:
+            return finish(event, 'ignored', f'Partial refund of {refunded_amount}', payment)
+        if status != payment.status and (payment.status, status) not in Payment.ALLOWED_TRANSITIONS:
+            return finish(event, 'ignored', f'Status change {payment.status} -> {status} is not allowed', payment)
+
+        completed = status == 'completed' and payment.status != 'completed'
+        payment.status = status
+        payment.provider_event_at = event.occurred_at
+        if completed:
+            payment.completed_at = timezone.now()
+        if transaction_id and not payment.transaction_id:
+            payment.transaction_id = transaction_id
+        payment.save()
+        finish(event, 'processed', payment=payment)
+
+        if completed:
+            from notifications.email_service import send_payment_confirmation_email
+            send_payment_confirmation_email(payment.user, payment)
+
+
+def due_events(limit):
+    return PaymentEvent.objects.filter(
+        status='pending', next_attempt_at__lte=timezone.now()
+    ).order_by('occurred_at', 'id')[:limit]
+
+
+def process_events(limit=500):
+    """Apply due events oldest first. Returns how many were handled, or None if another processor is running."""
+    lock_timeout = settings.PAYMENT_EVENT_LOCK_SECONDS
+    if not cache.add(PROCESSOR_LOCK_KEY, 1, lock_timeout):
+        return None
+    handled = 0
+    try:
+        for event in due_events(limit):
+            try:
+                apply_event(event)
+            except Exception as e:
+                logger.error(f"Payment event {event.provider}:{event.event_id} failed: {e}")
+                finish(event, 'failed', str(e))
+            handled += 1
+    finally:
+        cache.delete(PROCESSOR_LOCK_KEY)
+    if handled == limit:
+        # A burst left more behind; keep going in a fresh task
+        dispatch_processing()
+    return handled
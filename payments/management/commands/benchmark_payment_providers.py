@@ -0,0 +1,106 @@
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from admin_api.loadtest import percentile
+from payment_service import PaymentService
+from payments.providers import provider_clients, reset_clients
+
+RECORDINGS = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'recordings', 'sandbox.json')
+
+
+class Command(BaseCommand):
+    help = ('Run the PayPal and Stripe payment flows through PaymentService against recorded provider responses, '
+            'offline, with and without the status cache: flows per second, p50/p99 per flow and provider calls')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flows', type=int, default=200, help='Payments per mode, alternating PayPal and Stripe')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--latency', type=float, default=0.05, help='Seconds each recorded provider call takes')
+        parser.add_argument('--polls', type=int, default=3, help='Status checks per payment, as a confirmation page makes')
+        parser.add_argument('--recordings', default=RECORDINGS)
+        parser.add_argument('--output', help='Write the results as JSON to this path')
+
+    def handle(self, *args, **options):
+        with open(options['recordings']) as f:
+            recordings = json.load(f)
+        recordings['latency'] = options['latency']
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(recordings, f)
+        results = {}
+        try:
+            for name, status_cache in (('uncached', 0), ('cached', 60)):
+                with override_settings(PAYMENT_PROVIDER_RECORDINGS=f.name,
+                                       PAYMENT_PROVIDER_STATUS_CACHE_SECONDS=status_cache,
+                                       PAYMENT_PROVIDER_PENDING_STATUS_CACHE_SECONDS=status_cache,
+                                       PAYPAL_CLIENT_ID=os.environ.get('PAYPAL_CLIENT_ID', 'recorded'),
+                                       PAYPAL_CLIENT_SECRET=os.environ.get('PAYPAL_CLIENT_SECRET', 'recorded'),
+                                       STRIPE_SECRET_KEY='sk_test_recorded'):
+                    reset_clients()
+                    cache.clear()
+                    results[name] = self.measure(PaymentService(), options)
+        finally:
+            reset_clients()
+            os.unlink(f.name)
+
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w') as out:
+                json.dump(results, out, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+    def paypal_flow(self, service, polls):
+        created = service.create_paypal_payment(50)
+        if not created.get('success'):
+            return False
+        executed = service.execute_paypal_payment(created['payment_id'], 'RECORDEDPAYER')
+        statuses = [service.verify_payment_status(created['payment_id'], 'paypal') for _ in range(polls)]
+        return executed.get('success') and all(s.get('status') == 'approved' for s in statuses)
+
+    def stripe_flow(self, service, polls):
+        created = service.create_stripe_payment_intent(50)
+        if not created.get('success'):
+            return False
+        statuses = [service.verify_payment_status(created['payment_intent_id'], 'stripe') for _ in range(polls)]
+        return all(s.get('status') == 'succeeded' for s in statuses)
+
+    def measure(self, service, options):
+        flows = [self.paypal_flow if i % 2 == 0 else self.stripe_flow for i in range(options['flows'])]
+
+        def run(flow):
+            started = time.perf_counter()
+            ok = flow(service, options['polls'])
+            return (time.perf_counter() - started) * 1000, ok
+
+        # Build the session first so its setup isn't charged to one flow
+        provider_clients.session
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as pool:
+            samples = list(pool.map(run, flows))
+        seconds = time.perf_counter() - started
+        latencies = [latency for latency, _ in samples]
+        calls = provider_clients.recorded.calls
+        return {
+            'flows': len(samples),
+            'ok': sum(1 for _, ok in samples if ok),
+            'seconds': round(seconds, 3),
+            'per_second': round(len(samples) / seconds, 1) if seconds else None,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'provider_calls': calls,
+            'calls_per_flow': round(calls / len(samples), 2),
+        }
+
+    def report(self, results):
+        self.stdout.write(f'{"mode":<10}{"flows":>7}{"ok":>7}{"flows/s":>10}{"p50 ms":>10}{"p99 ms":>10}{"calls":>8}{"per flow":>10}')
+        for name, r in results.items():
+            self.stdout.write(
+                f'{name:<10}{r["flows"]:>7}{r["ok"]:>7}{r["per_second"]:>10}{r["p50_ms"]:>10}'
+                f'{r["p99_ms"]:>10}{r["provider_calls"]:>8}{r["calls_per_flow"]:>10}'
+            )
@@ -0,0 +1,43 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.reconciliation import FORMATS, Reconciler
+
+
+class Command(BaseCommand):
+    help = ('Reconcile payments against a PayPal, Stripe or bank settlement CSV: match rows by provider id or '
+            'PMJ bank reference, apply status changes in bulk and write unmatched rows to an exceptions report')
+
+    def add_arguments(self, parser):
+        parser.add_argument('settlement', help='Settlement CSV path, or - for stdin')
+        parser.add_argument('--format', choices=sorted(FORMATS), default='generic', dest='settlement_format')
+        parser.add_argument('--report', help='Write exceptions to this CSV (default: <settlement>.exceptions.csv)')
+        parser.add_argument('--encoding', default='utf-8-sig')
+        parser.add_argument('--dry-run', action='store_true', help='Match and report without updating payments')
+
+    def handle(self, *args, **options):
+        path = options['settlement']
+        report_path = options['report'] or (f'{path}.exceptions.csv' if path != '-' else 'settlement.exceptions.csv')
+        if path != '-' and not os.path.exists(path):
+            raise CommandError(f'Settlement file not found: {path}')
+
+        reconciler = Reconciler(options['settlement_format'], dry_run=options['dry_run'])
+        settlement = sys.stdin if path == '-' else open(path, newline='', encoding=options['encoding'])
+        try:
+            with open(report_path, 'w', newline='') as report:
+                summary = reconciler.run(settlement, report)
+        except ValueError as e:
+            raise CommandError(str(e))
+        finally:
+            if settlement is not sys.stdin:
+                settlement.close()
+
+        for name, value in summary.items():
+            self.stdout.write(f'{name:<22}{value}')
+        self.stdout.write(f'Exceptions written to {report_path}')
+        message = f'Reconciled {summary["matched"]} of {summary["rows"]} rows, {summary["updated"]} payments updated'
+        if options['dry_run']:
+            message += ' (dry run, nothing written)'
+        self.stdout.write(self.style.SUCCESS(message))
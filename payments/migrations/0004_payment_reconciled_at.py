@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_payment_webhook_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='reconciled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,16 +1,24 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
+from pamoja_kenya.tracking import TrackedFieldsMixin
 from applications.models import Application
 
 User = get_user_model()
 
-class Payment(models.Model):
+class Payment(TrackedFieldsMixin, models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('completed', 'Completed'),
         ('failed', 'Failed'),
         ('refunded', 'Refunded'),
     ]
+
+    # Status changes a provider event or settlement may make (payments.events, payments.reconciliation)
+    ALLOWED_TRANSITIONS = {
+        ('pending', 'completed'), ('pending', 'failed'), ('pending', 'refunded'),
+        ('failed', 'completed'), ('completed', 'refunded'),
+    }
     
     PAYMENT_METHODS = [
         ('paypal', 'PayPal'),
@@ -41,6 +49,7 @@ class Payment(models.Model):
     # External Payment IDs
     paypal_order_id = models.CharField(max_length=100, blank=True)
     stripe_payment_intent_id = models.CharField(max_length=100, blank=True)
+    mpesa_checkout_request_id = models.CharField(max_length=100, blank=True)
     transaction_id = models.CharField(max_length=100, blank=True)
     
     # Additional Information
@@ -51,13 +60,67 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    provider_event_at = models.DateTimeField(null=True, blank=True)  # time of the last webhook event applied
+    reconciled_at = models.DateTimeField(null=True, blank=True)  # last matched in a settlement file
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'status'], name='payment_user_status_idx'),
+            models.Index(fields=['-created_at', '-id'], name='payment_created_id_idx'),
+            models.Index(fields=['-created_at'], condition=models.Q(status='pending'), name='payment_pending_created_idx'),
+            # Webhook events are matched to payments by provider id
+            models.Index(fields=['stripe_payment_intent_id'], name='payment_stripe_intent_idx'),
+            models.Index(fields=['paypal_order_id'], name='payment_paypal_order_idx'),
+            models.Index(fields=['mpesa_checkout_request_id'], name='payment_mpesa_checkout_idx'),
+            models.Index(fields=['transaction_id'], name='payment_transaction_idx'),
+        ]
 
     def __str__(self):
         return f"{self.payer_name} - ${self.amount} ({self.status})"
 
     @property
     def is_completed(self):
-        return self.status == 'completed'
\ No newline at end of file
+        return self.status == 'completed'
+
+
+class PaymentEvent(models.Model):
+    """A verified provider webhook, stored as received and applied by ``payments.events``."""
+    PROVIDERS = [
+        ('stripe', 'Stripe'),
+        ('paypal', 'PayPal'),
+        ('mpesa', 'M-Pesa'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processed', 'Processed'),
+        ('ignored', 'Ignored'),
+        ('failed', 'Failed'),
+    ]
+
+    provider = models.CharField(max_length=10, choices=PROVIDERS)
+    event_id = models.CharField(max_length=255)
+    event_type = models.CharField(max_length=100, blank=True)
+    payload = models.JSONField()
+    occurred_at = models.DateTimeField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, null=True, blank=True, related_name='events')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-received_at']
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'event_id'], name='payment_event_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['next_attempt_at', 'occurred_at', 'id'], condition=models.Q(status='pending'),
+                         name='payment_event_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.provider} {self.event_type} {self.event_id} ({self.status})"
@@ -0,0 +1,248 @@
+"""
+HTTP layer for the PayPal and Stripe SDKs.
+
+Nothing is configured at import time. The first provider call builds one
+keep-alive ``requests`` session per process. The PayPal ``Api`` (with its
+OAuth token) and Stripe's HTTP client share that session, so calls reuse
+pooled connections instead of opening a new TLS connection each time.
+
+PayPal gets its own ``Api`` object and its module-level configuration is left
+alone. Stripe 7 has no per-call HTTP client, so the first Stripe call replaces
+``stripe.default_http_client`` for the whole process with a ``RequestsClient``
+on the shared session. Every Stripe call in the process then gets the
+provider timeouts and budget. The API key is still passed per call and
+``stripe.api_key`` is not set.
+
+- Every request gets ``PAYMENT_PROVIDER_CONNECT_TIMEOUT`` /
+  ``PAYMENT_PROVIDER_READ_TIMEOUT``.
+- Inside ``budget()``, every request also shares what is left of one deadline.
+  An operation that makes several calls, such as PayPal's token, lookup and
+  execute, fails once its budget is spent instead of adding up timeouts.
+- ``cached_status`` keeps provider status lookups for a short TTL.
+- With ``PAYMENT_PROVIDER_RECORDINGS`` set, requests are answered from a
+  recordings file by ``RecordedAdapter`` and nothing leaves the process. This
+  is for tests and ``benchmark_payment_providers``.
+"""
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import paypalrestsdk
+import requests
+import stripe
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+# Provider statuses that won't change again; lookups for these are kept for the full TTL
+TERMINAL_STATUSES = {'succeeded', 'canceled', 'approved', 'failed', 'completed'}
+
+
+class ProviderBudgetExceeded(requests.exceptions.Timeout):
+    pass
+
+
+@contextmanager
+def budget(seconds=None):
+    """Give every provider request made inside the block a share of one deadline."""
+    seconds = settings.PAYMENT_PROVIDER_BUDGET_SECONDS if seconds is None else seconds
+    outer = getattr(_local, 'deadline', None)
+    deadline = time.monotonic() + seconds
+    # A nested budget can only shorten the one around it
+    _local.deadline = min(deadline, outer) if outer else deadline
+    try:
+        yield
+    finally:
+        _local.deadline = outer
+
+
+class ProviderSession(requests.Session):
+    """Session that applies the provider timeouts and the current ``budget()`` to every request."""
+
+    def __init__(self, connect_timeout, read_timeout):
+        super().__init__()
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+    def request(self, method, url, **kwargs):
+        connect, read = self.connect_timeout, self.read_timeout
+        deadline = getattr(_local, 'deadline', None)
+        if deadline is not None:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                raise ProviderBudgetExceeded(f"Provider budget spent before {method} {urlparse(url).path}")
+            connect, read = min(connect, left), min(read, left)
+        # The SDKs pass their own long defaults; ours win
+        kwargs['timeout'] = (connect, read)
+        return super().request(method, url, **kwargs)
+
+
+class RecordedAdapter(BaseAdapter):
+    """
+    Answers requests from a recordings file instead of the network:
+
+        {"latency": 0.05,
+         "responses": [{"method": "GET", "path": "/v1/payment_intents/{id}", "status": 200, "body": {...}}]}
+
+    ``{id}`` in a path matches one path segment. In the body, ``{id}`` is
+    replaced with the matched segment and ``{new_id}`` with a fresh random id.
+    Unrecorded requests get a 404.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        with open(path) as f:
+            recordings = json.load(f)
+        self.latency = recordings.get('latency', 0)
+        self.routes = []
+        for entry in recordings['responses']:
+            pattern = re.escape(entry['path']).replace(re.escape('{id}'), '(?P<id>[^/]+)')
+            self.routes.append((entry['method'].upper(), re.compile(pattern + '/?$'), entry))
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def send(self, request, **kwargs):
+        with self.lock:
+            self.calls += 1
+        path = urlparse(request.url).path
+        for method, pattern, entry in self.routes:
+            match = pattern.match(path)
+            if method == request.method and match:
+                break
+        else:
+            logger.warning(f"No recorded provider response for {request.method} {path}")
+            entry, match = {'status': 404, 'body': {'error': 'not_recorded', 'message': f'{request.method} {path}'}}, None
+
+        body = json.dumps(entry['body']).replace('{new_id}', uuid.uuid4().hex[:24].upper())
+        if match and 'id' in match.groupdict():
+            body = body.replace('{id}', match.group('id'))
+        time.sleep(entry.get('latency', self.latency))
+
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.reason = 'Recorded'
+        response.headers['Content-Type'] = 'application/json'
+        response._content = body.encode()
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class PooledPayPalApi(paypalrestsdk.Api):
+    """``paypalrestsdk.Api`` that sends through a shared session rather than ``requests.request``."""
+
+    def __init__(self, session, **options):
+        super().__init__(options)
+        self.session = session
+
+    def http_call(self, url, method, **kwargs):
+        response = self.session.request(method, url, proxies=self.proxies, **kwargs)
+        return self.handle_response(response, response.content.decode('utf-8'))
+
+
+class ProviderClients:
+    """The per-process session and SDK clients, built on first use."""
+
+    def __init__(self):
+        self._session = None
+        self._paypal = None
+        self.recorded = None  # the RecordedAdapter when replaying recordings
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = ProviderSession(
+                        settings.PAYMENT_PROVIDER_CONNECT_TIMEOUT, settings.PAYMENT_PROVIDER_READ_TIMEOUT
+                    )
+                    if settings.PAYMENT_PROVIDER_RECORDINGS:
+                        adapter = self.recorded = RecordedAdapter(settings.PAYMENT_PROVIDER_RECORDINGS)
+                    else:
+                        adapter = HTTPAdapter(pool_maxsize=settings.PAYMENT_PROVIDER_POOL_SIZE)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+
+    @property
+    def paypal(self):
+        """PayPal API object to pass as ``api=`` to SDK resources; it keeps the OAuth token between calls."""
+        if self._paypal is None:
+            session = self.session
+            with self._lock:
+                if self._paypal is None:
+                    self._paypal = PooledPayPalApi(
+                        session,
+                        mode=settings.PAYPAL_MODE,
+                        client_id=settings.PAYPAL_CLIENT_ID,
+                        client_secret=settings.PAYPAL_CLIENT_SECRET,
+                    )
+        return self._paypal
+
+    def stripe_options(self):
+        """
+        Keyword arguments for Stripe SDK calls. On first use, and again after
+        ``reset_clients()``, points the process-wide ``stripe.default_http_client``
+        at the shared session.
+        """
+        session = self.session
+        with self._lock:
+            client = stripe.default_http_client
+            if not (isinstance(client, stripe.http_client.RequestsClient) and client._session is session):
+                stripe.default_http_client = stripe.http_client.RequestsClient(session=session)
+        return {'api_key': settings.STRIPE_SECRET_KEY}
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+        self._session = None
+        self._paypal = None
+        self.recorded = None
+
+
+provider_clients = ProviderClients()
+
+
+def reset_clients():
+    """Drop the session and clients so the next call is built from current settings."""
+    provider_clients.close()
+
+
+def status_cache_key(method, payment_id):
+    return f'payments:provider_status:{method}:{payment_id}'
+
+
+def cached_status(method, payment_id, lookup):
+    """
+    ``lookup()`` through the cache. A terminal status is kept for
+    ``PAYMENT_PROVIDER_STATUS_CACHE_SECONDS``. An in-flight one is kept only
+    long enough to absorb a burst of polling.
+    """
+    key = status_cache_key(method, payment_id)
+    result = cache.get(key)
+    if result is None:
+        result = lookup()
+        if 'error' not in result:
+            timeout = (settings.PAYMENT_PROVIDER_STATUS_CACHE_SECONDS if result.get('status') in TERMINAL_STATUSES
+                       else settings.PAYMENT_PROVIDER_PENDING_STATUS_CACHE_SECONDS)
+            if timeout:
+                cache.set(key, result, timeout)
+    return result
+
+
+def forget_status(method, payment_id):
+    cache.delete(status_cache_key(method, payment_id))
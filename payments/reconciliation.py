@@ -0,0 +1,269 @@
+"""
+Bulk reconciliation of payments against provider settlement files.
+
+``Reconciler`` reads the payments table once into an in-memory hash index,
+keyed by every provider id a payment carries. It then streams a settlement
+CSV row by row, so a file of any size uses constant memory apart from the
+index. Each row is matched by reference and checked for amount, currency and
+a legal status change. Rows that can't be matched cleanly are written to an
+exceptions report as they are found. Status changes and reconciliation stamps
+are applied with one UPDATE per chunk of ids rather than per row.
+
+Bank transfers are matched on their ``PMJ-XXXXXXXX`` reference (see
+``PaymentService.create_bank_transfer_reference``). It is found anywhere in
+the statement row and in a payment's ``transaction_id``, description or notes.
+"""
+import csv
+import re
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.dashboard import compute_summaries, save_summaries
+from admin_api.stats import invalidate_dashboard_stats
+from .models import Payment
+
+BANK_REFERENCE = re.compile(r'PMJ-[0-9A-F]{8}', re.IGNORECASE)
+
+# Candidate column names per settlement format, matched case-insensitively
+FORMATS = {
+    'generic': {
+        'references': ['reference', 'transaction_id', 'id'],
+        'amount': ['amount'],
+        'currency': ['currency'],
+        'status': ['status'],
+        'text': ['description', 'memo'],
+    },
+    'stripe': {
+        'references': ['PaymentIntent ID', 'payment_intent', 'id', 'Source', 'source_id'],
+        'amount': ['Amount', 'amount'],
+        'currency': ['Currency', 'currency'],
+        'status': ['Status', 'status'],
+        'text': ['Description'],
+    },
+    'paypal': {
+        'references': ['Transaction ID', 'Reference Txn ID', 'Invoice Number'],
+        'amount': ['Gross', 'Amount'],
+        'currency': ['Currency'],
+        'status': ['Status'],
+        'text': ['Note', 'Subject', 'Item Title'],
+    },
+    'bank': {
+        'references': ['Reference', 'Ref', 'Transaction ID'],
+        'amount': ['Amount', 'Credit'],
+        'currency': ['Currency'],
+        'status': [],
+        'text': ['Description', 'Memo', 'Narrative', 'Details'],
+    },
+}
+
+SETTLEMENT_STATUSES = {
+    'completed': 'completed', 'succeeded': 'completed', 'success': 'completed', 'paid': 'completed',
+    'settled': 'completed', 'available': 'completed', 'cleared': 'completed',
+    'refunded': 'refunded', 'refund': 'refunded', 'reversed': 'refunded',
+    'failed': 'failed', 'denied': 'failed', 'declined': 'failed', 'canceled': 'failed', 'cancelled': 'failed',
+}
+
+REPORT_FIELDS = ['line', 'reason', 'reference', 'amount', 'currency', 'status', 'payment_id', 'payment_amount',
+                 'payment_currency', 'payment_status']
+
+UPDATE_CHUNK_SIZE = 2000
+
+
+def parse_amount(value):
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        pass
+    # "$1,234.50", "(12.00)" and the like
+    cleaned = re.sub(r'[^0-9.\-]', '', (value or '').replace('(', '-'))
+    try:
+        return Decimal(cleaned)
+    except InvalidOperation:
+        return None
+
+
+class Reconciler:
+    """
+    reconciler = Reconciler('paypal')
+    with open(path, newline='') as settlement, open(report_path, 'w', newline='') as report:
+        summary = reconciler.run(settlement, report)
+    """
+
+    def __init__(self, settlement_format='generic', dry_run=False):
+        self.columns = FORMATS[settlement_format]
+        self.dry_run = dry_run
+        self.index = {}
+        self.ambiguous = set()
+        self.payments = {}
+        self.seen = set()  # payments matched by an earlier row
+        self.transitions = {}  # payment id -> new status
+        self.reconciled = []
+        self.counts = {'rows': 0, 'matched': 0, 'updated': 0, 'exceptions': 0}
+
+    def build_index(self):
+        """Map every provider id and bank reference to its payment in one pass over the table."""
+        rows = Payment.objects.values_list(
+            'id', 'user_id', 'amount', 'currency', 'status', 'transaction_id', 'paypal_order_id',
+            'stripe_payment_intent_id', 'mpesa_checkout_request_id', 'description', 'notes',
+        ).iterator(chunk_size=5000)
+        for payment_id, user_id, amount, currency, status, transaction_id, paypal, stripe, mpesa, description, notes in rows:
+            self.payments[payment_id] = (user_id, amount, currency.upper(), status)
+            keys = {transaction_id, paypal, stripe, mpesa}
+            keys.update(reference.upper() for reference in BANK_REFERENCE.findall(f'{transaction_id} {description} {notes}'))
+            for key in keys:
+                if not key:
+                    continue
+                if key in self.index and self.index[key] != payment_id:
+                    self.ambiguous.add(key)
+                self.index[key] = payment_id
+        return len(self.payments)
+
+    def resolve_columns(self, header):
+        """Positions of this format's columns in ``header``, in preference order."""
+        positions = {name.strip().lower(): i for i, name in enumerate(header)}
+        resolved = {
+            kind: [positions[c.lower()] for c in candidates if c.lower() in positions]
+            for kind, candidates in self.columns.items()
+        }
+        if not (resolved['references'] or resolved['text']) or not resolved['amount']:
+            raise ValueError(f"Settlement file needs a reference and an amount column, found: {', '.join(header)}")
+        return resolved
+
+    @staticmethod
+    def first(row, positions):
+        for i in positions:
+            if i < len(row) and row[i].strip():
+                return row[i].strip()
+        return ''
+
+    def row_keys(self, row, columns):
+        keys = [row[i].strip() for i in columns['references'] if i < len(row) and row[i].strip()]
+        text = ' '.join(row[i] for i in columns['references'] + columns['text'] if i < len(row))
+        if 'PMJ-' in text.upper():
+            keys.extend(reference.upper() for reference in BANK_REFERENCE.findall(text))
+        return keys
+
+    def match(self, row, columns):
+        """
+        Match one settlement row and record its effect. Returns None when it
+        reconciles, else (reason, reference, amount, currency, status, payment id).
+        """
+        keys = self.row_keys(row, columns)
+        reference = keys[0] if keys else ''
+        amount = parse_amount(self.first(row, columns['amount']))
+        currency = self.first(row, columns['currency']).upper()
+        raw_status = self.first(row, columns['status']).lower()
+
+        if amount is None:
+            return 'invalid_amount', reference, amount, currency, raw_status, None
+        key = next((k for k in keys if k in self.index), None)
+        if key is None:
+            return 'unmatched', reference, amount, currency, raw_status, None
+        if key in self.ambiguous:
+            return 'ambiguous_reference', key, amount, currency, raw_status, None
+        payment_id = self.index[key]
+
+        if raw_status:
+            status = SETTLEMENT_STATUSES.get(raw_status)
+            if status is None:
+                return 'unsettled', key, amount, currency, raw_status, payment_id
+        else:
+            status = 'refunded' if amount < 0 else 'completed'
+        if amount < 0 and status == 'completed':
+            status = 'refunded'
+
+        _, p_amount, p_currency, p_status = self.payments[payment_id]
+        # A file can settle and then refund the same payment; later rows start from earlier rows' result
+        current = self.transitions.get(payment_id, p_status)
+        reason = None
+        if payment_id in self.seen and status == current:
+            reason = 'duplicate'
+        elif abs(amount) != p_amount:
+            reason = 'amount_mismatch'
+        elif currency and currency != p_currency:
+            reason = 'currency_mismatch'
+        elif status != current and (current, status) not in Payment.ALLOWED_TRANSITIONS:
+            reason = 'status_conflict'
+        if reason:
+            return reason, key, amount, currency, raw_status, payment_id
+
+        self.counts['matched'] += 1
+        if payment_id not in self.seen:
+            self.seen.add(payment_id)
+            self.reconciled.append(payment_id)
+        if status != p_status:
+            self.transitions[payment_id] = status
+        else:
+            self.transitions.pop(payment_id, None)
+        return None
+
+    def reconcile(self, settlement, report=None):
+        """Stream ``settlement`` (a CSV file object); ``report`` is an optional text file for exceptions."""
+        reader = csv.reader(settlement)
+        columns = self.resolve_columns(next(reader, []))
+        writer = None
+        if report is not None:
+            writer = csv.writer(report)
+            writer.writerow(REPORT_FIELDS)
+        counts = self.counts
+        for line, row in enumerate(reader, start=2):
+            counts['rows'] += 1
+            result = self.match(row, columns)
+            if result is None:
+                continue
+            reason, reference, amount, currency, status, payment_id = result
+            counts['exceptions'] += 1
+            counts[reason] = counts.get(reason, 0) + 1
+            if writer:
+                payment = ('', '', '', '')
+                if payment_id:
+                    _, p_amount, p_currency, p_status = self.payments[payment_id]
+                    payment = (payment_id, p_amount, p_currency, self.transitions.get(payment_id, p_status))
+                writer.writerow((line, reason, reference, amount, currency, status) + payment)
+
+    def apply(self):
+        """Write status changes and reconciliation stamps in chunked UPDATEs."""
+        now = timezone.now()
+        by_status = {}
+        for payment_id, status in self.transitions.items():
+            by_status.setdefault(status, []).append(payment_id)
+
+        with transaction.atomic():
+            for status, payment_ids in by_status.items():
+                changes = {'status': status, 'updated_at': now}
+                if status == 'completed':
+                    changes['completed_at'] = Coalesce('completed_at', now)
+                for start in range(0, len(payment_ids), UPDATE_CHUNK_SIZE):
+                    self.counts['updated'] += Payment.objects.filter(pk__in=payment_ids[start:start + UPDATE_CHUNK_SIZE]).update(**changes)
+
+            for start in range(0, len(self.reconciled), UPDATE_CHUNK_SIZE):
+                Payment.objects.filter(pk__in=self.reconciled[start:start + UPDATE_CHUNK_SIZE]).update(reconciled_at=now)
+
+            if self.transitions:
+                # Queryset updates skip the signals that keep these in step
+                user_ids = sorted({self.payments[pk][0] for pk in self.transitions})
+                for start in range(0, len(user_ids), 500):
+                    save_summaries(list(compute_summaries(user_ids[start:start + 500]).values()))
+                transaction.on_commit(invalidate_dashboard_stats)
+
+    def run(self, settlement, report=None):
+        started = time.perf_counter()
+        self.build_index()
+        indexed = time.perf_counter()
+        self.reconcile(settlement, report)
+        matched = time.perf_counter()
+        if not self.dry_run:
+            self.apply()
+        finished = time.perf_counter()
+        return {
+            **self.counts,
+            'payments_indexed': len(self.payments),
+            'status_changes': len(self.transitions),
+            'index_seconds': round(indexed - started, 3),
+            'match_seconds': round(matched - indexed, 3),
+            'apply_seconds': round(finished - matched, 3),
+        }
@@ -0,0 +1,13 @@
+from celery import shared_task
+from .events import process_events
+import logging
+
+logger = logging.getLogger(__name__)
+
+@shared_task(ignore_result=True)
+def process_payment_events():
+    """Apply stored payment webhook events (queued by the webhook views and scheduled by celery beat)"""
+    handled = process_events()
+    if handled:
+        logger.info(f"Processed {handled} payment webhook events")
+    return handled
@@ -1,3 +1,256 @@
-from django.test import TestCase
+import base64
+import csv
+import hashlib
+import hmac
+import json
+import os
+import time
+import zlib
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from cryptography.x509.oid import NameOID
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from accounts.dashboard import get_summary
+from accounts.models import ActivityEvent
+from payment_service import PaymentService
+
+from . import providers
+from .events import process_events
+from .models import Payment, PaymentEvent
+from .reconciliation import Reconciler
+
+User = get_user_model()
+
+
+def stripe_event(event_id, event_type, intent_id, created):
+    return {'id': event_id, 'type': event_type, 'created': created,
+            'data': {'object': {'id': intent_id, 'object': 'payment_intent', 'latest_charge': 'ch_1'}}}
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET='whsec_test', MPESA_CALLBACK_TOKEN='mpesa-token', PAYPAL_WEBHOOK_ID='WH-1')
+class PaymentWebhookTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='payer', email='payer@example.com', password='x')
+
+    def create_payment(self, **fields):
+        return Payment.objects.create(user=self.user, amount=Decimal('50.00'), payer_name='Payer',
+                                      payer_email='payer@example.com', **fields)
+
+    def post_stripe(self, payload, secret='whsec_test'):
+        body = json.dumps(payload)
+        timestamp = int(time.time())
+        signature = hmac.new(secret.encode(), f'{timestamp}.{body}'.encode(), hashlib.sha256).hexdigest()
+        return self.client.post('/api/payments/webhooks/stripe/', body, content_type='application/json',
+                                HTTP_STRIPE_SIGNATURE=f't={timestamp},v1={signature}')
+
+    def test_stripe_events_are_verified_deduplicated_and_applied_in_order(self):
+        payment = self.create_payment(payment_method='stripe', stripe_payment_intent_id='pi_1')
+        now = int(time.time())
+
+        self.assertEqual(self.post_stripe(stripe_event('evt_1', 'payment_intent.payment_failed', 'pi_1', now - 10), 'wrong').status_code, 400)
+        self.assertEqual(self.post_stripe(stripe_event('evt_2', 'payment_intent.succeeded', 'pi_1', now)).status_code, 200)
+        self.assertEqual(self.post_stripe(stripe_event('evt_2', 'payment_intent.succeeded', 'pi_1', now)).status_code, 200)
+        self.assertEqual(PaymentEvent.objects.count(), 1)
+        self.assertEqual(process_events(), 1)
+
+        # Delivered after the success was applied, but it happened before it
+        self.assertEqual(self.post_stripe(stripe_event('evt_3', 'payment_intent.payment_failed', 'pi_1', now - 5)).status_code, 200)
+        self.assertEqual(process_events(), 1)
+        payment.refresh_from_db()
+        self.assertEqual((payment.status, payment.transaction_id), ('completed', 'ch_1'))
+        self.assertIsNotNone(payment.completed_at)
+        self.assertEqual(
+            dict(PaymentEvent.objects.values_list('event_id', 'status')), {'evt_2': 'processed', 'evt_3': 'ignored'}
+        )
+
+    def test_stripe_event_without_intent_id_is_ignored(self):
+        other = self.create_payment(payment_method='paypal', paypal_order_id='ORDER-1', status='completed')
+        charge = {'id': 'ch_9', 'object': 'charge', 'payment_intent': None, 'amount': 5000, 'amount_refunded': 5000}
+        self.post_stripe({'id': 'evt_9', 'type': 'charge.refunded', 'created': int(time.time()), 'data': {'object': charge}})
+        process_events()
+        other.refresh_from_db()
+        self.assertEqual(other.status, 'completed')
+        self.assertEqual(PaymentEvent.objects.get().status, 'ignored')
+
+    def test_only_allowed_transitions_and_full_refunds_are_applied(self):
+        payment = self.create_payment(payment_method='stripe', stripe_payment_intent_id='pi_1')
+        now = int(time.time())
+
+        def deliver(event_id, event_type, created, obj=None):
+            obj = obj or {'id': 'pi_1', 'object': 'payment_intent', 'latest_charge': 'ch_1'}
+            self.post_stripe({'id': event_id, 'type': event_type, 'created': created, 'data': {'object': obj}})
+            process_events()
+            payment.refresh_from_db()
+            return PaymentEvent.objects.get(event_id=event_id).status
+
+        def refund(amount_refunded):
+            return {'id': 'ch_1', 'object': 'charge', 'payment_intent': 'pi_1', 'amount': 5000,
+                    'amount_refunded': amount_refunded}
+
+        self.assertEqual(deliver('evt_1', 'payment_intent.succeeded', now - 40), 'processed')
+        self.assertEqual(deliver('evt_2', 'payment_intent.payment_failed', now - 30), 'ignored')
+        self.assertEqual(payment.status, 'completed')
+        self.assertEqual(deliver('evt_3', 'charge.refunded', now - 20, refund(1000)), 'ignored')
+        self.assertEqual(payment.status, 'completed')
+        self.assertEqual(deliver('evt_4', 'charge.refunded', now - 10, refund(5000)), 'processed')
+        self.assertEqual(payment.status, 'refunded')
+        self.assertEqual(deliver('evt_5', 'payment_intent.succeeded', now), 'ignored')
+        self.assertEqual(payment.status, 'refunded')
+
+    def test_mpesa_callback_requires_token(self):
+        payment = self.create_payment(payment_method='mpesa', mpesa_checkout_request_id='ws_CO_1')
+        body = {'Body': {'stkCallback': {
+            'MerchantRequestID': '1', 'CheckoutRequestID': 'ws_CO_1', 'ResultCode': 0, 'ResultDesc': 'Success',
+            'CallbackMetadata': {'Item': [{'Name': 'Amount', 'Value': 50}, {'Name': 'MpesaReceiptNumber', 'Value': 'NLJ7RT61SV'},
+                                          {'Name': 'TransactionDate', 'Value': 20260101120000}]},
+        }}}
+        response = self.client.post('/api/payments/webhooks/mpesa/wrong/', body, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/payments/webhooks/mpesa/mpesa-token/', body, content_type='application/json')
+        self.assertEqual(response.json(), {'ResultCode': 0, 'ResultDesc': 'Accepted'})
+
+        process_events()
+        payment.refresh_from_db()
+        self.assertEqual((payment.status, payment.transaction_id), ('completed', 'NLJ7RT61SV'))
+
+    def test_paypal_signature_is_checked_against_cached_certificate(self):
+        payment = self.create_payment(payment_method='paypal', paypal_order_id='ORDER-1')
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'messageverificationcerts.paypal.com')])
+        now = timezone.now()
+        certificate = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+                       .serial_number(1).not_valid_before(now - timedelta(days=1)).not_valid_after(now + timedelta(days=1))
+                       .sign(key, hashes.SHA256()))
+        cert_url = 'https://api.paypal.com/v1/notifications/certs/CERT-1'
+        cache.set('payments:paypal_cert:' + hashlib.sha256(cert_url.encode()).hexdigest(),
+                  certificate.public_bytes(serialization.Encoding.PEM))
+
+        body = json.dumps({'id': 'WH-EVT-1', 'event_type': 'PAYMENT.CAPTURE.COMPLETED', 'create_time': now.isoformat(),
+                           'resource': {'id': 'CAPTURE-1', 'supplementary_data': {'related_ids': {'order_id': 'ORDER-1'}}}})
+        transmission_time = now.isoformat()
+        message = f'T-1|{transmission_time}|WH-1|{zlib.crc32(body.encode())}'
+        signature = base64.b64encode(key.sign(message.encode(), padding.PKCS1v15(), hashes.SHA256())).decode()
+        headers = {'HTTP_PAYPAL_TRANSMISSION_ID': 'T-1', 'HTTP_PAYPAL_TRANSMISSION_TIME': transmission_time,
+                   'HTTP_PAYPAL_CERT_URL': cert_url, 'HTTP_PAYPAL_AUTH_ALGO': 'SHA256withRSA'}
+
+        response = self.client.post('/api/payments/webhooks/paypal/', body, content_type='application/json',
+                                    HTTP_PAYPAL_TRANSMISSION_SIG=base64.b64encode(b'forged').decode(), **headers)
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/payments/webhooks/paypal/', body, content_type='application/json',
+                                    HTTP_PAYPAL_TRANSMISSION_SIG=signature, **headers)
+        self.assertEqual(response.status_code, 200)
+
+        process_events()
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'completed')
+
+
+class ReconciliationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='payer', email='payer@example.com', password='x')
+
+    def create_payment(self, **fields):
+        fields.setdefault('payment_method', 'paypal')
+        return Payment.objects.create(user=self.user, amount=Decimal('50.00'), payer_name='Payer', payer_email='payer@example.com',
+                                      **fields)
+
+    def test_settlement_rows_are_matched_applied_and_reported(self):
+        paypal = self.create_payment(paypal_order_id='ORDER-1')
+        bank = self.create_payment(payment_method='bank_transfer', transaction_id='PMJ-1A2B3C4D')
+        refunded = self.create_payment(stripe_payment_intent_id='pi_9', status='completed')
+        wrong_amount = self.create_payment(paypal_order_id='ORDER-2')
+        settled = self.create_payment(paypal_order_id='ORDER-3', status='refunded')
+
+        settlement = StringIO(
+            'Reference,Amount,Currency,Status,Description\n'
+            'ORDER-1,50.00,USD,Completed,\n'
+            ',"$50.00",USD,,Transfer ref pmj-1a2b3c4d from member\n'
+            'pi_9,-50.00,USD,refunded,\n'
+            'ORDER-2,45.00,USD,Completed,\n'
+            'ORDER-3,50.00,USD,Completed,\n'
+            'ORDER-1,50.00,USD,Completed,\n'
+            'ORDER-404,50.00,USD,Completed,\n'
+        )
+        report = StringIO()
+        summary = Reconciler('generic').run(settlement, report)
+
+        self.assertEqual((summary['rows'], summary['matched'], summary['updated']), (7, 3, 3))
+        statuses = dict(Payment.objects.values_list('id', 'status'))
+        self.assertEqual(statuses[paypal.pk], 'completed')
+        self.assertEqual(statuses[bank.pk], 'completed')
+        self.assertEqual(statuses[refunded.pk], 'refunded')
+        self.assertEqual(statuses[wrong_amount.pk], 'pending')
+        self.assertEqual(statuses[settled.pk], 'refunded')
+        self.assertIsNotNone(Payment.objects.get(pk=bank.pk).completed_at)
+
+        exceptions = {row['line']: row['reason'] for row in csv.DictReader(StringIO(report.getvalue()))}
+        self.assertEqual(exceptions, {'5': 'amount_mismatch', '6': 'status_conflict', '7': 'duplicate', '8': 'unmatched'})
+
+
+@override_settings(PAYMENT_PROVIDER_RECORDINGS=os.path.join(os.path.dirname(__file__), 'recordings', 'sandbox.json'),
+                   PAYPAL_CLIENT_ID='recorded', PAYPAL_CLIENT_SECRET='recorded', STRIPE_SECRET_KEY='sk_test_recorded')
+class ProviderClientTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        providers.reset_clients()
+        self.addCleanup(providers.reset_clients)
+
+    def test_paypal_flow_reuses_token_and_caches_status(self):
+        service = PaymentService()
+        created = service.create_paypal_payment(50)
+        self.assertTrue(created['success'])
+        executed = service.execute_paypal_payment(created['payment_id'], 'PAYER-1')
+        self.assertEqual((executed['status'], executed['amount']), ('completed', '50.00'))
+        for _ in range(3):
+            self.assertEqual(service.verify_payment_status(created['payment_id'], 'paypal')['status'], 'approved')
+        # One OAuth token, create, execute (no lookup first) and one status lookup
+        self.assertEqual(providers.provider_clients.recorded.calls, 4)
+
+    def test_budget_caps_provider_calls(self):
+        with providers.budget(0):
+            result = PaymentService().verify_payment_status('PAYID-1', 'paypal')
+        self.assertIn('budget', result['error'])
+        self.assertEqual(providers.provider_clients.recorded.calls, 0)
+        self.assertIsNone(cache.get(providers.status_cache_key('paypal', 'PAYID-1')))
+
+    def test_stripe_sdk_uses_shared_session(self):
+        import stripe
+        api_key = stripe.api_key
+        self.assertEqual(providers.provider_clients.stripe_options(), {'api_key': 'sk_test_recorded'})
+        self.assertIs(stripe.default_http_client._session, providers.provider_clients.session)
+        self.assertEqual(stripe.api_key, api_key)  # the key goes with each call
+        # The process-wide client follows the session when it is rebuilt
+        providers.reset_clients()
+        providers.provider_clients.stripe_options()
+        self.assertIs(stripe.default_http_client._session, providers.provider_clients.session)
+
+
+class PaymentAdminActionTests(TestCase):
+    def test_mark_as_completed_updates_summary_and_activity(self):
+        admin_user = User.objects.create_superuser(username='admin', email='admin@example.com', password='x')
+        member = User.objects.create_user(username='payer', email='payer@example.com', password='x')
+        payment = Payment.objects.create(user=member, amount=Decimal('50.00'), payment_method='bank_transfer',
+                                         payer_name='Payer', payer_email='payer@example.com')
+        self.assertEqual(get_summary(member).completed_payments, 0)
+        request = RequestFactory().post('/admin/payments/payment/')
+        request.user = admin_user
+        model_admin = site._registry[Payment]
+
+        with mock.patch.object(model_admin, 'message_user'), self.captureOnCommitCallbacks(execute=True):
+            model_admin.mark_as_completed(request, Payment.objects.filter(pk=payment.pk))
+
+        summary = get_summary(member)
+        self.assertEqual((summary.completed_payments, summary.total_paid), (1, Decimal('50.00')))
+        self.assertTrue(ActivityEvent.objects.filter(user=member, action='Payment Completed', object_id=payment.pk).exists())
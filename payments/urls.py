@@ -6,4 +6,7 @@ urlpatterns = [
     path('<int:pk>/', views.PaymentDetailView.as_view(), name='payment_detail'),
     path('stats/', views.payment_stats_view, name='payment_stats'),
     path('paypal/', views.record_paypal_payment, name='record_paypal_payment'),
+    path('webhooks/stripe/', views.stripe_webhook, name='stripe_webhook'),
+    path('webhooks/paypal/', views.paypal_webhook, name='paypal_webhook'),
+    path('webhooks/mpesa/<str:token>/', views.mpesa_callback, name='mpesa_callback'),
 ]
\ No newline at end of file
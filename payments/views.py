@@ -3,9 +3,18 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from django.db.models import Sum
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from .models import Payment
+from .events import record_event
+from .webhooks import WebhookVerificationError, parse_mpesa, parse_paypal, parse_stripe
 from .serializers import PaymentSerializer, PaymentCreateSerializer
 from notifications.email_service import send_payment_confirmation_email
+from accounts.idempotency import idempotent
+import logging
+
+logger = logging.getLogger(__name__)
 
 class PaymentListCreateView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -41,6 +50,7 @@ def payment_stats_view(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@idempotent
 def record_paypal_payment(request):
     """Record PayPal payment from frontend"""
     data = request.data
@@ -82,4 +92,33 @@ def record_paypal_payment(request):
         'id': payment.id,
         'message': 'Payment recorded successfully',
         'status': payment.status
-    }, status=status.HTTP_201_CREATED)
\ No newline at end of file
+    }, status=status.HTTP_201_CREATED)
+
+def receive_webhook(provider, parse, request, *args):
+    """Verify, store and acknowledge; the payment itself is updated by ``payments.events`` in the background"""
+    try:
+        event = parse(request, *args)
+    except WebhookVerificationError as e:
+        logger.warning(f"Rejected {provider} webhook: {e}")
+        return JsonResponse({'error': 'Invalid webhook'}, status=400)
+    record_event(provider, event)
+    return HttpResponse(status=200)
+
+@csrf_exempt
+@require_POST
+def stripe_webhook(request):
+    return receive_webhook('stripe', parse_stripe, request)
+
+@csrf_exempt
+@require_POST
+def paypal_webhook(request):
+    return receive_webhook('paypal', parse_paypal, request)
+
+@csrf_exempt
+@require_POST
+def mpesa_callback(request, token):
+    response = receive_webhook('mpesa', parse_mpesa, request, token)
+    if response.status_code != 200:
+        return response
+    # Daraja expects this acknowledgement body
+    return JsonResponse({'ResultCode': 0, 'ResultDesc': 'Accepted'})
@@ -0,0 +1,154 @@
+"""
+Webhook signature checks for the payment providers.
+
+Each ``parse_*`` function verifies a callback and returns a ``WebhookEvent``
+(provider event id, type, occurrence time and payload), or raises
+``WebhookVerificationError``. They only verify and extract; matching events to
+payments happens later in ``payments.events``.
+
+- Stripe signs the raw body with ``STRIPE_WEBHOOK_SECRET`` (``Stripe-Signature``).
+- PayPal signs ``transmission id|time|webhook id|crc32(body)`` with a
+  certificate hosted on paypal.com. The certificate is cached, so a delivery
+  is verified without calling PayPal.
+- M-Pesa (Daraja) does not sign callbacks. The callback URL carries the
+  secret ``MPESA_CALLBACK_TOKEN``, and ``MPESA_ALLOWED_IPS`` can restrict
+  senders to Safaricom's addresses.
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import zlib
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+from urllib.parse import urlparse
+
+import requests
+import stripe
+from cryptography import x509
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from accounts.login import client_ip
+
+WebhookEvent = namedtuple('WebhookEvent', ['event_id', 'event_type', 'occurred_at', 'payload'])
+
+# Safaricom reports M-Pesa transaction times in East Africa Time
+MPESA_TIMEZONE = dt_timezone(timedelta(hours=3))
+
+
+class WebhookVerificationError(Exception):
+    pass
+
+
+def load_json(body):
+    try:
+        return json.loads(body)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise WebhookVerificationError(f"Invalid JSON body: {e}") from e
+
+
+def parse_stripe(request):
+    if not settings.STRIPE_WEBHOOK_SECRET:
+        raise WebhookVerificationError("STRIPE_WEBHOOK_SECRET is not configured")
+    try:
+        stripe.WebhookSignature.verify_header(
+            request.body.decode('utf-8'), request.headers.get('Stripe-Signature', ''),
+            settings.STRIPE_WEBHOOK_SECRET, settings.PAYMENT_WEBHOOK_TOLERANCE_SECONDS,
+        )
+    except (stripe.error.SignatureVerificationError, UnicodeDecodeError) as e:
+        raise WebhookVerificationError(f"Invalid Stripe signature: {e}") from e
+
+    payload = load_json(request.body)
+    if not payload.get('id'):
+        raise WebhookVerificationError("Stripe event has no id")
+    created = payload.get('created')
+    occurred_at = datetime.fromtimestamp(created, dt_timezone.utc) if created else timezone.now()
+    return WebhookEvent(payload['id'], payload.get('type', ''), occurred_at, payload)
+
+
+def paypal_certificate(cert_url):
+    """The PEM certificate PayPal signed with, fetched once per URL and cached."""
+    parsed = urlparse(cert_url)
+    if parsed.scheme != 'https' or not (parsed.hostname or '').endswith('.paypal.com'):
+        raise WebhookVerificationError(f"Untrusted PayPal certificate URL: {cert_url}")
+    key = 'payments:paypal_cert:' + hashlib.sha256(cert_url.encode()).hexdigest()
+    pem = cache.get(key)
+    if pem is None:
+        try:
+            response = requests.get(cert_url, timeout=5)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            raise WebhookVerificationError(f"Could not fetch PayPal certificate: {e}") from e
+        pem = response.content
+        cache.set(key, pem, 24 * 60 * 60)
+    return x509.load_pem_x509_certificate(pem)
+
+
+def parse_paypal(request):
+    if not settings.PAYPAL_WEBHOOK_ID:
+        raise WebhookVerificationError("PAYPAL_WEBHOOK_ID is not configured")
+    headers = request.headers
+    transmission_id = headers.get('Paypal-Transmission-Id', '')
+    transmission_time = headers.get('Paypal-Transmission-Time', '')
+    signature = headers.get('Paypal-Transmission-Sig', '')
+    cert_url = headers.get('Paypal-Cert-Url', '')
+    if not (transmission_id and transmission_time and signature and cert_url):
+        raise WebhookVerificationError("Missing PayPal transmission headers")
+    if headers.get('Paypal-Auth-Algo', 'SHA256withRSA') != 'SHA256withRSA':
+        raise WebhookVerificationError("Unsupported PayPal signature algorithm")
+
+    sent_at = parse_datetime(transmission_time)
+    if sent_at is None or abs((timezone.now() - sent_at).total_seconds()) > settings.PAYMENT_WEBHOOK_TOLERANCE_SECONDS:
+        raise WebhookVerificationError("PayPal transmission time outside tolerance")
+
+    certificate = paypal_certificate(cert_url)
+    now = timezone.now()
+    if not certificate.not_valid_before_utc <= now <= certificate.not_valid_after_utc:
+        raise WebhookVerificationError("PayPal certificate is not currently valid")
+
+    message = f'{transmission_id}|{transmission_time}|{settings.PAYPAL_WEBHOOK_ID}|{zlib.crc32(request.body)}'
+    try:
+        certificate.public_key().verify(
+            base64.b64decode(signature), message.encode(), padding.PKCS1v15(), hashes.SHA256()
+        )
+    except (InvalidSignature, binascii.Error, ValueError) as e:
+        raise WebhookVerificationError("Invalid PayPal signature") from e
+
+    payload = load_json(request.body)
+    if not payload.get('id'):
+        raise WebhookVerificationError("PayPal event has no id")
+    occurred_at = parse_datetime(payload.get('create_time') or '') or sent_at
+    return WebhookEvent(payload['id'], payload.get('event_type', ''), occurred_at, payload)
+
+
+def parse_mpesa(request, token):
+    if not settings.MPESA_CALLBACK_TOKEN:
+        raise WebhookVerificationError("MPESA_CALLBACK_TOKEN is not configured")
+    if not hmac.compare_digest(token.encode(), settings.MPESA_CALLBACK_TOKEN.encode()):
+        raise WebhookVerificationError("Invalid M-Pesa callback token")
+    if settings.MPESA_ALLOWED_IPS and client_ip(request) not in settings.MPESA_ALLOWED_IPS:
+        raise WebhookVerificationError(f"M-Pesa callback from unexpected address {client_ip(request)}")
+
+    payload = load_json(request.body)
+    callback = (payload.get('Body') or {}).get('stkCallback') or {}
+    checkout_id = callback.get('CheckoutRequestID')
+    if not checkout_id:
+        raise WebhookVerificationError("M-Pesa callback has no CheckoutRequestID")
+
+    occurred_at = timezone.now()
+    items = {item.get('Name'): item.get('Value') for item in (callback.get('CallbackMetadata') or {}).get('Item', [])}
+    if items.get('TransactionDate'):
+        try:
+            occurred_at = datetime.strptime(str(items['TransactionDate']), '%Y%m%d%H%M%S').replace(tzinfo=MPESA_TIMEZONE)
+        except ValueError:
+            pass
+    # Safaricom sends one result per checkout request, so its id is the event id
+    event_type = 'stk_callback.success' if str(callback.get('ResultCode')) == '0' else 'stk_callback.failed'
+    return WebhookEvent(checkout_id, event_type, occurred_at, payload)